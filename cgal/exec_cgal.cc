@@ -3,18 +3,28 @@
 #include <CGAL/Polygon_mesh_processing/corefinement.h>
 #include <CGAL/Surface_mesh.h>
 
+#include <cstdio>
+#include <cstring>
 #include <iostream>
+#include <sstream>
+#include <string>
+
+#ifdef _WIN32
+#include <io.h>
+#define dup _dup
+#define dup2 _dup2
+#define fdopen _fdopen
+#else
+#include <unistd.h>
+#endif
 
 typedef CGAL::Exact_predicates_exact_constructions_kernel K;
 typedef CGAL::Surface_mesh<K::Point_3> Mesh;
 
 namespace PMP = CGAL::Polygon_mesh_processing;
 
-int main(int argc, const char** argv)
+static int compute(const std::string& operation, const std::string& filename1, const std::string& filename2, const std::string& output)
 {
-    const std::string filename1 = argv[2];
-    const std::string filename2 = argv[3];
-
     Mesh mesh1, mesh2;
 
     if(!PMP::IO::read_polygon_mesh(filename1, mesh1) || !PMP::IO::read_polygon_mesh(filename2, mesh2))
@@ -26,9 +36,9 @@ int main(int argc, const char** argv)
     bool valid_op;
     Mesh result;
 
-    if (!strcmp(argv[1], "union")) {
+    if (operation == "union") {
         valid_op = PMP::corefine_and_compute_union(mesh1, mesh2, result);
-    } else if (!strcmp(argv[1], "intersection")) {
+    } else if (operation == "intersection") {
         valid_op = PMP::corefine_and_compute_intersection(mesh1, mesh2, result);
     } else {
         valid_op = PMP::corefine_and_compute_difference(mesh1, mesh2, result);
@@ -37,10 +47,56 @@ int main(int argc, const char** argv)
     if(valid_op)
     {
         std::cout << "Union was successfully computed\n";
-        CGAL::IO::write_polygon_mesh(argv[4], result, CGAL::parameters::stream_precision(17));
+        // the format is given by the extension: binary for PLY, full precision for text formats
+        CGAL::IO::write_polygon_mesh(output, result, CGAL::parameters::stream_precision(17).use_binary_mode(true));
         return 0;
     }
 
     std::cout << "Union could not be computed\n";
     return 1;
 }
+
+// Server mode: one request "operation<TAB>mesh1<TAB>mesh2<TAB>output" per line of stdin,
+// one answer "OK<TAB>output" or "ERROR<TAB>message" per line of stdout, the logs go to stderr
+static int serve()
+{
+    FILE* answers = fdopen(dup(1), "w");
+    dup2(2, 1);
+    std::string line;
+    while (std::getline(std::cin, line))
+    {
+        std::istringstream fields(line);
+        std::string operation, filename1, filename2, output;
+        std::getline(fields, operation, '\t');
+        std::getline(fields, filename1, '\t');
+        std::getline(fields, filename2, '\t');
+        std::getline(fields, output, '\t');
+        int rc = 1;
+        try {
+            rc = compute(operation, filename1, filename2, output);
+        } catch (const std::exception& e) {
+            std::cerr << e.what() << std::endl;
+        }
+        std::cout.flush();
+        if (rc == 0) {
+            std::fprintf(answers, "OK\t%s\n", output.c_str());
+        } else {
+            std::fprintf(answers, "ERROR\t%s could not be computed\n", operation.c_str());
+        }
+        std::fflush(answers);
+    }
+    return 0;
+}
+
+int main(int argc, const char** argv)
+{
+    if (argc == 2 && !strcmp(argv[1], "--server")) {
+        return serve();
+    }
+    if (argc < 5) {
+        std::cerr << "usage: exec_cgal <union|intersection|difference> <mesh1> <mesh2> <output>" << std::endl;
+        std::cerr << "       exec_cgal --server" << std::endl;
+        return 1;
+    }
+    return compute(argv[1], argv[2], argv[3], argv[4]);
+}
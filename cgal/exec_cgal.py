@@ -1,4 +1,25 @@
-from meshbooleanplugin.mesh_boolean_utils import execCommand, meshIOConvert
+from meshbooleanplugin.mesh_boolean_utils import execCommand, meshIOConvert, binaryVersion, useEngineServer, EngineRequest
+
+# Formats read and written by exec_cgal: binary PLY, CGAL picks the reader and writer from the extension
+INPUT_FORMAT = "ply"
+RESULT_FORMAT = "ply"
+
+def get_binary_path():
+  """ Path of the engine executable """
+  import os
+  import platform
+  if platform.system() == "Windows" :
+    binary_path = "exec_cgal.exe"
+  else:
+    if 'CGAL_ROOT_DIR' in os.environ:
+      binary_path = os.path.join(os.environ["CGAL_ROOT_DIR"], "bin", "exec_cgal")
+    else:
+      binary_path = os.path.join(os.environ["SMESH_ROOT_DIR"], "share", "salome", "plugins", "smesh", "meshbooleanplugin", "cgal", "exec_cgal")
+  return binary_path
+
+def engine_version():
+  """ Identifies the engine build, cached results of another build are not reused """
+  return binaryVersion(get_binary_path())
 
 def perform_boolean_operation(mesh1_path, mesh2_path, operation, output_path):
   import subprocess
@@ -12,14 +33,12 @@ def perform_boolean_operation(mesh1_path, mesh2_path, operation, output_path):
   if not os.path.isabs(output_path):
     output_path = os.path.join(cwd, output_path)
 
-  new_output_path = output_path[:-3] + 'off'
-  if platform.system() == "Windows" :
-    binary_path = "exec_cgal.exe"
-  else:
-    if 'CGAL_ROOT_DIR' in os.environ:
-      binary_path = os.path.join(os.environ["CGAL_ROOT_DIR"], "bin", "exec_cgal")
-    else:
-      binary_path = os.path.join(os.environ["SMESH_ROOT_DIR"], "share", "salome", "plugins", "smesh", "meshbooleanplugin", "cgal", "exec_cgal")
+  new_output_path = output_path[:-3] + RESULT_FORMAT
+  binary_path = get_binary_path()
+
+  # the resident server started with --server skips the startup of the binary
+  if useEngineServer("cgal"):
+    return EngineRequest("cgal", [binary_path, "--server"], operation, mesh1_path, mesh2_path, new_output_path)
 
   try:
     command = [binary_path, operation, mesh1_path, mesh2_path, new_output_path]
@@ -29,9 +48,9 @@ def perform_boolean_operation(mesh1_path, mesh2_path, operation, output_path):
   return p
 
 #same convert_result fonction used for every algorithm
-def convert_result(med_path):
-  output_path = med_path[:-3] + 'off'
-  meshIOConvert(output_path, med_path)
+def convert_result(med_path, worker=None):
+  output_path = med_path[:-3] + RESULT_FORMAT
+  meshIOConvert(output_path, med_path, worker=worker)
 
 def cgal_main(operation, fn1, fn2, out_name):
   p = perform_boolean_operation(fn1, fn2, operation, out_name)
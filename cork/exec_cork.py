@@ -1,4 +1,25 @@
-from meshbooleanplugin.mesh_boolean_utils import execCommand, meshIOConvert
+from meshbooleanplugin.mesh_boolean_utils import execCommand, meshIOConvert, binaryVersion
+
+# Formats read and written by cork_bin: text OFF, its file dispatch is upstream and has no binary format
+INPUT_FORMAT = "off"
+RESULT_FORMAT = "off"
+
+def get_binary_path():
+  """ Path of the engine executable """
+  import os
+  import platform
+  if platform.system() == "Windows" :
+    binary_path = "wincork.exe"
+  else:
+    if 'CORK_ROOT_DIR' in os.environ:
+      binary_path = os.path.join(os.environ["CORK_ROOT_DIR"], "bin", "cork_bin")
+    else:
+      binary_path = os.path.join(os.environ["SMESH_ROOT_DIR"], "share", "salome", "plugins", "smesh", "meshbooleanplugin", "cork", "cork_bin")
+  return binary_path
+
+def engine_version():
+  """ Identifies the engine build, cached results of another build are not reused """
+  return binaryVersion(get_binary_path())
 
 def perform_boolean_operation(mesh1_path, mesh2_path, operation, output_path):
   import subprocess
@@ -19,24 +40,18 @@ def perform_boolean_operation(mesh1_path, mesh2_path, operation, output_path):
   if not os.path.isabs(output_path):
     output_path = os.path.join(cwd, output_path)
 
-  import meshio
-  m1 = meshio.read(mesh1_path)
+  # cork only reads OFF files, convert the inputs given in another format
   new_mesh1_path = mesh1_path[:-3] + 'off'
-  m1.write(new_mesh1_path)
+  if new_mesh1_path != mesh1_path:
+    meshIOConvert(mesh1_path, new_mesh1_path)
 
-  m2 = meshio.read(mesh2_path)
   new_mesh2_path = mesh2_path[:-3] + 'off'
-  m2.write(new_mesh2_path)
+  if new_mesh2_path != mesh2_path:
+    meshIOConvert(mesh2_path, new_mesh2_path)
 
-  new_output_path = output_path[:-3] + 'off'
+  new_output_path = output_path[:-3] + RESULT_FORMAT
 
-  if platform.system() == "Windows" :
-    binary_path = "wincork.exe"
-  else:
-    if 'CORK_ROOT_DIR' in os.environ:
-      binary_path = os.path.join(os.environ["CORK_ROOT_DIR"], "bin", "cork_bin")
-    else:
-      binary_path = os.path.join(os.environ["SMESH_ROOT_DIR"], "share", "salome", "plugins", "smesh", "meshbooleanplugin", "cork", "cork_bin")
+  binary_path = get_binary_path()
   try:
     command = [binary_path, operation, new_mesh1_path, new_mesh2_path, new_output_path]
     p = execCommand(command)
@@ -45,9 +60,9 @@ def perform_boolean_operation(mesh1_path, mesh2_path, operation, output_path):
   return p
 
 #same convert_result fonction used for every algorithm
-def convert_result(med_path):
-  output_path = med_path[:-3] + 'off'
-  meshIOConvert(output_path, med_path)
+def convert_result(med_path, worker=None):
+  output_path = med_path[:-3] + RESULT_FORMAT
+  meshIOConvert(output_path, med_path, worker=worker)
 
 def cork_main(operation, fn1, fn2, out_name):
   p = perform_boolean_operation(fn1, fn2, operation, out_name)
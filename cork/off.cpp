@@ -27,6 +27,7 @@
 
 #include <iostream>
 #include <fstream>
+#include <string>
 using std::ifstream;
 using std::ofstream;
 using std::endl;
@@ -50,7 +51,13 @@ int readOFF(string filename, FileMesh *data)
     in >> filetype;
     if(filetype != "OFF") return 1;
     
-    in >> filetype >> filetype >> filetype >> filetype; // Skip meshio stamp
+    // Skip the comment lines (meshio and meshbooleanplugin stamps)
+    in >> std::ws;
+    while(in.peek() == '#') {
+        string comment;
+        std::getline(in, comment);
+        in >> std::ws;
+    }
     // counts of things
     int numvertices, numfaces, numedges;
     in >> numvertices >> numfaces >> numedges;
@@ -85,6 +92,7 @@ int writeOFF(string filename, FileMesh *data)
     ofstream out;
     out.open(filename.c_str());
     if(!out) return 1;
+    out.precision(17); // keep full double precision
     
     // "OFF"
     out << "OFF" << endl;
@@ -1,4 +1,21 @@
-from meshbooleanplugin.mesh_boolean_utils import execCommand, meshIOConvert
+from meshbooleanplugin.mesh_boolean_utils import execCommand, meshIOConvert, binaryVersion
+
+# Formats read and written by mesh_booleans: its upstream driver only handles OBJ files
+INPUT_FORMAT = "obj"
+RESULT_FORMAT = "obj"
+
+def get_binary_path():
+  """ Path of the engine executable """
+  import os
+  if 'IRMB_ROOT_DIR' in os.environ:
+    binary_path = os.path.join(os.environ["IRMB_ROOT_DIR"], "bin", "mesh_booleans")
+  else:
+    binary_path = os.path.join(os.environ["SMESH_ROOT_DIR"], "share", "salome", "plugins", "smesh", "meshbooleanplugin", "irmb", "mesh_booleans")
+  return binary_path
+
+def engine_version():
+  """ Identifies the engine build, cached results of another build are not reused """
+  return binaryVersion(get_binary_path())
 
 def perform_boolean_operation(mesh1_path, mesh2_path, operation, output_path):
   import subprocess
@@ -10,13 +27,10 @@ def perform_boolean_operation(mesh1_path, mesh2_path, operation, output_path):
   cwd = os.getcwd()
   if not os.path.isabs(output_path):
     output_path = os.path.join(cwd, output_path)
-  obj_output_path = os.path.splitext(output_path)[0] + ".obj"
+  obj_output_path = os.path.splitext(output_path)[0] + "." + RESULT_FORMAT
   if (operation == "difference"):
       operation = "subtraction"
-  if 'IRMB_ROOT_DIR' in os.environ:
-    binary_path = os.path.join(os.environ["IRMB_ROOT_DIR"], "bin", "mesh_booleans")
-  else:
-    binary_path = os.path.join(os.environ["SMESH_ROOT_DIR"], "share", "salome", "plugins", "smesh", "meshbooleanplugin", "irmb", "mesh_booleans")
+  binary_path = get_binary_path()
   command = [binary_path, operation, mesh1_path, mesh2_path, obj_output_path]
 
   try:
@@ -26,9 +40,9 @@ def perform_boolean_operation(mesh1_path, mesh2_path, operation, output_path):
   return p
 
 #same convert_result fonction used for every algorithm
-def convert_result(med_path):
-  output_path = med_path[:-3] + "obj"
-  meshIOConvert(output_path, med_path)
+def convert_result(med_path, worker=None):
+  output_path = med_path[:-3] + RESULT_FORMAT
+  meshIOConvert(output_path, med_path, worker=worker)
 
 
 def IRMB_main(operation, fn1, fn2, out_name):
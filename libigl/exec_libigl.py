@@ -1,4 +1,25 @@
-from meshbooleanplugin.mesh_boolean_utils import execCommand, meshIOConvert
+from meshbooleanplugin.mesh_boolean_utils import execCommand, meshIOConvert, binaryVersion, useEngineServer, EngineRequest
+
+# Formats read and written by 609_Boolean: binary PLY through igl::read_triangle_mesh and write_triangle_mesh
+INPUT_FORMAT = "ply"
+RESULT_FORMAT = "ply"
+
+def get_binary_path():
+  """ Path of the engine executable """
+  import os
+  import platform
+  if platform.system() == "Windows" :
+    binary_path = "609_Boolean.exe"
+  else:
+    if 'LIBIGL_ROOT_DIR' in os.environ:
+      binary_path = os.path.join(os.environ["LIBIGL_ROOT_DIR"], "bin", "609_Boolean")
+    else:
+      binary_path = os.path.join(os.environ["SMESH_ROOT_DIR"], "share", "salome", "plugins", "smesh", "meshbooleanplugin", "libigl", "609_Boolean")
+  return binary_path
+
+def engine_version():
+  """ Identifies the engine build, cached results of another build are not reused """
+  return binaryVersion(get_binary_path())
 
 def perform_boolean_operation(mesh1_path, mesh2_path, operation, output_path):
   import subprocess
@@ -12,14 +33,11 @@ def perform_boolean_operation(mesh1_path, mesh2_path, operation, output_path):
   cwd = os.getcwd()
   if not os.path.isabs(output_path):
     output_path = os.path.join(cwd, output_path)
-  new_out_name = os.path.splitext(output_path)[0] + ".obj"
-  if platform.system() == "Windows" :
-    binary_path = "609_Boolean.exe"
-  else:
-    if 'LIBIGL_ROOT_DIR' in os.environ:
-      binary_path = os.path.join(os.environ["LIBIGL_ROOT_DIR"], "bin", "609_Boolean")
-    else:
-      binary_path = os.path.join(os.environ["SMESH_ROOT_DIR"], "share", "salome", "plugins", "smesh", "meshbooleanplugin", "libigl", "609_Boolean")
+  new_out_name = os.path.splitext(output_path)[0] + "." + RESULT_FORMAT
+  binary_path = get_binary_path()
+  # the resident server started with --server skips the startup of the binary
+  if useEngineServer("igl"):
+    return EngineRequest("igl", [binary_path, "--server"], operation, mesh1_path, mesh2_path, new_out_name)
   try:
     command = [binary_path, operation, mesh1_path, mesh2_path, new_out_name]
     p = execCommand(command)
@@ -28,9 +46,9 @@ def perform_boolean_operation(mesh1_path, mesh2_path, operation, output_path):
   return p
 
 #same convert_result fonction used for every algorithm
-def convert_result(med_path):
-  output_path = med_path[:-3] + "obj"
-  meshIOConvert(output_path, med_path)
+def convert_result(med_path, worker=None):
+  output_path = med_path[:-3] + RESULT_FORMAT
+  meshIOConvert(output_path, med_path, worker=worker)
 
 def libigl_main(operation, fn1, fn2, out_name):
   p = perform_boolean_operation(fn1, fn2, operation, out_name)
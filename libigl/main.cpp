@@ -1,11 +1,23 @@
-#include <igl/readOBJ.h>
-#include <igl/writeOBJ.h>
+#include <igl/read_triangle_mesh.h>
+#include <igl/write_triangle_mesh.h>
 //#undef IGL_STATIC_LIBRARY
 #include <igl/copyleft/cgal/mesh_boolean.h>
 #include <igl/opengl/glfw/Viewer.h>
 
 #include <Eigen/Core>
+#include <cstdio>
 #include <iostream>
+#include <sstream>
+#include <string>
+
+#ifdef _WIN32
+#include <io.h>
+#define dup _dup
+#define dup2 _dup2
+#define fdopen _fdopen
+#else
+#include <unistd.h>
+#endif
 
 
 Eigen::MatrixXd VA,VB,VC; // Vertices
@@ -35,19 +47,13 @@ void boolean(std::string out_path)
       C.row(f) = Eigen::RowVector3d(0,1,0);
     }
   }
-  igl::writeOBJ(out_path, VC, FC);
+  // the format is given by the extension, PLY files are written in binary
+  igl::write_triangle_mesh(out_path, VC, FC, igl::FileEncoding::Binary);
 }
 
-int main(int argc, char *argv[])
+static int compute(const std::string& operation, const std::string& fn1, const std::string& fn2, const std::string& out_path)
 {
-  using namespace Eigen;
-  using namespace std;
-  if (argc < 5)
-  {
-      return 1;
-  }
-  std::string operation = argv[1];
-
+  boolean_type = igl::MESH_BOOLEAN_TYPE_UNION;
   if (operation == "intersection")
   {
       boolean_type =
@@ -59,10 +65,60 @@ int main(int argc, char *argv[])
           static_cast<igl::MeshBooleanType>(
                   (boolean_type+2)% igl::NUM_MESH_BOOLEAN_TYPES);
   }
-  std::string fn1 = argv[2];
-  std::string fn2 = argv[3];
-  std::string out_path = argv[4];
-  igl::readOBJ(fn1,VA,FA);
-  igl::readOBJ(fn2,VB,FB);
+  if (!igl::read_triangle_mesh(fn1,VA,FA) || !igl::read_triangle_mesh(fn2,VB,FB))
+  {
+      std::cerr << "Invalid input." << std::endl;
+      return 1;
+  }
   boolean(out_path);
+  return 0;
+}
+
+// Server mode: one request "operation<TAB>mesh1<TAB>mesh2<TAB>output" per line of stdin,
+// one answer "OK<TAB>output" or "ERROR<TAB>message" per line of stdout, the logs go to stderr
+static int serve()
+{
+  FILE* answers = fdopen(dup(1), "w");
+  dup2(2, 1);
+  std::string line;
+  while (std::getline(std::cin, line))
+  {
+    std::istringstream fields(line);
+    std::string operation, fn1, fn2, out_path;
+    std::getline(fields, operation, '\t');
+    std::getline(fields, fn1, '\t');
+    std::getline(fields, fn2, '\t');
+    std::getline(fields, out_path, '\t');
+    int rc = 1;
+    try
+    {
+      rc = compute(operation, fn1, fn2, out_path);
+    } catch (const std::exception& e)
+    {
+      std::cerr << e.what() << std::endl;
+    }
+    std::cout.flush();
+    if (rc == 0)
+    {
+      std::fprintf(answers, "OK\t%s\n", out_path.c_str());
+    } else
+    {
+      std::fprintf(answers, "ERROR\t%s could not be computed\n", operation.c_str());
+    }
+    std::fflush(answers);
+  }
+  return 0;
+}
+
+int main(int argc, char *argv[])
+{
+  if (argc == 2 && std::string(argv[1]) == "--server")
+  {
+      return serve();
+  }
+  if (argc < 5)
+  {
+      return 1;
+  }
+  return compute(argv[1], argv[2], argv[3], argv[4]);
 }
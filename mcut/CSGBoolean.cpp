@@ -40,9 +40,11 @@ This tutorial shows how to compute boolean operations using MCUT.
 
 #include "mcut/mcut.h"
 
+#include <fstream>
 #include <map>
 #include <stdio.h>
 #include <stdlib.h>
+#include <string>
 #include <vector>
 // libigl dependencies
 #include <Eigen/Core>
@@ -51,6 +53,36 @@ This tutorial shows how to compute boolean operations using MCUT.
 #include <igl/read_triangle_mesh.h>
 #include <igl/writeOBJ.h>
 
+// Writes the result as a binary little endian PLY file, vertices are kept as doubles
+static bool writeBinaryPLY(const std::string& fpath, const std::vector<double>& vertices, const std::vector<std::vector<int>>& faces)
+{
+    std::ofstream file(fpath, std::ios::binary);
+    if (!file) {
+        return false;
+    }
+    file << "ply\n"
+         << "format binary_little_endian 1.0\n"
+         << "element vertex " << vertices.size() / 3 << "\n"
+         << "property double x\n"
+         << "property double y\n"
+         << "property double z\n"
+         << "element face " << faces.size() << "\n"
+         << "property list uchar int vertex_indices\n"
+         << "end_header\n";
+    file.write(reinterpret_cast<const char*>(vertices.data()), vertices.size() * sizeof(double));
+    for (const std::vector<int>& face : faces) {
+        const unsigned char faceSize = (unsigned char)face.size();
+        file.write(reinterpret_cast<const char*>(&faceSize), sizeof(faceSize));
+        file.write(reinterpret_cast<const char*>(face.data()), face.size() * sizeof(int));
+    }
+    return (bool)file;
+}
+
+static bool endsWith(const std::string& str, const std::string& suffix)
+{
+    return str.size() >= suffix.size() && str.compare(str.size() - suffix.size(), suffix.size(), suffix) == 0;
+}
+
 struct InputMesh {
     // variables for reading .obj file data with libigl
     std::vector<std::vector<double>> V;
@@ -298,22 +330,14 @@ int main(int argc, const char* argv[])
         err = mcGetConnectedComponentData(context, connComp, MC_CONNECTED_COMPONENT_DATA_FRAGMENT_LOCATION, sizeof(McFragmentLocation), &fragmentLocation, NULL);
         my_assert(err == MC_NO_ERROR);
 
-        // save cc mesh to .obj file
-        // -------------------------
+        // save cc mesh to a .ply (binary) or .obj file
+        // ---------------------------------------------
 
         std::string fpath(argv[4]);
 
         printf("write file: %s\n", fpath.c_str());
 
-        std::ofstream file(fpath);
-
-        // write vertices and normals
-        for (uint32_t i = 0; i < ccVertexCount; ++i) {
-            double x = ccVertices[(McSize)i * 3 + 0];
-            double y = ccVertices[(McSize)i * 3 + 1];
-            double z = ccVertices[(McSize)i * 3 + 2];
-            file << "v " << std::setprecision(std::numeric_limits<long double>::digits10 + 1) << x << " " << y << " " << z << std::endl;
-        }
+        std::vector<std::vector<int>> ccFaces(ccFaceCount);
 
         int faceVertexOffsetBase = 0;
 
@@ -321,19 +345,38 @@ int main(int argc, const char* argv[])
         for (uint32_t f = 0; f < ccFaceCount; ++f) {
             bool reverseWindingOrder = (fragmentLocation == MC_FRAGMENT_LOCATION_BELOW) && (patchLocation == MC_PATCH_LOCATION_OUTSIDE);
             int faceSize = faceSizes.at(f);
-            file << "f ";
             // for each vertex in face
             for (int v = (reverseWindingOrder ? (faceSize - 1) : 0);
                  (reverseWindingOrder ? (v >= 0) : (v < faceSize));
                  v += (reverseWindingOrder ? -1 : 1)) {
-                const int ccVertexIdx = ccFaceIndices[(McSize)faceVertexOffsetBase + v];
-                file << (ccVertexIdx + 1) << " ";
+                ccFaces[f].push_back((int)ccFaceIndices[(McSize)faceVertexOffsetBase + v]);
             } // for (int v = 0; v < faceSize; ++v) {
-            file << std::endl;
 
             faceVertexOffsetBase += faceSize;
         }
 
+        if (endsWith(fpath, ".ply")) {
+            my_assert(writeBinaryPLY(fpath, ccVertices, ccFaces));
+        } else {
+            std::ofstream file(fpath);
+
+            // write vertices and normals
+            for (uint32_t i = 0; i < ccVertexCount; ++i) {
+                double x = ccVertices[(McSize)i * 3 + 0];
+                double y = ccVertices[(McSize)i * 3 + 1];
+                double z = ccVertices[(McSize)i * 3 + 2];
+                file << "v " << std::setprecision(std::numeric_limits<long double>::digits10 + 1) << x << " " << y << " " << z << std::endl;
+            }
+
+            for (const std::vector<int>& face : ccFaces) {
+                file << "f ";
+                for (int ccVertexIdx : face) {
+                    file << (ccVertexIdx + 1) << " ";
+                }
+                file << std::endl;
+            }
+        }
+
         // 6. free connected component data
         // --------------------------------
         err = mcReleaseConnectedComponents(context, (uint32_t)connectedComponents.size(), connectedComponents.data());
@@ -1,4 +1,21 @@
-from meshbooleanplugin.mesh_boolean_utils import execCommand, meshIOConvert
+from meshbooleanplugin.mesh_boolean_utils import execCommand, meshIOConvert, binaryVersion
+
+# Formats read and written by CSGBoolean: binary PLY (read by libigl, written by CSGBoolean itself)
+INPUT_FORMAT = "ply"
+RESULT_FORMAT = "ply"
+
+def get_binary_path():
+  """ Path of the engine executable """
+  import os
+  if 'MCUT_ROOT_DIR' in os.environ:
+    binary_path = os.path.join(os.environ["MCUT_ROOT_DIR"], "bin", "CSGBoolean")
+  else:
+    binary_path = os.path.join(os.environ["SMESH_ROOT_DIR"], "share", "salome", "plugins", "smesh", "meshbooleanplugin", "mcut", "CSGBoolean")
+  return binary_path
+
+def engine_version():
+  """ Identifies the engine build, cached results of another build are not reused """
+  return binaryVersion(get_binary_path())
 
 def perform_boolean_operation(mesh1_path, mesh2_path, operation, output_path):
     import subprocess
@@ -11,11 +28,8 @@ def perform_boolean_operation(mesh1_path, mesh2_path, operation, output_path):
     cwd = os.getcwd()
     if not os.path.isabs(output_path):
         output_path = os.path.join(cwd, output_path)
-    new_output_path = os.path.splitext(output_path)[0] + ".obj"
-    if 'MCUT_ROOT_DIR' in os.environ:
-        binary_path = os.path.join(os.environ["MCUT_ROOT_DIR"], "bin", "CSGBoolean")
-    else:
-        binary_path = os.path.join(os.environ["SMESH_ROOT_DIR"], "share", "salome", "plugins", "smesh", "meshbooleanplugin", "mcut", "CSGBoolean")
+    new_output_path = os.path.splitext(output_path)[0] + "." + RESULT_FORMAT
+    binary_path = get_binary_path()
     try:
         if operation == "union":
             operation = "-u"
@@ -32,9 +46,9 @@ def perform_boolean_operation(mesh1_path, mesh2_path, operation, output_path):
     return p
 
 #same convert_result fonction used for every algorithm
-def convert_result(med_path):
-  output_path = med_path[:-3] + "obj"
-  meshIOConvert(output_path, med_path)
+def convert_result(med_path, worker=None):
+  output_path = med_path[:-3] + RESULT_FORMAT
+  meshIOConvert(output_path, med_path, worker=worker)
 
 def mcut_main(operation, fn1, fn2, out_name):
     p = perform_boolean_operation(fn1, fn2, operation, out_name)
@@ -5,11 +5,32 @@ This file is in charge of everything related to Boolean Operations
 and gives directly the .med file to the GUI
 """
 
+import asyncio
+import math
+import os
 import tempfile
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor, Future, CancelledError, wait, as_completed, FIRST_COMPLETED
+from contextlib import contextmanager
 from enum import Enum
+import numpy as np
 from salome.kernel import salome
+from salome.kernel.salome_utils import logger
 from salome.smesh import smeshBuilder
-from meshbooleanplugin.mesh_boolean_utils import meshIOConvert
+from meshbooleanplugin import mesh_boolean_utils
+from meshbooleanplugin.mesh_boolean_utils import meshIOConvert, ProcessCancelled, ResourceLimits, \
+  ResourceLimitExceeded, EngineProcess, engineLimits, currentLimits, watchWallClock, ramDirectory, \
+  releaseRamDirectory
+from meshbooleanplugin.mesh_boolean_io import facesFromNodalConnectivity, compactVertices, writeMesh, \
+  mergeCoincidentVertices, openEdgesCount, meshFileSummary, meshArraysSummary, readPly, writePly, readMesh, NORM_TRI3
+from meshbooleanplugin.mesh_boolean_cache import operand_cache, result_cache, fileKey, arraysKey, resultKey
+from meshbooleanplugin.mesh_boolean_history import run_history, boxesOverlap
+from meshbooleanplugin.mesh_boolean_geometry import operandsRelation, trivialResult, localizeOperands, \
+  concatenateMeshes, DISJOINT
+from meshbooleanplugin.mesh_boolean_check import checkOperand, verdict_cache, InvalidOperand
+from meshbooleanplugin import __version__ as plugin_version
 from meshbooleanplugin.vtk import exec_vtk
 from meshbooleanplugin.irmb import exec_irmb
 from meshbooleanplugin.cork import exec_cork
@@ -20,6 +41,9 @@ from meshbooleanplugin.cgal import exec_cgal
 # To know if the import is already done
 import_Dump_Done = False
 
+# Serializes the imports in the study and their python dump
+_study_lock = threading.RLock()
+
 # Dictionary to track naming increments
 _counter = {
   "union_num" : 1,
@@ -35,6 +59,60 @@ class BooleanMeshAlgorithm(str, Enum):
   IRMB = 'irmb'
   CORK = 'cork'
   MCUT = 'mcut'
+  # several engines run concurrently, the first valid result is kept (see setRaceEngines)
+  RACE = 'race'
+  # the engine is chosen for each operation from the operands and the history of the runs
+  AUTO = 'auto'
+
+class StageTimings:
+  """
+  Wall times in seconds of the stages of a boolean operation, see STAGES
+  Given to booleanOperation it is filled as the stages end, callback(stage, seconds) is called
+  after each stage. The timings are also logged with the SALOME logger.
+  usage is the ResourceUsage of the last engine process run, None for in-process and server runs.
+  """
+  STAGES = ("precheck", "export", "conversion", "engine", "result_conversion", "import", "dump")
+
+  def __init__(self, callback = None):
+    self.stages = dict.fromkeys(self.STAGES, 0.0)
+    self.callback = callback
+    self.usage = None
+
+  def add(self, stage, seconds):
+    self.stages[stage] += seconds
+    logger.debug("Stage %s: %.3f s", stage, seconds)
+    if self.callback is not None:
+      self.callback(stage, seconds)
+
+  def total(self):
+    return sum(self.stages.values())
+
+  def __repr__(self):
+    return ", ".join(f"{stage} {seconds:.3f} s" for stage, seconds in self.stages.items())
+
+# Timings of the operation run by each thread
+_current = threading.local()
+
+@contextmanager
+def timedStage(stage):
+  """ Adds the time spent in the with block to the stage of the operation timed on this thread, if any """
+  timings = getattr(_current, "timings", None)
+  start = time.perf_counter()
+  try:
+    yield
+  finally:
+    if timings is not None:
+      timings.add(stage, time.perf_counter() - start)
+
+@contextmanager
+def timedOperation(timings):
+  """ Times the stages run on this thread in the with block into timings """
+  previous = getattr(_current, "timings", None)
+  _current.timings = timings
+  try:
+    yield timings
+  finally:
+    _current.timings = previous
 
 def runAlgo(algo, operator, mesh_left, mesh_right, result_file):
   """ Asserts the boolean operation to the specific algorithm """
@@ -54,9 +132,115 @@ def runAlgo(algo, operator, mesh_left, mesh_right, result_file):
     raise ValueError("Unknown algorithm!")
   return p
 
-def tmpDir():
-  """ Creates a secure temporary directory for computation files """
-  return tempfile.TemporaryDirectory(prefix="BooleanMeshCompute_")
+def engineModule(algo):
+  """ Returns the exec module driving the engine of the algorithm """
+  if algo == BooleanMeshAlgorithm.VTK :
+    return exec_vtk
+  if algo == BooleanMeshAlgorithm.IRMB :
+    return exec_irmb
+  if algo == BooleanMeshAlgorithm.CORK :
+    return exec_cork
+  if algo == BooleanMeshAlgorithm.MCUT :
+    return exec_mcut
+  if algo == BooleanMeshAlgorithm.IGL :
+    return exec_libigl
+  if algo == BooleanMeshAlgorithm.CGAL :
+    return exec_cgal
+  raise ValueError("Unknown algorithm!")
+
+def engineVersion(algo):
+  """ Version of the plugin and of the engine build, part of the key of the cached results """
+  return f"{plugin_version}/{engineModule(algo).engine_version()}"
+
+def engineAvailable(algo):
+  """ True if the engine of the algorithm is installed """
+  try:
+    return engineModule(algo).engine_version() != "missing"
+  except Exception: # pylint: disable=broad-exception-caught
+    return False
+
+def availableEngines():
+  """ Installed engines """
+  return [algo for algo in BooleanMeshAlgorithm
+          if algo not in (BooleanMeshAlgorithm.RACE, BooleanMeshAlgorithm.AUTO) and engineAvailable(algo)]
+
+def engineInputFormat(algo):
+  """ Mesh format advertised by the engine for its inputs, binary when the engine supports it """
+  return getattr(engineModule(algo), "INPUT_FORMAT", "obj")
+
+def engineResultFile(algo, med_result):
+  """ File written by the engine when asked for med_result, in its own format """
+  return os.path.splitext(med_result)[0] + "." + engineModule(algo).RESULT_FORMAT
+
+# Directory of the intermediate files, MESHBOOLEAN_TMPDIR: a directory, 'auto' (a RAM-backed file system
+# such as /dev/shm when the files fit in the available memory, else the default one) or 'default'
+tmp_dir = os.getenv("MESHBOOLEAN_TMPDIR", "auto")
+
+# Estimated size of the intermediate files of an operation: bytes per face of the SMESH operands,
+# bytes per byte of the operand files, and size assumed when the operands are unknown
+INTERMEDIATE_BYTES_PER_FACE = 512
+INTERMEDIATE_FILE_RATIO = 8
+DEFAULT_INTERMEDIATE_SIZE = 256 * 1024 * 1024
+
+def setTmpDir(directory):
+  """
+  Selects where the intermediate files are written: a directory, 'auto' (a RAM-backed file system
+  when they fit in memory, else the default temporary directory) or 'default' (tempfile.gettempdir())
+  """
+  global tmp_dir
+  if directory not in ("auto", "default") and not os.path.isdir(directory):
+    raise ValueError(f"{directory} is not a directory")
+  tmp_dir = directory
+
+def estimateIntermediateSize(*operands):
+  """ Estimated size in bytes of the intermediate files of an operation on the operands, None if unknown """
+  size = 0
+  for operand in operands:
+    try:
+      if hasattr(operand, "NbFaces"):
+        size += operand.NbFaces() * INTERMEDIATE_BYTES_PER_FACE
+      else:
+        size += os.path.getsize(str(operand)) * INTERMEDIATE_FILE_RATIO
+    except Exception: # pylint: disable=broad-exception-caught
+      return None
+  return size
+
+class WorkDirectory(tempfile.TemporaryDirectory):
+  """
+  Temporary directory of the computation files holding its reservation of RAM-backed space, see ramDirectory
+  The reservation is released when the directory is cleaned up or garbage collected
+  """
+  def __init__(self, directory = None, reserved_size = 0):
+    try:
+      super().__init__(prefix="BooleanMeshCompute_", dir=directory)
+    except Exception:
+      if reserved_size:
+        releaseRamDirectory(directory, reserved_size)
+      raise
+    self._release = weakref.finalize(self, releaseRamDirectory, directory, reserved_size) if reserved_size else None
+
+  def cleanup(self):
+    try:
+      super().cleanup()
+    finally:
+      if self._release is not None:
+        self._release()
+
+def tmpDir(estimated_size = None):
+  """
+  Creates a secure temporary directory for computation files, see setTmpDir
+  estimated_size is the size of the files expected in it, see estimateIntermediateSize
+  """
+  directory = None
+  reserved_size = 0
+  if tmp_dir == "auto":
+    size = estimated_size if estimated_size is not None else DEFAULT_INTERMEDIATE_SIZE
+    directory = ramDirectory(size)
+    if directory is not None:
+      reserved_size = size
+  elif tmp_dir != "default":
+    directory = tmp_dir
+  return WorkDirectory(directory, reserved_size)
 
 def tmpFile(suffix, prefix="BooleanMeshCompute", tmp_path= None):
   """ Generates a temporary file path within the provided directory """
@@ -65,31 +249,164 @@ def tmpFile(suffix, prefix="BooleanMeshCompute", tmp_path= None):
   return tempfile.NamedTemporaryFile(suffix=suffix, prefix=prefix, dir=tmp_path, delete=False).name
 
 
-def exportToObj(source, tmp_path):
-  """ Converts a SMESH object or a file path into an obj file """
-  obj_file = tmpFile(".obj", tmp_path=tmp_path)
-  stl_tmp = tmpFile(".stl", tmp_path=tmp_path)
+def getSmeshArrays(source):
+  """
+  Gets the surface of a SMESH object as (vertices, faces) arrays
+  The mesh is taken in memory through MEDCoupling: no file is written and quadrangles are split in triangles
+  """
+  if not hasattr(source, "ExportMEDCoupling"):
+    # CORBA mesh: wrap it to get the in memory export of smeshBuilder
+    source = smeshBuilder.New().Mesh(source)
+  file_mesh = source.ExportMEDCoupling().getMeshes()[0]
+  # relative level of the 2D elements, e.g. -1 for a mesh with volumes
+  level = 2 - file_mesh.getMeshDimension()
+  if level not in file_mesh.getNonEmptyLevels():
+    raise ValueError("The mesh has no surface elements")
+  umesh = file_mesh.getMeshAtLevel(level)
+  faces = facesFromNodalConnectivity(umesh.getNodalConnectivity().toNumPyArray(),
+                                     umesh.getNodalConnectivityIndex().toNumPyArray())
+  return compactVertices(umesh.getCoords().toNumPyArray(), faces)
+
+def setOperandCacheSize(size_mb):
+  """ Sets the size cap in MB of the cache of prepared operands, 0 disables the cache """
+  operand_cache.max_size = int(size_mb * 1024 * 1024)
+  if operand_cache.enabled():
+    operand_cache.evict()
+
+def clearOperandCache():
+  """ Removes all the prepared operands from the cache """
+  operand_cache.clear()
+
+def setResultCacheSize(size_mb):
+  """ Sets the size cap in MB of the cache of boolean results, 0 disables the cache """
+  result_cache.max_size = int(size_mb * 1024 * 1024)
+  if result_cache.enabled():
+    result_cache.evict()
+
+def clearResultCache():
+  """ Removes all the boolean results from the cache """
+  result_cache.clear()
+
+def setEngineServers(*algos):
+  """
+  Runs the engines of algos as resident servers started once and restarted when they die or are killed
+  Only CGAL, IGL and VTK have a server mode, the other engines keep one process per operation
+  setEngineServers() goes back to one process per operation for all the engines
+  """
+  mesh_boolean_utils.setEngineServers(BooleanMeshAlgorithm(algo).value for algo in algos)
+
+def operandKey(source):
+  """ Cache key of an operand: hash of its geometry for SMESH objects, path, modification time and size for files """
+  if hasattr(source, "ExportSTL"):
+    return arraysKey(*getSmeshArrays(source))
+  return fileKey(str(source))
+
+def invalidateResult(operator_name, mesh_left, mesh_right, algo):
+  """ Removes the cached result of one boolean operation, the next call runs the engine again """
+  key = resultKey(operandKey(getMeshObject(mesh_left)), operandKey(getMeshObject(mesh_right)),
+                  operator_name, algo.value, engineVersion(algo))
+  result_cache.remove(key, "med")
+  result_cache.remove(key, engineModule(algo).RESULT_FORMAT)
+
+def exportMesh(source, tmp_path, mesh_format="obj", worker=None):
+  """ Converts a SMESH object or a file path into a file of the given format (obj, off or ply) """
+  mesh_file, _ = _exportMesh(source, tmp_path, mesh_format, worker=worker)
+  return mesh_file
+
+def _exportMesh(source, tmp_path, mesh_format, worker=None):
+  """
+  Exports the operand, returns the file and the cache key of the operand (None if it has no key)
+  Prepared files are cached: by geometry hash for SMESH objects, by path, modification time and size for files
+  """
+  mesh_file = tmpFile("." + mesh_format, tmp_path=tmp_path)
+
+  # Operand already read by the checks: written from its arrays
+  if isinstance(source, PreparedOperand):
+    with timedStage("export"):
+      if source.key and operand_cache.fetch(source.key, mesh_format, mesh_file):
+        print(f"Operand taken from the cache: {source.key}")
+        return mesh_file, source.key
+      writeMesh(mesh_file, *source.arrays)
+      if source.key:
+        operand_cache.put(source.key, mesh_format, mesh_file)
+    return mesh_file, source.key
 
   #Smesh Object
   if hasattr(source, "ExportSTL"):
+    with timedStage("export"):
+      try:
+        vertices, faces = getSmeshArrays(source)
+      except Exception as e: # pylint: disable=broad-exception-caught
+        # MEDCoupling not available or unsupported elements: export through a STL file
+        print(f"Direct export failed ({e}), using ExportSTL")
+      else:
+        key = arraysKey(vertices, faces)
+        if operand_cache.fetch(key, mesh_format, mesh_file):
+          print(f"Operand taken from the cache: {key}")
+          return mesh_file, key
+        writeMesh(mesh_file, vertices, faces)
+        operand_cache.put(key, mesh_format, mesh_file)
+        return mesh_file, key
+      stl_tmp = tmpFile(".stl", tmp_path=tmp_path)
+      try:
+        source.ExportSTL(stl_tmp, False)
+      except Exception as e:
+        raise RuntimeError(f"Mesh export failed: {e}") from e
     try:
-      source.ExportSTL(stl_tmp, False)
-      meshIOConvert(stl_tmp, obj_file)
-      return obj_file
+      with timedStage("conversion"):
+        meshIOConvert(stl_tmp, mesh_file, worker=worker)
+      return mesh_file, None
     except Exception as e:
       raise RuntimeError(f"Mesh export failed: {e}") from e
 
   # if the source is already a file path
-  try:
-    # always convert to stl, as some elements types are not available in obj format
-    # converting to stl discard other elements than triangles (and other dimension than 2)
-    # BE CAREFUL: converting with meshIO does not split quadrangles in triangles
-    # whereas SMESH's ExportSTL automatically split quadrangles in triangles
-    meshIOConvert(str(source), stl_tmp)
-    meshIOConvert(stl_tmp, obj_file)
-    return obj_file
-  except Exception as e:
-    raise RuntimeError(f"Conversion to OBJ failed: {e}") from e
+  with timedStage("conversion"):
+    key = fileKey(str(source))
+    if operand_cache.fetch(key, mesh_format, mesh_file):
+      print(f"Operand taken from the cache: {source}")
+      return mesh_file, key
+    stl_tmp = tmpFile(".stl", tmp_path=tmp_path)
+    try:
+      # always convert to stl, as some elements types are not available in obj format
+      # converting to stl discard other elements than triangles (and other dimension than 2)
+      # BE CAREFUL: converting with meshIO does not split quadrangles in triangles
+      # whereas SMESH's ExportSTL automatically split quadrangles in triangles
+      meshIOConvert(str(source), stl_tmp, worker=worker)
+      meshIOConvert(stl_tmp, mesh_file, worker=worker)
+    except Exception as e:
+      raise RuntimeError(f"Conversion to {mesh_format.upper()} failed: {e}") from e
+    operand_cache.put(key, mesh_format, mesh_file)
+  return mesh_file, key
+
+def _vtkOperand(source, tmp_path, worker=None):
+  """
+  Operand of the in-process VTK engine and its cache key
+  SMESH objects and prepared operands are given as arrays without any file,
+  files are exported like for the other engines
+  """
+  if isinstance(source, PreparedOperand):
+    return exec_vtk.PolyDataOperand(source.arrays, source.key), source.key
+  if hasattr(source, "ExportSTL"):
+    try:
+      with timedStage("export"):
+        vertices, faces = getSmeshArrays(source)
+        key = arraysKey(vertices, faces)
+    except Exception as e: # pylint: disable=broad-exception-caught
+      print(f"Direct export failed ({e}), using a file")
+    else:
+      return exec_vtk.PolyDataOperand((vertices, faces), key), key
+  mesh_file, key = _exportMesh(source, tmp_path, exec_vtk.INPUT_FORMAT, worker=worker)
+  return exec_vtk.PolyDataOperand(mesh_file, key), key
+
+def setVTKInProcess(enabled):
+  """ Runs VTK in this process (default) or in a run_vtk.py process per operation """
+  exec_vtk.in_process = bool(enabled)
+  if not enabled:
+    exec_vtk.ClearCleanedInputs()
+
+def exportToObj(source, tmp_path, worker=None):
+  """ Converts a SMESH object or a file path into an obj file """
+  return exportMesh(source, tmp_path, "obj", worker=worker)
 
 # Algorithms aliases for easier access
 CGAL = BooleanMeshAlgorithm.CGAL
@@ -98,22 +415,24 @@ VTK = BooleanMeshAlgorithm.VTK
 IRMB = BooleanMeshAlgorithm.IRMB
 CORK = BooleanMeshAlgorithm.CORK
 MCUT = BooleanMeshAlgorithm.MCUT
+RACE = BooleanMeshAlgorithm.RACE
+AUTO = BooleanMeshAlgorithm.AUTO
 
 #Divide the jobs that loadResult does in mesh_boolean_dialog.py
-def convertAlgorithmResult(algo, med_file):
+def convertAlgorithmResult(algo, med_file, worker=None):
   """ Converts the output into a proper MED file that can be read by SALOME """
   if algo == CGAL:
-    exec_cgal.convert_result(med_file)
+    exec_cgal.convert_result(med_file, worker=worker)
   elif algo == MCUT:
-    exec_mcut.convert_result(med_file)
+    exec_mcut.convert_result(med_file, worker=worker)
   elif algo == CORK:
-    exec_cork.convert_result(med_file)
+    exec_cork.convert_result(med_file, worker=worker)
   elif algo == IRMB:
-    exec_irmb.convert_result(med_file)
+    exec_irmb.convert_result(med_file, worker=worker)
   elif algo == IGL:
-    exec_libigl.convert_result(med_file)
+    exec_libigl.convert_result(med_file, worker=worker)
   elif algo == VTK:
-    exec_vtk.convert_result(med_file)
+    exec_vtk.convert_result(med_file, worker=worker)
 
 
 def resetCounter():
@@ -137,7 +456,82 @@ def importMedToSmesh(med_file, operator_name = None, name = None):
     raise RuntimeError("MED result file not found or empty")
 
   mesh = meshes[0]
+  nameResultMesh(mesh, operator_name = operator_name, name = name)
+  return mesh
 
+# Results up to this number of faces are built in SMESH node by node, the larger ones are imported from a MED file
+DIRECT_IMPORT_MAX_FACES = int(os.getenv("MESHBOOLEAN_DIRECT_IMPORT_FACES", "20000"))
+
+def importArraysToSmesh(vertices, faces, operator_name = None, name = None):
+  """
+  Builds a result mesh in the study from (vertices, faces) arrays
+  Small results are created node by node and face by face without any file, the larger ones go through
+  a MED file written in this process by MEDCoupling, or by meshio when MEDCoupling is not available
+  """
+  if len(faces) > DIRECT_IMPORT_MAX_FACES:
+    with tmpDir(len(faces) * INTERMEDIATE_BYTES_PER_FACE) as tmp_path:
+      med_file = os.path.join(tmp_path, "result.med")
+      try:
+        writeMedArrays(med_file, vertices, faces)
+      except ImportError as e:
+        print(f"MEDCoupling not available ({e}), the result is converted with meshio")
+        ply_file = os.path.join(tmp_path, "result.ply")
+        writePly(ply_file, vertices, faces)
+        meshIOConvert(ply_file, med_file)
+      return importMedToSmesh(med_file, operator_name = operator_name, name = name)
+
+  vertices, faces = compactVertices(np.asarray(vertices), faces)
+  mesh = smeshBuilder.New().Mesh()
+  node_ids = np.array([mesh.AddNode(x, y, z) for x, y, z in vertices.tolist()], dtype=np.int64)
+  for face in node_ids[faces].tolist():
+    mesh.AddFace(face)
+  nameResultMesh(mesh, operator_name = operator_name, name = name)
+  return mesh
+
+def writeMedArrays(med_file, vertices, faces):
+  """ Writes (vertices, faces) as a MED file of triangles with MEDCoupling, in this process """
+  from medcoupling import MEDCouplingUMesh, MEDFileUMesh, DataArrayDouble, DataArrayIdType, MEDCouplingSizeOfIDs
+  id_type = np.int64 if MEDCouplingSizeOfIDs() == 64 else np.int32
+  umesh = MEDCouplingUMesh("result", 2)
+  umesh.setCoords(DataArrayDouble(np.ascontiguousarray(vertices, dtype=np.float64)))
+  # each cell is [type, node_1, node_2, node_3]
+  connectivity = np.empty((len(faces), 4), dtype=id_type)
+  connectivity[:, 0] = NORM_TRI3
+  connectivity[:, 1:] = faces
+  index = np.arange(0, 4 * len(faces) + 1, 4, dtype=id_type)
+  umesh.setConnectivity(DataArrayIdType(connectivity.ravel()), DataArrayIdType(index), True)
+  file_mesh = MEDFileUMesh.New()
+  file_mesh.setMeshAtLevel(0, umesh)
+  file_mesh.write(med_file, 2)
+
+def resultArrays(result_file, worker=None):
+  """
+  (vertices, faces) of a result file: MED or the format of the engine, read without meshio
+  Engine files mesh_boolean_io can't read go through a MED file converted by meshio
+  """
+  if not result_file.lower().endswith(".med"):
+    try:
+      return readMesh(result_file)
+    except ValueError as e:
+      print(f"Result read through meshio: {e}")
+      med_file = os.path.splitext(result_file)[0] + ".med"
+      meshIOConvert(result_file, med_file, worker=worker)
+      result_file = med_file
+  try:
+    return readMedArrays(result_file)
+  except ValueError:
+    # no surface elements
+    return np.zeros((0, 3)), np.zeros((0, 3), dtype=np.int64)
+
+def createEmptyMesh(operator_name = None, name = None):
+  """ Creates an empty result mesh in the study, named like the imported results """
+  mesh = smeshBuilder.New().Mesh()
+  nameResultMesh(mesh, operator_name = operator_name, name = name)
+  return mesh
+
+def nameResultMesh(mesh, operator_name = None, name = None):
+  """ Names a result mesh: name if given, else the operator and its counter """
+  smesh = smeshBuilder.New()
   #The user can set the name manually
   if name :
     smesh.SetName(mesh, name)
@@ -163,8 +557,6 @@ def importMedToSmesh(med_file, operator_name = None, name = None):
   except Exception:
     pass
 
-  return mesh
-
 def getMeshIDOrFilename(mesh):
   """Get the mesh id in the object browser or its filename.
      Useful for python dump to work in both cases.
@@ -183,55 +575,386 @@ def getMeshObject(mesh):
     mesh = mesh.GetMesh()
   return mesh
 
-def booleanOperation(operator_name, mesh_left, mesh_right, algo, name = None, worker=None):
+def operandSummary(source, mesh_file = None, read_files = True):
   """
-  Main function for boolean operations
-  Handles temporary directory lifecycle, file conversion, execution and SALOME import
+  Number of faces and bounding box of an operand, from its arrays, from SMESH or from its prepared file
+  With read_files=False, None when only the file could tell
   """
-  global import_Dump_Done
-  smesh_builder = smeshBuilder.New()
-  # Stop the dump recording before the imports to avoid having useless code in the python dump
-  smesh_builder.PausePythonDumpRecording()
+  if isinstance(source, PreparedOperand):
+    return meshArraysSummary(*source.arrays)
+  if hasattr(source, "NbFaces"):
+    bounds = smeshBuilder.New().BoundingBox([source])
+    return source.NbFaces(), (bounds[:3], bounds[3:])
+  if isinstance(mesh_file, exec_vtk.PolyDataOperand):
+    mesh_file = mesh_file.data
+  if mesh_file is not None and not isinstance(mesh_file, str):
+    return meshArraysSummary(*mesh_file)
+  if not read_files or mesh_file is None:
+    return None
+  return meshFileSummary(mesh_file)
 
-  # We now take care of everything related to temporary files management in this fonction rather than in the GUI
+def runFeatures(mesh_left, mesh_right, file_left = None, file_right = None, read_files = True):
+  """
+  Features of an operation used by the history: total number of faces and bounding boxes overlap
+  With read_files=False, None when an operand is only known by its file
+  """
+  summary_left = operandSummary(mesh_left, file_left, read_files)
+  summary_right = operandSummary(mesh_right, file_right, read_files)
+  if summary_left is None or summary_right is None:
+    return None
+  (faces_left, box_left), (faces_right, box_right) = summary_left, summary_right
+  return faces_left + faces_right, boxesOverlap(box_left, box_right)
+
+def recordRun(algo, operator_name, features, seconds, success):
+  """ Adds a run to the history used by AUTO """
+  if features is not None:
+    faces, overlap = features
+    run_history.record(algo.value, operator_name, faces, overlap, seconds, success)
+
+def _runFeatures(mesh_left, mesh_right, file_left, file_right):
+  """
+  runFeatures of a run to record, None if the operands can't be summarized: the run is then not recorded
+  Only the features in hand (arrays, SMESH objects) are used: operand files are not read again for the history
+  """
   try:
-    with tmpDir() as tmp_path:
-      # the with assures that the directory is deleted after the compute or if there is an exception
-      print(f"Temporary directory created: {tmp_path}")
-      # Convert left and right
+    return runFeatures(mesh_left, mesh_right, file_left, file_right, read_files = False)
+  except Exception as e: # pylint: disable=broad-exception-caught
+    print(f"Run not recorded in the history: {e}")
+    return None
 
-      objL = exportToObj(mesh_left, tmp_path)
-      objR = exportToObj(mesh_right, tmp_path)
+def chooseEngine(operator_name, mesh_left, mesh_right, tmp_path, algos = None, worker=None):
+  """
+  Engine predicted to be the fastest among the ones likely to succeed (default: the installed engines)
+  The prediction uses the operands face count and bounding boxes overlap, and the history of the runs
+  """
+  algos = algos or availableEngines()
+  if not algos:
+    raise RuntimeError("No engine available")
+  features = runFeatures(mesh_left, mesh_right, read_files = False)
+  if features is None:
+    # file operands are summarized from their prepared PLY files, cached for the engine
+    file_left = exportMesh(mesh_left, tmp_path, "ply", worker=worker)
+    file_right = exportMesh(mesh_right, tmp_path, "ply", worker=worker)
+    features = runFeatures(mesh_left, mesh_right, file_left, file_right)
+  faces, overlap = features
+  engine = run_history.choose([algo.value for algo in algos], operator_name, faces, overlap)
+  print(f"Engine chosen for {faces} faces with an overlap of {overlap:.2f}: {engine}")
+  return BooleanMeshAlgorithm(engine)
 
-      med_result = tmpFile(".med", tmp_path=tmp_path)
+def setRunHistory(path):
+  """ Moves the history of the runs used by AUTO to another database file """
+  run_history.reopen(path)
+
+def clearRunHistory():
+  """ Forgets the history of the runs used by AUTO """
+  run_history.clear()
+
+# Check of the operands run before the engines, MESHBOOLEAN_FAST_PATH:
+# 'aabb' compares their axis-aligned boxes and faces, 'obb' also their oriented boxes, 'off' always runs the engine
+fast_path = os.getenv("MESHBOOLEAN_FAST_PATH", "aabb").lower()
+
+def setFastPath(mode):
+  """
+  Selects the check answering the operations whose operands surfaces don't meet without any engine
+  (disjoint operands or one operand inside the other): 'aabb', 'obb' (slower, tighter) or 'off'
+  """
+  global fast_path
+  if mode not in ("aabb", "obb", "off"):
+    raise ValueError(f"Unknown fast path mode {mode}")
+  fast_path = mode
+
+def operandArrays(source, tmp_path, worker=None):
+  """ (vertices, faces) of an operand: SMESH objects are read in memory, files from their prepared PLY file """
+  if hasattr(source, "ExportSTL"):
+    try:
+      with timedStage("export"):
+        return getSmeshArrays(source)
+    except Exception as e: # pylint: disable=broad-exception-caught
+      print(f"Direct export failed ({e}), using a file")
+  mesh_file = exportMesh(source, tmp_path, "ply", worker=worker)
+  with timedStage("export"):
+    return readPly(mesh_file)
+
+class PreparedOperand:
+  """
+  Operand read once for the checks run before the engine: its (vertices, faces) arrays and its cache key
+  The engine input is written from the arrays: the operand is neither exported nor hashed again
+  """
+  def __init__(self, source, arrays, key):
+    self.source = source
+    self.arrays = arrays
+    self.key = key
+
+def prepareOperand(source, tmp_path, worker=None):
+  """ PreparedOperand of a SMESH object or a mesh file, keyed like the operand cache """
+  arrays = operandArrays(source, tmp_path, worker=worker)
+  if hasattr(source, "ExportSTL"):
+    with timedStage("export"):
+      key = arraysKey(*arrays)
+  else:
+    key = fileKey(str(source))
+  return PreparedOperand(source, arrays, key)
+
+def _operandsArrays(mesh_left, mesh_right, tmp_path, worker=None):
+  """
+  PreparedOperand of both operands for the checks run before the engine, the engine input is written from them
+  None if no check is enabled or they can't be read
+  """
+  if fast_path == "off" and not localized and precheck == "off":
+    return None
+  try:
+    return prepareOperand(mesh_left, tmp_path, worker=worker), prepareOperand(mesh_right, tmp_path, worker=worker)
+  except Exception as e: # pylint: disable=broad-exception-caught
+    print(f"Operands checks skipped: {e}")
+    return None
+
+# Validity check of the operands before any engine, MESHBOOLEAN_PRECHECK: 'basic' (default) rejects the open,
+# non-manifold or badly oriented operands, 'full' also their self-intersections, 'warn' only reports the defects
+# found by 'basic' and runs the engine anyway, 'off' skips it. Degenerate faces are only reported
+precheck = os.getenv("MESHBOOLEAN_PRECHECK", "basic").lower()
+
+def setPrecheck(mode):
+  """
+  Selects the validity check of the operands run before the engines: 'basic' (default, rejects the open,
+  non-manifold or badly oriented operands), 'full' (slower, also rejects the self-intersecting ones),
+  'warn' (reports the defects and runs the engine anyway) or 'off'
+  """
+  global precheck
+  if mode not in ("basic", "full", "warn", "off"):
+    raise ValueError(f"Unknown precheck mode {mode}")
+  precheck = mode
+
+def clearVerdicts():
+  """ Forgets the verdicts of the operands already checked """
+  verdict_cache.clear()
+
+def _checkOperands(operands):
+  """ Raises InvalidOperand if an operand would make the engines fail, the verdicts are cached by operand hash """
+  if operands is None or precheck == "off":
+    return
+  with timedStage("precheck"):
+    for side, operand in zip(("left", "right"), operands):
+      defects = checkOperand(*operand.arrays, self_intersections = precheck == "full", key = operand.key)
+      if defects.valid():
+        continue
+      if precheck != "warn" and defects.fatal():
+        raise InvalidOperand(side, defects)
+      print(f"The {side} operand may make the engine fail: {defects.describe()}")
 
-      # call runAlgo
-      process = runAlgo(algo,
-                        operator_name.lower(),
-                        objL,
-                        objR,
-                        med_result
-        )
-      if worker is not None:
-        worker.process = process
-      # Wait the end of the process if there is one
-      if process :
-        rc = process.wait()
-        if rc != 0:
-          if worker and not worker._isRunning:
-            print("Process killed by user")
-            return None
-          raise RuntimeError("Boolean operation ended in error")
-
-      if worker and not worker._isRunning:
-        return None
-
-      #Convert the result
-      convertAlgorithmResult(algo, med_result)
-
-      #Import in SALOME
-      result_mesh = importMedToSmesh(med_result, operator_name = operator_name, name = name)
+def _trivialResult(operator_name, operands):
+  """
+  (vertices, faces) of the result when the surfaces of the operands don't meet, None when an engine is needed
+  Union, intersection and difference of disjoint or nested operands are the operands themselves, or nothing
+  """
+  if operands is None or fast_path == "off":
+    return None
+  left, right = operands[0].arrays, operands[1].arrays
+  with timedStage("precheck"):
+    relation = operandsRelation(left, right, oriented = fast_path == "obb")
+  if relation is None:
+    return None
+  print(f"Operands surfaces don't meet ({relation}): the {operator_name} is computed without engine")
+  return trivialResult(relation, operator_name, left, right)
+
+# Shells of an operand away from the other operand skip the engine when they hold at least this part of the faces
+LOCALIZED_MIN_FRACTION = 0.1
+
+# Localized operations, MESHBOOLEAN_LOCALIZED=0 sends the whole operands to the engines
+localized = os.getenv("MESHBOOLEAN_LOCALIZED", "1") != "0"
+
+def setLocalized(enabled):
+  """
+  Sends to the engine only the shells of the operands that may meet the other operand (default),
+  the other shells are added to its result as they are
+  """
+  global localized
+  localized = bool(enabled)
+
+def _localizedOperands(operator_name, operands):
+  """
+  PreparedOperand of the shells of the operands the engine must see, and the part of the result made of the
+  other shells. The operands are None when no shell needs the engine, None when the whole operands go to the engine
+  """
+  if operands is None or not localized:
+    return None
+  with timedStage("precheck"):
+    engine_left, engine_right, skipped_left, skipped_right = localizeOperands(operands[0].arrays,
+                                                                              operands[1].arrays)
+  skipped = len(skipped_left[1]) + len(skipped_right[1])
+  total = len(operands[0].arrays[1]) + len(operands[1].arrays[1])
+  if skipped < LOCALIZED_MIN_FRACTION * total:
+    return None
+  skipped_result = trivialResult(DISJOINT, operator_name, skipped_left, skipped_right)
+  if len(engine_left[1]) == 0:
+    # no shell box touches the other operand: the skipped shells are the whole operands
+    return None, None, skipped_result
+  print(f"{skipped} of {total} faces are away from the other operand, the engine gets {total - skipped} faces")
+  with timedStage("export"):
+    # keyed by their geometry: the result of the same shells is found in the cache
+    left = PreparedOperand(operands[0].source, engine_left, arraysKey(*engine_left))
+    right = PreparedOperand(operands[1].source, engine_right, arraysKey(*engine_right))
+  return left, right, skipped_result
+
+def setResourceLimits(memory_mb = None, cpu_seconds = None, wall_seconds = None):
+  """
+  Default limits of the engine runs, None or 0 removes a limit
+  memory_mb caps the resident memory of the engine, cpu_seconds its CPU time and wall_seconds its elapsed time.
+  An engine going over a limit is killed and the operation raises ResourceLimitExceeded.
+  The memory and CPU limits only apply to engines run as processes, not in-process or as servers.
+  """
+  limits = mesh_boolean_utils.default_limits
+  limits.memory_mb = memory_mb or None
+  limits.cpu_seconds = cpu_seconds or None
+  limits.wall_seconds = wall_seconds or None
+  return limits
+
+def runEngine(algo, operator_name, file_left, file_right, med_result, worker=None, convert=True):
+  """
+  Runs the engine on the prepared operands and converts its result into med_result
+  With convert=False the result stays in the engine format, see engineResultFile
+  Returns False if the computation was stopped by the user
+  Raises ResourceLimitExceeded if the engine went over the limits of this thread (see engineLimits)
+  """
+  limits = currentLimits()
+  if worker and not worker._isRunning:
+    return False
+  with timedStage("engine"):
+    # call runAlgo
+    process = runAlgo(algo,
+                      operator_name.lower(),
+                      file_left,
+                      file_right,
+                      med_result
+      )
+    if worker is not None:
+      worker.process = process
+      # a stop() while runAlgo was launching the engine found no process to kill
+      if not worker._isRunning and process:
+        process.kill()
+    # engines run in-process or by a server only get the wall-clock limit
+    timer = None
+    if process and limits.wall_seconds and not isinstance(process, EngineProcess):
+      timer = watchWallClock(process, limits.wall_seconds)
+    # Wait the end of the process if there is one
+    try:
+      rc = process.wait() if process else 0
+    finally:
+      if timer is not None:
+        timer.cancel()
+  usage = getattr(process, "usage", None)
+  if usage is not None:
+    logger.info("Engine %s: user %.3f s, system %.3f s, max RSS %.1f MB", algo.value,
+                usage.user_cpu, usage.system_cpu, usage.max_rss_mb)
+    timings = getattr(_current, "timings", None)
+    if timings is not None:
+      timings.usage = usage
+  limit = getattr(process, "limit_exceeded", None)
+  if limit is not None:
+    value = {"memory" : limits.memory_mb, "cpu" : limits.cpu_seconds, "wall" : limits.wall_seconds}[limit]
+    raise ResourceLimitExceeded(limit, value, usage)
+  if rc != 0:
+    if worker and not worker._isRunning:
+      print("Process killed by user")
+      return False
+    raise RuntimeError("Boolean operation ended in error")
 
+  if worker and not worker._isRunning:
+    return False
+  if not convert:
+    return True
+
+  #Convert the result
+  try:
+    with timedStage("result_conversion"):
+      convertAlgorithmResult(algo, med_result, worker=worker)
+  except ProcessCancelled:
+    if worker and not worker._isRunning:
+      print("Conversion killed by user")
+      return False
+    raise
+  return True
+
+def computeBooleanResult(operator_name, mesh_left, mesh_right, algo, tmp_path, worker=None, convert=True):
+  """
+  Computes a boolean operation up to its MED result file in tmp_path, without touching the study
+  Handles file conversion, the result cache and the execution of the engine
+  With convert=False the result file may stay in the format of the engine, see resultArrays
+  Returns None if the computation was stopped by the user
+  """
+  # Convert left and right
+  try:
+    if algo == BooleanMeshAlgorithm.VTK and exec_vtk.in_process:
+      # VTK runs in this process: SMESH operands are handed over as arrays
+      objL, keyL = _vtkOperand(mesh_left, tmp_path, worker=worker)
+      objR, keyR = _vtkOperand(mesh_right, tmp_path, worker=worker)
+    else:
+      # export in the format advertised by the engine, binary when possible
+      mesh_format = engineInputFormat(algo)
+      objL, keyL = _exportMesh(mesh_left, tmp_path, mesh_format, worker=worker)
+      objR, keyR = _exportMesh(mesh_right, tmp_path, mesh_format, worker=worker)
+  except RuntimeError:
+    if worker and not worker._isRunning:
+      print("Conversion killed by user")
+      return None
+    raise
+
+  med_result = tmpFile(".med", tmp_path=tmp_path)
+  engine_result = engineResultFile(algo, med_result)
+  result_format = engineModule(algo).RESULT_FORMAT
+
+  # same operands, operator and engine build: reuse the stored result, MED or in the engine format
+  result_key = None
+  if keyL and keyR:
+    result_key = resultKey(keyL, keyR, operator_name, algo.value, engineVersion(algo))
+  if result_key and result_cache.fetch(result_key, "med", med_result):
+    print("Result taken from the cache")
+    return med_result
+  if result_key and result_cache.fetch(result_key, result_format, engine_result):
+    print("Result taken from the cache")
+    if not convert:
+      return engine_result
+    with timedStage("result_conversion"):
+      convertAlgorithmResult(algo, med_result, worker=worker)
+    return med_result
+
+  features = _runFeatures(mesh_left, mesh_right, objL, objR)
+  start = time.perf_counter()
+  try:
+    if not runEngine(algo, operator_name, objL, objR, med_result, worker=worker, convert=convert):
+      return None
+  except Exception:
+    recordRun(algo, operator_name, features, time.perf_counter() - start, False)
+    raise
+  recordRun(algo, operator_name, features, time.perf_counter() - start, True)
+  result_file = med_result if convert else engine_result
+  if result_key:
+    result_cache.put(result_key, "med" if convert else result_format, result_file)
+  return result_file
+
+def importBooleanResult(result, operator_name, mesh_left, mesh_right, algo, name = None):
+  """
+  Imports the result in the study and records the operation in the python dump
+  result is a MED file, a result file in the format of the engine or (vertices, faces) arrays,
+  None gives an empty mesh. The python dump recording must be paused by the caller, see _pausedPythonDump
+  """
+  global import_Dump_Done
+  smesh_builder = smeshBuilder.New()
+
+  if isinstance(result, str) and not result.lower().endswith(".med"):
+    with timedStage("result_conversion"):
+      result = resultArrays(result)
+  # operations run on several threads import their results and name them one at a time
+  with _study_lock:
+    #Import in SALOME, MED results through a file and the others from their arrays
+    with timedStage("import"):
+      if result is None:
+        result_mesh = createEmptyMesh(operator_name = operator_name, name = name)
+      elif isinstance(result, str):
+        result_mesh = importMedToSmesh(result, operator_name = operator_name, name = name)
+      else:
+        result_mesh = importArraysToSmesh(*result, operator_name = operator_name, name = name)
+
+    with timedStage("dump"):
       #Add to python dump if not already done
       if not import_Dump_Done:
         smesh_builder.AddToPythonScript("from meshbooleanplugin import mesh_boolean_api")
@@ -249,12 +972,675 @@ def booleanOperation(operator_name, mesh_left, mesh_right, algo, name = None, wo
       cmd = f"{result_id} = mesh_boolean_api.{operation_name}({left_id}, {right_id}, algo = {algo_name})"
       #Add the command line to the dump study
       smesh_builder.AddToPythonScript(cmd)
+  return result_mesh
+
+@contextmanager
+def _pausedPythonDump():
+  """
+  Imports in the study one at a time, with the python dump recording paused to keep useless code out of it
+  The recording is only paused during the import: the study work done meanwhile by other threads is recorded
+  """
+  with _study_lock:
+    smesh_builder = smeshBuilder.New()
+    smesh_builder.PausePythonDumpRecording()
+    try:
+      yield
+    finally:
+      # Resume the recording of the python dump in any case
+      smesh_builder.ResumePythonDumpRecording()
+
+def booleanOperation(operator_name, mesh_left, mesh_right, algo, name = None, worker=None, timings=None,
+                     limits=None):
+  """
+  Main function for boolean operations
+  Handles temporary directory lifecycle, file conversion, execution and SALOME import
+  The time spent in each stage is added to timings (a StageTimings) and logged
+  limits (a ResourceLimits) replaces the default limits of the engine, see setResourceLimits
+  """
+  timings = timings if timings is not None else StageTimings()
+  with timedOperation(timings), engineLimits(limits):
+    result_mesh = _booleanOperation(operator_name, mesh_left, mesh_right, algo, name = name, worker = worker)
+  logger.info("Stage timings of %s: %s (total %.3f s)", operator_name, timings, timings.total())
+  return result_mesh
+
+def _booleanOperation(operator_name, mesh_left, mesh_right, algo, name = None, worker=None):
+  # We now take care of everything related to temporary files management in this fonction rather than in the GUI
+  with tmpDir(estimateIntermediateSize(mesh_left, mesh_right)) as tmp_path:
+    # the with assures that the directory is deleted after the compute or if there is an exception
+    print(f"Temporary directory created: {tmp_path}")
+
+    algo, result = _operationResult(operator_name, mesh_left, mesh_right, algo, tmp_path, worker=worker)
+    if result is None:
+      return None
+    with _pausedPythonDump():
+      result_mesh = importBooleanResult(result, operator_name, mesh_left, mesh_right, algo, name = name)
+
+    print("End of compute, temporary directory will be erased")
+    return result_mesh
+
+def _operationResult(operator_name, mesh_left, mesh_right, algo, tmp_path, worker=None):
+  """
+  Computes a boolean operation up to the result to import, without touching the study
+  Returns (engine used, result file or (vertices, faces) arrays), the result is None if the worker was stopped
+  """
+  # operands whose surfaces don't meet don't need any engine,
+  # the shells of an operand away from the other one are left out of the engine
+  operands = _operandsArrays(mesh_left, mesh_right, tmp_path, worker=worker)
+  _checkOperands(operands)
+  trivial = _trivialResult(operator_name, operands)
+  local = _localizedOperands(operator_name, operands) if trivial is None else None
+  if local is not None and local[0] is None:
+    trivial = local[2]
+  if worker and not worker._isRunning:
+    return algo, None
+  if trivial is not None:
+    return algo, trivial
+
+  # the engine input is written from the arrays already read
+  if local is not None:
+    engine_left, engine_right = local[0], local[1]
+  elif operands is not None:
+    engine_left, engine_right = operands
+  else:
+    engine_left, engine_right = mesh_left, mesh_right
+  # in race mode algo becomes the winning engine, recorded in the python dump
+  # the result stays in the engine format: it is imported from its arrays
+  algo, result = _computeResult(operator_name, engine_left, engine_right, algo, tmp_path, worker=worker,
+                                convert=False)
+  if result is not None and local is not None and len(local[2][1]):
+    # stitch the skipped shells back: they don't touch the engine result
+    with timedStage("result_conversion"):
+      result = concatenateMeshes(resultArrays(result, worker=worker), local[2])
+  return algo, result
+
+# Status of the jobs of a BooleanJobQueue
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+class BooleanJob:
+  """
+  One operation of a batch: the result mesh, or the error raised by the operation, is set once it is done
+  A job follows the worker protocol of booleanOperation (process and _isRunning), stop() cancels it
+  status, start_time and end_time are kept up to date by BooleanJobQueue
+  """
+  def __init__(self, operator_name, mesh_left, mesh_right, algo, name = None, limits = None):
+    self.operator_name = operator_name
+    self.mesh_left = getMeshObject(mesh_left)
+    self.mesh_right = getMeshObject(mesh_right)
+    self.algo = algo
+    self.name = name
+    self.result = None
+    self.error = None
+    self.process = None
+    self._isRunning = True
+    self.timings = StageTimings()
+    self.limits = limits
+    self.status = JOB_QUEUED
+    self.start_time = None
+    self.end_time = None
+
+  def elapsed(self):
+    """ Seconds since the job started, up to its end, 0 if it has not started """
+    if self.start_time is None:
+      return 0.0
+    return (self.end_time if self.end_time is not None else time.perf_counter()) - self.start_time
+
+  def stop(self):
+    """ Cancels the job, kills its running engine or conversion """
+    self._isRunning = False
+    if self.process is not None:
+      try:
+        self.process.kill()
+      except Exception: # pylint: disable=broad-exception-caught
+        pass
+
+def _importJobResult(job, algo, result):
+  """ Imports the computed result of a job, only the import pauses the python dump recording """
+  with _pausedPythonDump(), timedOperation(job.timings):
+    result_mesh = importBooleanResult(result, job.operator_name, job.mesh_left, job.mesh_right, algo,
+                                      name = job.name)
+  logger.info("Stage timings of %s: %s", job.operator_name, job.timings)
+  return result_mesh
+
+def computeBooleanJob(job, tmp_path):
+  """ Computes a job up to the result to import in tmp_path, see _operationResult, without touching the study """
+  with timedOperation(job.timings), engineLimits(job.limits):
+    return _operationResult(job.operator_name, job.mesh_left, job.mesh_right, job.algo, tmp_path, worker = job)
 
-      print("End of compute, temporary directory will be erased")
-      return result_mesh
+def batchBooleanOperation(jobs, max_workers = None):
+  """
+  Runs many independent boolean operations concurrently
+  jobs is a list of BooleanJob or of (operator, left, right, algo[, name[, limits]]) tuples
+  Operands are prepared and engines run on at most max_workers threads (default: number of cores),
+  the results are imported in the study one at a time on the calling thread, in the jobs order
+  Returns the jobs, each one holding its result mesh or its error and its StageTimings
+  """
+  jobs = [job if isinstance(job, BooleanJob) else BooleanJob(*job) for job in jobs]
+  # each directory reserves the files of its own job: the batch reserves the sum of the jobs estimates
+  tmp_dirs = [tmpDir(estimateIntermediateSize(job.mesh_left, job.mesh_right)) for job in jobs]
+  try:
+    with ThreadPoolExecutor(max_workers = max_workers or os.cpu_count()) as pool:
+      futures = [pool.submit(computeBooleanJob, job, tmp_dir.name) for job, tmp_dir in zip(jobs, tmp_dirs)]
+      for job, future, tmp_dir in zip(jobs, futures, tmp_dirs):
+        try:
+          algo, result = future.result()
+          if result is not None:
+            job.result = _importJobResult(job, algo, result)
+        except Exception as e: # pylint: disable=broad-exception-caught
+          print(f"Boolean job {job.operator_name} with {job.algo.value} failed: {e}")
+          job.error = e
+        finally:
+          tmp_dir.cleanup()
   finally:
-    # Resume the recording of the python dump in any case
-    smesh_builder.ResumePythonDumpRecording()
+    for tmp_dir in tmp_dirs:
+      tmp_dir.cleanup()
+  return jobs
+
+# Operations run at once in the background by submitBooleanOperation, MESHBOOLEAN_ASYNC_WORKERS
+async_workers = int(os.getenv("MESHBOOLEAN_ASYNC_WORKERS", "1"))
+_async_executor = None
+_async_lock = threading.Lock()
+
+def setAsyncWorkers(count):
+  """ Sets how many operations submitted with submitBooleanOperation run at once, for the next submissions """
+  global async_workers, _async_executor
+  with _async_lock:
+    async_workers = max(1, int(count))
+    if _async_executor is not None:
+      # the submitted operations still run on the previous threads
+      _async_executor.shutdown(wait=False)
+      _async_executor = None
+
+def _asyncExecutor():
+  global _async_executor
+  with _async_lock:
+    if _async_executor is None:
+      _async_executor = ThreadPoolExecutor(max_workers = async_workers, thread_name_prefix = "BooleanMesh")
+    return _async_executor
+
+class BooleanFuture(Future):
+  """
+  Future of a boolean operation run in the background, its result is the result mesh
+  job is the BooleanJob of the operation, job.timings its StageTimings
+  cancel() also stops a running operation and kills its engine or conversion, result() then raises CancelledError
+  Once the result is being imported in the study cancel() does nothing and returns False
+  """
+  def __init__(self, job):
+    super().__init__()
+    self.job = job
+    self.importing = False
+    self._cancel_lock = threading.Lock()
+
+  def cancel(self):
+    if super().cancel():
+      return True
+    with self._cancel_lock:
+      if self.done() or self.importing:
+        return False
+      self.job.stop()
+      return True
+
+def _runFuture(future):
+  """ Runs the operation of a BooleanFuture on a thread of the executor """
+  if not future.set_running_or_notify_cancel():
+    return
+  job = future.job
+  try:
+    # the engine runs without the study, only the import pauses the python dump
+    with tmpDir(estimateIntermediateSize(job.mesh_left, job.mesh_right)) as tmp_path:
+      algo, result = computeBooleanJob(job, tmp_path)
+      with future._cancel_lock:
+        future.importing = result is not None and job._isRunning
+      if not future.importing:
+        future.set_exception(CancelledError())
+        return
+      result_mesh = _importJobResult(job, algo, result)
+  except Exception as e: # pylint: disable=broad-exception-caught
+    job.error = e
+    future.set_exception(e if job._isRunning else CancelledError())
+    return
+  job.result = result_mesh
+  future.set_result(result_mesh)
+
+def submitBooleanOperation(operator_name, mesh_left, mesh_right, algo, name = None, progress = None, limits = None):
+  """
+  Starts a boolean operation in the background and returns its BooleanFuture at once
+  progress(stage, seconds) is called on the thread of the operation after each stage, see StageTimings
+  The operations run on setAsyncWorkers() threads, one at a time by default
+  """
+  job = BooleanJob(operator_name, mesh_left, mesh_right, algo, name = name, limits = limits)
+  job.timings = StageTimings(callback = progress)
+  future = BooleanFuture(job)
+  _asyncExecutor().submit(_runFuture, future)
+  return future
+
+async def booleanOperationAsync(operator_name, mesh_left, mesh_right, algo, name = None, progress = None,
+                                limits = None):
+  """
+  Awaitable boolean operation, the event loop keeps running while the engine computes
+  Cancelling the awaiting task cancels the BooleanFuture: the engine is killed
+  """
+  future = submitBooleanOperation(operator_name, mesh_left, mesh_right, algo, name = name, progress = progress,
+                                  limits = limits)
+  return await asyncio.wrap_future(future)
+
+# Most jobs of a BooleanJobQueue computing at once
+MAX_RUNNING_JOBS = 32
+
+class BooleanJobQueue:
+  """
+  Boolean jobs computed in the background, at most max_running at once, in the order they were added
+  Nothing happens between two calls to poll(): it starts the waiting jobs and imports the computed results.
+  The imports are done one at a time on the thread calling poll(), the GUI thread in the dialog
+  """
+  def __init__(self, max_running = 1):
+    self.jobs = []
+    self.max_running = 1
+    self.setMaxRunning(max_running)
+    self._running = {}
+    self._pool = None
+
+  def setMaxRunning(self, count):
+    """ Sets how many jobs compute at once, the running jobs are left alone """
+    self.max_running = min(max(1, int(count)), MAX_RUNNING_JOBS)
+
+  def add(self, operator_name, mesh_left, mesh_right, algo, name = None, limits = None):
+    """ Queues an operation, it starts at the next poll() with a free slot. Returns its BooleanJob """
+    job = BooleanJob(operator_name, mesh_left, mesh_right, algo, name = name, limits = limits)
+    self.jobs.append(job)
+    return job
+
+  def cancel(self, job):
+    """ Cancels a waiting job at once, a running one is stopped and marked cancelled by the next poll() """
+    if job.status == JOB_QUEUED:
+      job._isRunning = False
+      job.status = JOB_CANCELLED
+    elif job.status == JOB_RUNNING:
+      job.stop()
+
+  def cancelAll(self):
+    for job in self.jobs:
+      self.cancel(job)
+
+  def active(self):
+    """ True while jobs wait or compute """
+    return any(job.status in (JOB_QUEUED, JOB_RUNNING) for job in self.jobs)
+
+  def clearFinished(self):
+    """ Forgets the jobs that are done, failed or cancelled """
+    self.jobs = [job for job in self.jobs if job.status in (JOB_QUEUED, JOB_RUNNING)]
+
+  def poll(self):
+    """ Imports the computed results and starts the waiting jobs, returns the jobs whose status changed """
+    changed = []
+    for job, (future, tmp_dir) in list(self._running.items()):
+      # a poll nested in an import, the GUI processing its events, may have taken the job already
+      if not future.done() or self._running.pop(job, None) is None:
+        continue
+      try:
+        algo, result = future.result()
+        if result is None or not job._isRunning:
+          job.status = JOB_CANCELLED
+        else:
+          job.result = _importJobResult(job, algo, result)
+          job.status = JOB_DONE
+      except Exception as e: # pylint: disable=broad-exception-caught
+        if job._isRunning:
+          print(f"Boolean job {job.operator_name} with {job.algo.value} failed: {e}")
+          job.error = e
+        job.status = JOB_FAILED if job._isRunning else JOB_CANCELLED
+      finally:
+        tmp_dir.cleanup()
+      job.end_time = time.perf_counter()
+      changed.append(job)
+
+    for job in self.jobs:
+      if len(self._running) >= self.max_running:
+        break
+      if job.status == JOB_QUEUED:
+        self._start(job)
+        changed.append(job)
+    return changed
+
+  def _start(self, job):
+    if self._pool is None:
+      self._pool = ThreadPoolExecutor(max_workers = MAX_RUNNING_JOBS, thread_name_prefix = "BooleanMeshQueue")
+    tmp_dir = tmpDir(estimateIntermediateSize(job.mesh_left, job.mesh_right))
+    job.status = JOB_RUNNING
+    job.start_time = time.perf_counter()
+    self._running[job] = (self._pool.submit(computeBooleanJob, job, tmp_dir.name), tmp_dir)
+
+  def shutdown(self):
+    """ Cancels all the jobs, their threads end once their engine is killed """
+    self.cancelAll()
+    if self._pool is not None:
+      self._pool.shutdown(wait=False)
+      self._pool = None
+
+# Engines of the race mode, MESHBOOLEAN_RACE_ENGINES lists them (comma separated), default: all the installed engines
+race_engines = [BooleanMeshAlgorithm(name.strip()) for name in os.getenv("MESHBOOLEAN_RACE_ENGINES", "").split(",")
+                if name.strip()]
+
+def setRaceEngines(*algos):
+  """ Selects the engines of the race mode, setRaceEngines() races all the installed engines """
+  race_engines[:] = [BooleanMeshAlgorithm(algo) for algo in algos]
+
+def raceEngines():
+  """ Engines run by the race mode """
+  if race_engines:
+    return list(race_engines)
+  return availableEngines()
+
+def readMedArrays(med_file):
+  """ Surface of a MED file as (vertices, faces) arrays, quadrangles are split in triangles """
+  from medcoupling import MEDFileMesh
+  file_mesh = MEDFileMesh.New(med_file)
+  level = 2 - file_mesh.getMeshDimension()
+  if level not in file_mesh.getNonEmptyLevels():
+    raise ValueError("no surface elements")
+  umesh = file_mesh.getMeshAtLevel(level)
+  faces = facesFromNodalConnectivity(umesh.getNodalConnectivity().toNumPyArray(),
+                                     umesh.getNodalConnectivityIndex().toNumPyArray())
+  return umesh.getCoords().toNumPyArray(), faces
+
+def checkBooleanResult(med_result):
+  """
+  Validity check of the race mode: the result is a non empty closed surface
+  Returns an error message, None if the result is valid
+  """
+  try:
+    vertices, faces = readMedArrays(med_result)
+  except ValueError as e:
+    return str(e)
+  return checkResultArrays(vertices, faces)
+
+def checkResultArrays(vertices, faces):
+  """ checkBooleanResult of a result given by its (vertices, faces) arrays """
+  if len(faces) == 0:
+    return "empty result"
+  _, faces = mergeCoincidentVertices(vertices, faces)
+  open_edges = openEdgesCount(faces)
+  if open_edges:
+    return f"the result is not closed ({open_edges} open edges)"
+  return None
+
+class EngineRace:
+  """
+  Engines computing the same boolean operation, each one is a BooleanJob
+  It follows the process protocol of the workers: kill() stops every engine
+  """
+  def __init__(self, operator_name, algos, limits = None):
+    self.jobs = [BooleanJob(operator_name, None, None, algo, limits = limits) for algo in algos]
+
+  def kill(self):
+    for job in self.jobs:
+      job.stop()
+
+def _raceEngine(job, file_left, file_right, tmp_path, features = None):
+  """ Runs one engine of the race, returns its checked MED result or None if it was stopped """
+  med_result = tmpFile(".med", prefix=f"BooleanMeshRace_{job.algo.value}", tmp_path=tmp_path)
+  start = time.perf_counter()
+  try:
+    with engineLimits(job.limits):
+      completed = runEngine(job.algo, job.operator_name, file_left, file_right, med_result, worker=job)
+    if not completed:
+      return None
+    if not job._isRunning:
+      return None
+    error = checkBooleanResult(med_result)
+    if error:
+      raise RuntimeError(f"Invalid result: {error}")
+  except Exception:
+    if job._isRunning:
+      recordRun(job.algo, job.operator_name, features, time.perf_counter() - start, False)
+    raise
+  recordRun(job.algo, job.operator_name, features, time.perf_counter() - start, True)
+  return med_result
+
+def computeRaceResult(operator_name, mesh_left, mesh_right, tmp_path, algos = None, worker=None):
+  """
+  Runs several engines concurrently on the same prepared operands (default: raceEngines())
+  The first result passing checkBooleanResult is kept and the other engines are killed
+  Returns (winning algorithm, MED result), (None, None) if the race was stopped by the user
+  """
+  algos = algos or raceEngines()
+  if not algos:
+    raise RuntimeError("No engine available for the race")
+
+  # each format is prepared once for all the engines reading it
+  operands = {}
+  for algo in algos:
+    mesh_format = engineInputFormat(algo)
+    if mesh_format not in operands:
+      try:
+        operands[mesh_format] = (_exportMesh(mesh_left, tmp_path, mesh_format, worker=worker),
+                                 _exportMesh(mesh_right, tmp_path, mesh_format, worker=worker))
+      except RuntimeError:
+        if worker and not worker._isRunning:
+          print("Conversion killed by user")
+          return None, None
+        raise
+
+  # a result computed before by one of the engines wins at once
+  for algo in algos:
+    (_, keyL), (_, keyR) = operands[engineInputFormat(algo)]
+    if keyL and keyR:
+      result_key = resultKey(keyL, keyR, operator_name, algo.value, engineVersion(algo))
+      med_result = tmpFile(".med", tmp_path=tmp_path)
+      if result_cache.fetch(result_key, "med", med_result):
+        print(f"Result of {algo.value} taken from the cache")
+        return algo, med_result
+
+  # each engine of the race gets the limits of the operation
+  race = EngineRace(operator_name, algos, limits = currentLimits())
+  if worker is not None:
+    if not worker._isRunning:
+      return None, None
+    worker.process = race
+  (objL, _), (objR, _) = next(iter(operands.values()))
+  features = _runFeatures(mesh_left, mesh_right, objL, objR)
+  errors = []
+  # the engines run on their own threads: the whole race, winner conversion included, is the engine stage
+  with timedStage("engine"), ThreadPoolExecutor(max_workers = len(race.jobs)) as pool:
+    futures = {}
+    for job in race.jobs:
+      (objL, _), (objR, _) = operands[engineInputFormat(job.algo)]
+      futures[pool.submit(_raceEngine, job, objL, objR, tmp_path, features)] = job
+    try:
+      for future in as_completed(futures):
+        job = futures[future]
+        try:
+          med_result = future.result()
+        except Exception as e: # pylint: disable=broad-exception-caught
+          print(f"Race: {job.algo.value} failed: {e}")
+          errors.append(f"{job.algo.value}: {e}")
+          continue
+        if med_result is None:
+          continue
+        print(f"Race won by {job.algo.value}")
+        (_, keyL), (_, keyR) = operands[engineInputFormat(job.algo)]
+        if keyL and keyR:
+          result_cache.put(resultKey(keyL, keyR, operator_name, job.algo.value, engineVersion(job.algo)),
+                           "med", med_result)
+        return job.algo, med_result
+    finally:
+      # stop the engines still running, the pool waits for them
+      race.kill()
+
+  if worker and not worker._isRunning:
+    return None, None
+  raise RuntimeError("No engine gave a valid result. " + " ; ".join(errors))
+
+def _computeResult(operator_name, mesh_left, mesh_right, algo, tmp_path, worker=None, convert=True):
+  """
+  Computes the result with one engine, a race or the automatic choice, returns (engine used, result file)
+  The result is a MED file, with convert=False it may be in the format of the engine (races give MED files)
+  """
+  if algo == BooleanMeshAlgorithm.RACE:
+    return computeRaceResult(operator_name, mesh_left, mesh_right, tmp_path, worker=worker)
+  if algo == BooleanMeshAlgorithm.AUTO:
+    algo = chooseEngine(operator_name, mesh_left, mesh_right, tmp_path, worker=worker)
+  return algo, computeBooleanResult(operator_name, mesh_left, mesh_right, algo, tmp_path, worker=worker,
+                                    convert=convert)
+
+class CSGNode:
+  """
+  Node of a CSG expression: an operator applied to operands
+  The operands are meshes, mesh files or other nodes, see CSGUnion, CSGIntersection and CSGDifference
+  """
+  operator_name = None
+
+  def __init__(self, *operands):
+    if len(operands) < 2:
+      raise ValueError(f"{type(self).__name__} needs at least two operands")
+    self.operands = [operand if isinstance(operand, CSGNode) else getMeshObject(operand) for operand in operands]
+
+  def balanced(self):
+    """ Equivalent binary tree of minimal depth, made of (operator, left, right) tuples and meshes """
+    return _balancedReduction(self.operator_name, [_balanced(operand) for operand in self.operands])
+
+  def __repr__(self):
+    operands = ", ".join(repr(operand) if isinstance(operand, CSGNode) else getMeshIDOrFilename(operand)
+                         for operand in self.operands)
+    return f"mesh_boolean_api.{type(self).__name__}({operands})"
+
+class CSGUnion(CSGNode):
+  """ Union of all the operands """
+  operator_name = "union"
+
+class CSGIntersection(CSGNode):
+  """ Intersection of all the operands """
+  operator_name = "intersection"
+
+class CSGDifference(CSGNode):
+  """ First operand minus all the others """
+  operator_name = "difference"
+
+  def balanced(self):
+    # a - b - c - d = a - (b U c U d), the union of the subtrahends is balanced
+    operands = [_balanced(operand) for operand in self.operands]
+    subtrahend = _balancedReduction("union", operands[1:])
+    return ("difference", operands[0], subtrahend)
+
+def _balanced(operand):
+  return operand.balanced() if isinstance(operand, CSGNode) else operand
+
+def _balancedReduction(operator_name, operands):
+  """ Pairs the operands of an associative operator level by level """
+  while len(operands) > 1:
+    pairs = [(operator_name, operands[i], operands[i + 1]) for i in range(0, len(operands) - 1, 2)]
+    if len(operands) % 2:
+      pairs.append(operands[-1])
+    operands = pairs
+  return operands[0]
+
+def _flattenCSG(node, steps):
+  """
+  Lists the steps of a balanced tree, operands before the operations using them
+  A step is [operator_name, left_step, right_step] for an operation and [None, mesh, None] for a leaf
+  Returns the index of the step of node
+  """
+  if isinstance(node, tuple):
+    operator_name, left, right = node
+    steps.append([operator_name, _flattenCSG(left, steps), _flattenCSG(right, steps)])
+  else:
+    steps.append([None, node, None])
+  return len(steps) - 1
+
+def evaluateCSG(tree, algo, name = None, max_workers = None):
+  """
+  Evaluates a CSG expression and imports only its final result in the study
+  The expression is evaluated as a balanced binary tree: independent subtrees run in parallel
+  on at most max_workers threads and the intermediate results stay in the engine format
+  """
+  global import_Dump_Done
+  if algo in (BooleanMeshAlgorithm.RACE, BooleanMeshAlgorithm.AUTO):
+    raise ValueError(f"evaluateCSG needs one engine, {algo.value} is not supported")
+  steps = []
+  root = _flattenCSG(tree.balanced(), steps)
+  parents = {}
+  for index, (operator_name, left, right) in enumerate(steps):
+    if operator_name is not None:
+      parents[left] = parents[right] = index
+
+  # each level of the tree writes results at most as large as the leaves
+  leaves = [mesh for operator_name, mesh, _ in steps if operator_name is None]
+  estimated_size = estimateIntermediateSize(*leaves)
+  if estimated_size is not None:
+    estimated_size *= math.ceil(math.log2(max(len(leaves), 2))) + 1
+
+  with tmpDir(estimated_size) as tmp_path, ThreadPoolExecutor(max_workers = max_workers or os.cpu_count()) as pool:
+    print(f"Temporary directory created: {tmp_path}")
+    mesh_format = engineInputFormat(algo)
+    limits = currentLimits()
+    files = {}
+    futures = {}
+
+    def submit(index):
+      operator_name, left, right = steps[index]
+      if operator_name is None:
+        future = pool.submit(exportMesh, left, tmp_path, mesh_format)
+      else:
+        future = pool.submit(_evaluateCSGOperation, operator_name, files[left], files[right],
+                             algo, mesh_format, tmp_path, limits)
+      futures[future] = index
+
+    # leaves are exported first, an operation is started as soon as both its operands are ready
+    for index, step in enumerate(steps):
+      if step[0] is None:
+        submit(index)
+    try:
+      while futures:
+        done, _ = wait(futures, return_when = FIRST_COMPLETED)
+        for future in done:
+          index = futures.pop(future)
+          files[index] = future.result()
+          parent = parents.get(index)
+          if parent is not None and steps[parent][1] in files and steps[parent][2] in files:
+            submit(parent)
+    except BaseException:
+      for future in futures:
+        future.cancel()
+      raise
+
+    # only the final result is imported, from its arrays
+    result_arrays = resultArrays(files[root])
+    with _pausedPythonDump():
+      result_mesh = importArraysToSmesh(*result_arrays, operator_name = tree.operator_name, name = name)
+
+      smesh_builder = smeshBuilder.New()
+      if not import_Dump_Done:
+        smesh_builder.AddToPythonScript("from meshbooleanplugin import mesh_boolean_api")
+        import_Dump_Done = True
+      result_id = salome.ObjectToSObject(result_mesh.GetMesh()).GetID()
+      smesh_builder.AddToPythonScript(f"{result_id} = mesh_boolean_api.evaluateCSG({tree!r}, algo = mesh_boolean_api.{algo.name})")
+
+    print("End of compute, temporary directory will be erased")
+    return result_mesh
+
+def _evaluateCSGOperation(operator_name, file_left, file_right, algo, mesh_format, tmp_path, limits = None):
+  """ Runs one operation of a CSG tree, returns its result in the engine input format """
+  if fast_path != "off":
+    # subtrees whose surfaces don't meet are answered without engine, like booleanOperation does
+    operands = [PreparedOperand(mesh_file, readMesh(mesh_file), None) for mesh_file in (file_left, file_right)]
+    trivial = _trivialResult(operator_name, operands)
+    if trivial is not None:
+      result_file = tmpFile("." + mesh_format, tmp_path=tmp_path)
+      writeMesh(result_file, *trivial)
+      return result_file
+  med_result = tmpFile(".med", tmp_path=tmp_path)
+  with engineLimits(limits):
+    runEngine(algo, operator_name, file_left, file_right, med_result, convert=False)
+  result_file = engineResultFile(algo, med_result)
+  if not result_file.endswith("." + mesh_format):
+    # the engine writes another format than it reads
+    converted_file = tmpFile("." + mesh_format, tmp_path=tmp_path)
+    meshIOConvert(result_file, converted_file)
+    result_file = converted_file
+  return result_file
 
 
 #Mesh boolean operations that can be called in terminal
@@ -277,3 +1663,16 @@ def Intersection(mesh_left, mesh_right, algo, name = None):
   mesh_left = getMeshObject(mesh_left)
   mesh_right = getMeshObject(mesh_right)
   return booleanOperation("intersection", mesh_left, mesh_right, algo, name = name)
+
+#Non-blocking variants: they return a BooleanFuture of the result mesh, see submitBooleanOperation
+def UnionAsync(mesh_left, mesh_right, algo, name = None, progress = None):
+  """ Starts a Union operation in the background """
+  return submitBooleanOperation("union", mesh_left, mesh_right, algo, name = name, progress = progress)
+
+def DifferenceAsync(mesh_left, mesh_right, algo, name = None, progress = None):
+  """ Starts a Difference operation (left minus right) in the background """
+  return submitBooleanOperation("difference", mesh_left, mesh_right, algo, name = name, progress = progress)
+
+def IntersectionAsync(mesh_left, mesh_right, algo, name = None, progress = None):
+  """ Starts an Intersection operation in the background """
+  return submitBooleanOperation("intersection", mesh_left, mesh_right, algo, name = name, progress = progress)
@@ -0,0 +1,178 @@
+"""
+Persistent on-disk caches of the mesh boolean plugin
+no SALOME imports = GUI and study independent
+Files are addressed by a content key, the least recently used ones
+are evicted when the cache grows over its size cap
+"""
+
+import gzip
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+
+# Root directory of the caches, can be moved with MESHBOOLEAN_CACHE_DIR
+CACHE_DIR = os.getenv("MESHBOOLEAN_CACHE_DIR",
+                      os.path.join(os.path.expanduser("~"), ".cache", "meshbooleanplugin"))
+
+def _sizeFromEnv(variable, default_mb):
+  """ Reads a size in MB from the environment, returns bytes """
+  return int(float(os.getenv(variable, default_mb)) * 1024 * 1024)
+
+def fileKey(path):
+  """ Key of a mesh file: its absolute path, modification time and size """
+  stat = os.stat(path)
+  identity = f"{os.path.abspath(path)}\0{stat.st_mtime_ns}\0{stat.st_size}"
+  return hashlib.sha256(identity.encode('utf-8')).hexdigest()
+
+def arraysKey(*arrays):
+  """ Key of a mesh given by its arrays: hash of their shapes, types and contents """
+  digest = hashlib.sha256()
+  for array in arrays:
+    digest.update(f"{array.dtype.str}{array.shape}".encode('ascii'))
+    digest.update(memoryview(array.reshape(-1)).cast('B'))
+  return digest.hexdigest()
+
+def linkOrCopy(source, destination):
+  """ Hard links source to destination, copies it when links are not possible (other file system) """
+  if os.path.exists(destination):
+    os.remove(destination)
+  try:
+    os.link(source, destination)
+  except OSError:
+    shutil.copyfile(source, destination)
+  return destination
+
+class MeshCache:
+  """
+  Directory of files addressed by a key, capped to max_size bytes
+  The modification time of an entry is its last use, the oldest entries are evicted first
+  With compress=True the entries are stored gzipped and unpacked when fetched
+  """
+  def __init__(self, directory, max_size, compress=False):
+    self.directory = directory
+    self.max_size = max_size
+    self.compress = compress
+    self._lock = threading.Lock()
+
+  def enabled(self):
+    return self.max_size > 0
+
+  def path(self, key, extension):
+    if self.compress:
+      extension += ".gz"
+    return os.path.join(self.directory, f"{key}.{extension}")
+
+  def get(self, key, extension):
+    """ Returns the path of the entry or None, the entry is marked as used """
+    if not self.enabled():
+      return None
+    path = self.path(key, extension)
+    try:
+      os.utime(path)
+    except OSError:
+      return None
+    return path
+
+  def fetch(self, key, extension, destination):
+    """ Links the entry to destination, returns False if the entry is missing """
+    path = self.get(key, extension)
+    if path is None:
+      return False
+    try:
+      if self.compress:
+        with gzip.open(path, 'rb') as packed, open(destination, 'wb') as unpacked:
+          shutil.copyfileobj(packed, unpacked)
+      else:
+        linkOrCopy(path, destination)
+    except OSError:
+      # evicted in the meantime
+      return False
+    return True
+
+  def put(self, key, extension, source):
+    """
+    Stores a copy of the source file, returns the path of the entry
+    The cache is best effort: None is returned if the entry can't be written
+    """
+    if not self.enabled():
+      return None
+    path = self.path(key, extension)
+    tmp_path = None
+    try:
+      os.makedirs(self.directory, exist_ok=True)
+      # write aside and rename so that a reader never sees a partial entry
+      fd, tmp_path = tempfile.mkstemp(prefix=".tmp_", dir=self.directory)
+      os.close(fd)
+      if self.compress:
+        with open(source, 'rb') as unpacked, gzip.open(tmp_path, 'wb', compresslevel=3) as packed:
+          shutil.copyfileobj(unpacked, packed)
+      else:
+        shutil.copyfile(source, tmp_path)
+      os.replace(tmp_path, path)
+    except OSError as e:
+      print(f"Could not store {source} in the cache {self.directory}: {e}")
+      if tmp_path is not None and os.path.exists(tmp_path):
+        os.remove(tmp_path)
+      return None
+    self.evict()
+    return path
+
+  def remove(self, key, extension):
+    """ Invalidates one entry """
+    try:
+      os.remove(self.path(key, extension))
+    except FileNotFoundError:
+      pass
+
+  def entries(self):
+    """ (last use, size, path) of every entry, oldest first """
+    entries = []
+    if not os.path.isdir(self.directory):
+      return entries
+    with os.scandir(self.directory) as it:
+      for entry in it:
+        if entry.is_file() and not entry.name.startswith(".tmp_"):
+          stat = entry.stat()
+          entries.append((stat.st_mtime, stat.st_size, entry.path))
+    return sorted(entries)
+
+  def size(self):
+    return sum(size for _, size, _ in self.entries())
+
+  def evict(self):
+    """ Removes the least recently used entries until the cache fits in max_size """
+    with self._lock:
+      entries = self.entries()
+      total = sum(size for _, size, _ in entries)
+      for _, size, path in entries:
+        if total <= self.max_size:
+          break
+        try:
+          os.remove(path)
+        except FileNotFoundError:
+          pass
+        total -= size
+
+  def clear(self):
+    """ Removes every entry """
+    for _, _, path in self.entries():
+      try:
+        os.remove(path)
+      except FileNotFoundError:
+        pass
+
+def resultKey(left_key, right_key, operator, algo, engine_version):
+  """ Key of a boolean result: the operands, the operator and the engine build """
+  identity = "\0".join([left_key, right_key, operator.lower(), str(algo), engine_version])
+  return hashlib.sha256(identity.encode('utf-8')).hexdigest()
+
+# Prepared engine inputs, capped by MESHBOOLEAN_OPERAND_CACHE_SIZE (MB, 0 disables the cache)
+operand_cache = MeshCache(os.path.join(CACHE_DIR, "operands"),
+                          _sizeFromEnv("MESHBOOLEAN_OPERAND_CACHE_SIZE", 2048))
+
+# Compressed MED results, capped by MESHBOOLEAN_RESULT_CACHE_SIZE (MB, 0 disables the cache)
+result_cache = MeshCache(os.path.join(CACHE_DIR, "results"),
+                         _sizeFromEnv("MESHBOOLEAN_RESULT_CACHE_SIZE", 1024),
+                         compress=True)
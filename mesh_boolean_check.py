@@ -0,0 +1,204 @@
+"""
+Validity checks of the operands of the mesh boolean plugin
+no SALOME imports = GUI and study independent
+The engines expect closed, manifold and consistently oriented surfaces and often fail
+only after minutes on other inputs. The checks here take the (vertices, faces) arrays of an
+operand and count its defects in a few vectorized passes, the verdicts are kept by operand hash.
+"""
+
+import threading
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+from meshbooleanplugin.mesh_boolean_io import mergeCoincidentVertices
+from meshbooleanplugin.mesh_boolean_cache import arraysKey
+from meshbooleanplugin.mesh_boolean_geometry import trianglesIntersect
+
+# Faces whose area is below this ratio of the squared bounding box diagonal are degenerate
+DEGENERATE_AREA = 1e-14
+
+# Faces per leaf of the box tree of the self-intersection test, and face pairs tested at once
+LEAF_SIZE = 4
+PAIR_BATCH = 1 << 20
+
+# Number of operands whose verdict is kept
+VERDICT_CACHE_SIZE = 256
+
+class MeshDefects(namedtuple("MeshDefects", ["boundary_edges", "non_manifold_edges", "inconsistent_edges",
+                                             "degenerate_faces", "self_intersections"])):
+  """ Defect counts of a surface, self_intersections is None when they were not looked for """
+  def valid(self):
+    return not any(self)
+
+  def fatal(self):
+    """ True if no engine can handle the surface: open, non-manifold, badly oriented or self-intersecting """
+    return bool(self.boundary_edges or self.non_manifold_edges or self.inconsistent_edges or
+                self.self_intersections)
+
+  def describe(self):
+    labels = (
+      ("boundary_edges", "boundary edges"),
+      ("non_manifold_edges", "non-manifold edges"),
+      ("inconsistent_edges", "edges with inconsistent orientation"),
+      ("degenerate_faces", "degenerate faces"),
+      ("self_intersections", "self-intersecting face pairs"),
+    )
+    return ", ".join(f"{getattr(self, field)} {label}" for field, label in labels if getattr(self, field))
+
+class InvalidOperand(RuntimeError):
+  """ Raised before running any engine when an operand is not a valid closed surface """
+  def __init__(self, operand, defects):
+    super().__init__(f"The {operand} operand is not a valid closed surface: {defects.describe()}")
+    self.operand = operand
+    self.defects = defects
+
+def edgeDefects(faces):
+  """
+  (boundary, non-manifold, inconsistent) edge counts
+  An edge is a boundary edge if one face uses it, non-manifold if more than two do, and inconsistent
+  if two faces run it in the same direction: their normals don't point to the same side
+  """
+  faces = np.asarray(faces, dtype=np.int64)
+  directed = faces[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2)
+  # one integer per edge makes the counting a 1D unique
+  base = int(faces.max(initial=0)) + 1
+  _, counts = np.unique(directed.min(axis=1) * base + directed.max(axis=1), return_counts=True)
+  _, directed_counts = np.unique(directed[:, 0] * base + directed[:, 1], return_counts=True)
+  return (int(np.count_nonzero(counts == 1)), int(np.count_nonzero(counts > 2)),
+          int(np.count_nonzero(directed_counts > 1)))
+
+def degenerateFaces(vertices, faces):
+  """ Number of faces with a repeated vertex or a null area """
+  faces = np.asarray(faces, dtype=np.int64)
+  if len(faces) == 0:
+    return 0
+  repeated = (faces[:, 0] == faces[:, 1]) | (faces[:, 1] == faces[:, 2]) | (faces[:, 2] == faces[:, 0])
+  corners = vertices[faces]
+  doubled_areas = np.linalg.norm(np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0]), axis=1)
+  diagonal = np.linalg.norm(vertices.max(axis=0) - vertices.min(axis=0))
+  return int(np.count_nonzero(repeated | (doubled_areas <= 2 * DEGENERATE_AREA * diagonal ** 2)))
+
+def mortonOrder(points):
+  """ Order of the points along a Morton curve: close points are close in the order """
+  low, high = points.min(axis=0), points.max(axis=0)
+  cells = ((points - low) / np.maximum(high - low, 1e-300) * 1023).astype(np.uint64)
+  codes = np.zeros(len(points), dtype=np.uint64)
+  for bit in range(10):
+    for axis in range(3):
+      codes |= ((cells[:, axis] >> np.uint64(bit)) & np.uint64(1)) << np.uint64(3 * bit + axis)
+  return np.argsort(codes, kind='stable')
+
+def boxTree(low, high, leaf_size = LEAF_SIZE):
+  """
+  Complete binary tree of boxes over faces sorted along a Morton curve, as one (nodes, 2, 3) array
+  of (min, max) corners per level from the leaves to the root. The missing leaves have empty boxes
+  """
+  leaves = -(-len(low) // leaf_size)
+  size = 1 << (leaves - 1).bit_length()
+  padding = size * leaf_size - len(low)
+  low = np.vstack([low, np.full((padding, 3), np.inf)]).reshape(size, leaf_size, 3).min(axis=1)
+  high = np.vstack([high, np.full((padding, 3), -np.inf)]).reshape(size, leaf_size, 3).max(axis=1)
+  levels = [np.stack([low, high], axis=1)]
+  while len(low) > 1:
+    low, high = np.minimum(low[0::2], low[1::2]), np.maximum(high[0::2], high[1::2])
+    levels.append(np.stack([low, high], axis=1))
+  return levels
+
+def _boxesTouch(boxes, a, b):
+  """ Mask of the pairs (a, b) of indices whose boxes touch """
+  # one gather per side of the pairs
+  box_a, box_b = boxes[a], boxes[b]
+  return np.all((box_a[:, 0] <= box_b[:, 1]) & (box_b[:, 0] <= box_a[:, 1]), axis=1)
+
+def selfIntersections(vertices, faces, leaf_size = LEAF_SIZE):
+  """
+  Number of pairs of faces without a common vertex that intersect
+  The pairs of leaves whose boxes touch are found level by level down the box tree,
+  then their faces are compared in batches. Coplanar overlaps are not detected
+  """
+  faces = np.asarray(faces, dtype=np.int64)
+  count = len(faces)
+  if count < 2:
+    return 0
+  corners = vertices[faces]
+  order = mortonOrder(corners.mean(axis=1))
+  boxes = np.stack([corners.min(axis=1), corners.max(axis=1)], axis=1)
+  levels = boxTree(boxes[order, 0], boxes[order, 1], leaf_size)
+
+  # children of the pairs of nodes (i, j), i <= j, of each level
+  offsets = np.array([[0, 0], [0, 1], [1, 0], [1, 1]])
+  pairs = np.zeros((1, 2), dtype=np.int64)
+  for nodes in reversed(levels[:-1]):
+    pairs = (2 * pairs[:, None, :] + offsets[None, :, :]).reshape(-1, 2)
+    pairs = pairs[pairs[:, 0] <= pairs[:, 1]]
+    pairs = pairs[_boxesTouch(nodes, pairs[:, 0], pairs[:, 1])]
+
+  slots = np.arange(leaf_size)
+  intersections = 0
+  batch = max(1, PAIR_BATCH // leaf_size ** 2)
+  for start in range(0, len(pairs), batch):
+    chunk = pairs[start:start + batch]
+    a, b = np.broadcast_arrays(chunk[:, 0, None, None] * leaf_size + slots[None, :, None],
+                               chunk[:, 1, None, None] * leaf_size + slots[None, None, :])
+    a, b = a.ravel(), b.ravel()
+    # each pair once, without the padding of the last leaf
+    keep = (a < b) & (b < count)
+    a, b = order[a[keep]], order[b[keep]]
+    touching = _boxesTouch(boxes, a, b)
+    a, b = a[touching], b[touching]
+    # neighbour faces meet along their common edge or vertex
+    shared = np.any(faces[a][:, :, None] == faces[b][:, None, :], axis=(1, 2))
+    a, b = a[~shared], b[~shared]
+    intersections += int(np.count_nonzero(trianglesIntersect(corners[a], corners[b])))
+  return intersections
+
+def checkMesh(vertices, faces, self_intersections = False):
+  """ MeshDefects of a triangle surface, self-intersections are only looked for on demand (slower) """
+  vertices = np.asarray(vertices, dtype=np.float64)
+  faces = np.asarray(faces, dtype=np.int64)
+  boundary, non_manifold, inconsistent = edgeDefects(faces)
+  if boundary:
+    # the corners of the triangles of STL files are not shared: weld them before counting again
+    vertices, faces = mergeCoincidentVertices(vertices, faces)
+    boundary, non_manifold, inconsistent = edgeDefects(faces)
+  return MeshDefects(boundary, non_manifold, inconsistent, degenerateFaces(vertices, faces),
+                     selfIntersections(vertices, faces) if self_intersections else None)
+
+class VerdictCache:
+  """ MeshDefects of the last checked operands by key, the least recently used ones are dropped """
+  def __init__(self, max_entries):
+    self.max_entries = max_entries
+    self._verdicts = OrderedDict()
+    self._lock = threading.Lock()
+
+  def get(self, key, self_intersections = False):
+    """ Verdict of the operand, None if it is unknown or lacks the self-intersections """
+    with self._lock:
+      defects = self._verdicts.get(key)
+      if defects is None or (self_intersections and defects.self_intersections is None):
+        return None
+      self._verdicts.move_to_end(key)
+      return defects
+
+  def put(self, key, defects):
+    with self._lock:
+      self._verdicts[key] = defects
+      self._verdicts.move_to_end(key)
+      while len(self._verdicts) > self.max_entries:
+        self._verdicts.popitem(last=False)
+
+  def clear(self):
+    with self._lock:
+      self._verdicts.clear()
+
+verdict_cache = VerdictCache(VERDICT_CACHE_SIZE)
+
+def checkOperand(vertices, faces, self_intersections = False, key = None):
+  """ MeshDefects of an operand, known operands are answered from the verdict cache """
+  key = key or arraysKey(np.ascontiguousarray(vertices), np.ascontiguousarray(faces))
+  defects = verdict_cache.get(key, self_intersections)
+  if defects is None:
+    defects = checkMesh(vertices, faces, self_intersections)
+    verdict_cache.put(key, defects)
+  return defects
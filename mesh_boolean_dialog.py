@@ -28,15 +28,17 @@ import SalomePyQt
 from meshbooleanplugin.MyPlugDialog_ui import Ui_MyPlugDialog
 from meshbooleanplugin import usePySide
 if usePySide():
-  from PySide2.QtWidgets import QWidget, QMessageBox, QApplication, QFileDialog
-  from PySide2.QtGui import QPixmap, QCursor, QIcon
-  from PySide2.QtCore import Qt, QCoreApplication, QThread, QObject, Signal
+  from PySide2.QtWidgets import QWidget, QMessageBox, QFileDialog, QTableWidgetItem, QPushButton, QHeaderView
+  from PySide2.QtGui import QPixmap, QIcon
+  from PySide2.QtCore import Qt, QCoreApplication, QTimer
 else:
   from PyQt5.QtCore import Qt
-  from PyQt5.QtGui import QPixmap, QCursor, QIcon
-  from PyQt5.QtCore import QCoreApplication, QThread, pyqtSignal, QObject
-  from PyQt5.QtWidgets import QWidget, QMessageBox, QApplication, QFileDialog
-from meshbooleanplugin.mesh_boolean_api import BooleanMeshAlgorithm, booleanOperation, resetCounter
+  from PyQt5.QtGui import QPixmap, QIcon
+  from PyQt5.QtCore import QCoreApplication, QTimer
+  from PyQt5.QtWidgets import QWidget, QMessageBox, QFileDialog, QTableWidgetItem, QPushButton, QHeaderView
+from meshbooleanplugin.mesh_boolean_api import BooleanMeshAlgorithm, BooleanJobQueue, resetCounter, \
+  ResourceLimits, JOB_QUEUED, JOB_RUNNING, JOB_DONE, JOB_FAILED
+from meshbooleanplugin.mesh_boolean_utils import default_limits
 
 salome.salome_init()
 smesh = smeshBuilder.New()
@@ -51,6 +53,11 @@ if debug_plugin or verbose():
   positionVerbosityOfLogger(logging.DEBUG)
   logger.debug("Initial study name : %s" , study_name)
 
+# Period of the refresh of the jobs list, the computed results are imported then
+JOBS_POLL_INTERVAL_MS = 200
+# Columns of the jobs list
+JOB_COLUMN_OPERATION, JOB_COLUMN_STATUS, JOB_COLUMN_ELAPSED, JOB_COLUMN_CANCEL = range(4)
+
 OPERATOR_DICT = { 'Union' : 0, 'Intersection' : 1, 'Difference' : 2 }
 LICENSE_DICT = { BooleanMeshAlgorithm.CGAL : 'GPL and LGPL',
                 BooleanMeshAlgorithm.IGL  : 'MPL2',
@@ -80,58 +87,6 @@ def updateStudy():
     study_name = salome.myStudy.Name
     resetCounter()
 
-class Worker(QObject):
-  """ Worker class to handle boolean computation in a thread """
-  if usePySide():
-    finished = Signal()
-    error = Signal()
-  else:
-    finished = pyqtSignal(str)
-    error = pyqtSignal(str)
-
-  def __init__(self, algo, operator, mesh_left, mesh_right):
-    super(Worker, self).__init__()
-    self.algo=algo
-    self.operator= operator
-    self.mesh_right= mesh_right
-    self.mesh_left= mesh_left
-    self._isRunning= True
-    self.process = None
-
-  def task(self):
-    """ Execution task for the thread """
-
-    logger.debug("start worker.task")
-    try:
-      logger.debug("try worker.task")
-      if not self._isRunning:
-        return
-      logger.debug("before runAlgo")
-      self.process = booleanOperation(self.operator, self.mesh_left, self.mesh_right, self.algo, worker=self)
-      # using directly the booleanOperation function that takes care of everything ( runalgo and tmpfile)
-      logger.debug("in worker.task, self.process: %s", self.process)
-      # check if there is a process to call wait
-      if self._isRunning:
-        self.finished.emit("OK")
-    except Exception as e: # pylint: disable=broad-exception-caught
-      if self._isRunning:
-        self.error.emit(str(e))
-
-  # stop method to kill the process with the cancel button
-  def stop(self):
-    """ Terminates the running process """
-
-    logger.debug("in worker.stop()")
-    self._isRunning= False
-    if self.process is not None:
-      logger.debug("self.process is not None => Killing process")
-      try:
-        self.process.kill()
-        logger.debug("Process killed")
-      except Exception as e: # pylint: disable=broad-exception-caught
-        logger.debug(f"Error killing process:{e}")
-    logger.debug("worker.stop() end")
-
 class MeshBooleanDialog(Ui_MyPlugDialog,QWidget):
   """
   Main UI dialog
@@ -140,8 +95,14 @@ class MeshBooleanDialog(Ui_MyPlugDialog,QWidget):
     global study_name
     QWidget.__init__(self)
     self.setWindowFlags(self.windowFlags() | Qt.WindowStaysOnTopHint)
-    self.worker = None
     self.setupUi(self)
+    # the jobs compute on threads, their results are imported here, on the GUI thread, by the poll timer
+    self.queue = BooleanJobQueue(self.SB_ConcurrentJobs.value())
+    self.jobRows = {}
+    self.jobsTimer = QTimer(self)
+    self.jobsTimer.setInterval(JOBS_POLL_INTERVAL_MS)
+    self.jobsTimer.timeout.connect(self.onJobsTimer)
+    self.TW_Jobs.horizontalHeader().setSectionResizeMode(JOB_COLUMN_OPERATION, QHeaderView.Stretch)
     self.connecterSignaux()
     self.commande=""
 
@@ -173,18 +134,22 @@ class MeshBooleanDialog(Ui_MyPlugDialog,QWidget):
     self.PB_MeshFile_L.setToolTip("source mesh from a file in disk")
     self.PB_MeshFile_R.setIcon(icon)
     self.PB_MeshFile_R.setToolTip("source mesh from a file in disk")
+    # 0 is displayed as 'none': no limit
+    self.SB_MemoryLimit.setValue(default_limits.memory_mb or 0)
+    self.SB_CpuLimit.setValue(default_limits.cpu_seconds or 0)
+    self.SB_WallLimit.setValue(default_limits.wall_seconds or 0)
     self.resize(800, 600)
 
     self.myWindow = None
 
-    self.computing = False
-
   def connecterSignaux(self) :
     """ Connects UI signals """
     self.PB_Close.clicked.connect(self.onPBClosePressed)
     self.PB_Cancel.clicked.connect(self.onPBCancelPressed)
     self.PB_Help.clicked.connect(self.onPBHelpPressed)
     self.PB_Compute.clicked.connect(self.onPBComputePressed)
+    self.PB_ClearJobs.clicked.connect(self.onPBClearJobsPressed)
+    self.SB_ConcurrentJobs.valueChanged.connect(self.onConcurrentJobsChanged)
 
     self.LE_MeshFile_L.returnPressed.connect(lambda : self.onMeshFileNameSelected("L"))
     self.LE_MeshSmesh_L.returnPressed.connect(lambda : self.onMeshSmeshNameChanged("L"))
@@ -204,6 +169,10 @@ class MeshBooleanDialog(Ui_MyPlugDialog,QWidget):
     if self.meshIn_L == "" or self.meshIn_R == "":
       self.label_summup.setText(_translate("MyPlugDialog", ""))
       return
+    self.label_summup.setText(_translate("MyPlugDialog", self.operationSummary()))
+
+  def operationSummary(self):
+    """ Returns the selected operation as '(engine) : left symbol right' """
     symbol = ''
     if self.operator.lower() == 'union':
       symbol = '\u222A'
@@ -223,7 +192,7 @@ class MeshBooleanDialog(Ui_MyPlugDialog,QWidget):
     if engine == BooleanMeshAlgorithm.IRMB.value:
       engine = "IRMB" # prettier display
 
-    self.label_summup.setText(_translate("MyPlugDialog", f"({engine}) : {left_name} {symbol} {right_name}"))
+    return f"({engine}) : {left_name} {symbol} {right_name}"
 
   def error_popup(self, title, e):
     """ Displays critical error message box """
@@ -249,8 +218,17 @@ class MeshBooleanDialog(Ui_MyPlugDialog,QWidget):
 
   def displayEngineLabel(self):
     _translate = QCoreApplication.translate
+    if self.getCurrentAlgorithm() == BooleanMeshAlgorithm.AUTO:
+      self.label_Engine.setText(_translate("MyPlugDialog", "The engine predicted to be the fastest reliable one is used."))
+      return
     self.label_Engine.setText(_translate("MyPlugDialog", f"This engine is used under the {LICENSE_DICT[self.getCurrentAlgorithm()]} license."))
 
+  def getResourceLimits(self):
+    """ Returns the limits of the engine set in the dialog """
+    return ResourceLimits(memory_mb = self.SB_MemoryLimit.value() or None,
+                          cpu_seconds = self.SB_CpuLimit.value() or None,
+                          wall_seconds = self.SB_WallLimit.value() or None)
+
   def onPBHelpPressed(self):
     QMessageBox.about(self, "About this boolean mesh operation tool",
             """
@@ -260,70 +238,41 @@ the 'Left mesh' and the 'Right mesh' fields,
 choose an operator and an engine and
 compute the result.
 
+Each 'Compute' adds a job to the jobs list:
+up to 'Concurrent jobs' jobs compute at once,
+the others wait for their turn.
+
 For each engine, you can access a piece of
 information about its performances with the
 selected operator, measuring the metric
 that you selected.
             """)
 
-  def setCursorBusy(self):
-    QApplication.setOverrideCursor(QCursor(Qt.WaitCursor))
-    self.repaint()
-
-  def restoreCursor(self):
-    QApplication.restoreOverrideCursor()
-    self.repaint()
-    sgPyQt.processEvents()
-
-# onComputeFinished fonction called with signals afterwards
-  def onComputeFinished(self, result_mesh):
-    print("Computation finished")
-    self.computing= False
-    self.updateButton()
-    self.restoreCursor()
-
-    if result_mesh: # we now refresh the GUI here (no longer need of the function loadResult)
-      if salome.sg.hasDesktop():
-        salome.sg.updateObjBrowser()
-        QMessageBox.about(self,"Compute", "Computation successfully finished")
-    else:
-      self.error_popup("Error", "Computation failed")
-
-    self.worker.deleteLater()
-
-# updateButton fonction to enable the 'Cancel' button and disable the 'Compute' one (and vice-versa)
+# updateButton fonction to enable the 'Cancel' button while jobs wait or compute
   def updateButton(self):
-    """ Toggles state between compute and cancel buttons """
-    if self.computing:
-      self.PB_Compute.setEnabled(False)
-      self.PB_Cancel.setEnabled(True)
-    else:
-      self.PB_Compute.setEnabled(True)
-      self.PB_Cancel.setEnabled(False)
+    """ Enables the cancel button while jobs are queued or running """
+    self.PB_Cancel.setEnabled(self.queue.active())
     # Forcing the change to happen in SALOME
     sgPyQt.processEvents()
 
-
   def onPBCancelPressed(self):
-    """ Handles user request to cancel the computation """
-    if self.worker is None or not self.computing:
+    """ Handles user request to cancel all the jobs """
+    if not self.queue.active():
       return
 
     logger.debug("Cancel called by user")
-    self.worker.stop()
-    self.thread.quit()
-    self.computing=False
-    self.updateButton()
+    self.queue.cancelAll()
+    print("Computation canceled by user")
+    self.onJobsTimer()
 
-    if salome.sg.hasDesktop():
-      salome.sg.updateObjBrowser()
-      self.restoreCursor()
-      QMessageBox.about(self, "Compute","Computation canceled by user")
-    else:
-      print("Computation canceled by user")
+  def onJobCancelPressed(self, job):
+    """ Handles user request to cancel one job """
+    logger.debug("Cancel of a job called by user")
+    self.queue.cancel(job)
+    self.onJobsTimer()
 
   def onPBComputePressed(self):
-    """ Initializes and starts the computation thread """
+    """ Queues the selected operation, it computes as soon as fewer jobs than the limit are running """
     logger.debug("Compute  called by user")
 
     mesh_l = self.__selectedMesh_L if self.__selectedMesh_L else self.meshIn_L
@@ -332,29 +281,63 @@ that you selected.
     if not mesh_l or not mesh_r:
       return self.error_popup("Mesh", "Select an input mesh")
 
-    self.setCursorBusy()
-
-    self.thread = QThread()
     self.operator = self.COB_Operator.currentText() #stock the operator correctly to name the files after
-    self.worker = Worker(self.getCurrentAlgorithm(),self.operator.lower(),mesh_l, mesh_r)
-
-    self.worker.moveToThread(self.thread)
-
-    self.thread.started.connect(self.worker.task)
-    self.worker.finished.connect(self.onComputeFinished)
-    self.worker.finished.connect(self.thread.quit)
-    self.worker.error.connect(lambda e: [self.thread.quit(),
-                                         setattr(self,'computing', False),
-                                         self.restoreCursor(),
-                                         self.updateButton(),
-                                         self.error_popup("Computation error", e)])
-    self.thread.finished.connect(self.thread.deleteLater)
-#   start the thread(the computation)
-    self.thread.start()
-
-    self.computing=True
-#   unlock the cancel button
-    self.updateButton()
+    job = self.queue.add(self.operator.lower(), mesh_l, mesh_r, self.getCurrentAlgorithm(),
+                         limits=self.getResourceLimits())
+    self.addJobRow(job, self.operationSummary())
+    self.onJobsTimer()
+    self.jobsTimer.start()
+
+  def addJobRow(self, job, summary):
+    """ Adds the row of a job to the jobs list, with its cancel button """
+    row = self.TW_Jobs.rowCount()
+    self.TW_Jobs.insertRow(row)
+    self.TW_Jobs.setItem(row, JOB_COLUMN_OPERATION, QTableWidgetItem(summary))
+    self.TW_Jobs.setItem(row, JOB_COLUMN_STATUS, QTableWidgetItem(job.status))
+    self.TW_Jobs.setItem(row, JOB_COLUMN_ELAPSED, QTableWidgetItem(""))
+    cancel_button = QPushButton("Cancel")
+    cancel_button.clicked.connect(lambda _, job=job: self.onJobCancelPressed(job))
+    self.TW_Jobs.setCellWidget(row, JOB_COLUMN_CANCEL, cancel_button)
+    self.jobRows[job] = row
+
+  def onJobsTimer(self):
+    """ Imports the computed results, starts the waiting jobs and refreshes the jobs list """
+    changed = self.queue.poll()
+    if any(job.status == JOB_DONE for job in changed) and salome.sg.hasDesktop():
+      salome.sg.updateObjBrowser()
+    for job, row in self.jobRows.items():
+      status_item = self.TW_Jobs.item(row, JOB_COLUMN_STATUS)
+      status_item.setText(job.status)
+      if job.status == JOB_FAILED:
+        status_item.setToolTip(str(job.error))
+      if job.start_time is not None:
+        self.TW_Jobs.item(row, JOB_COLUMN_ELAPSED).setText(f"{job.elapsed():.1f} s")
+      self.TW_Jobs.cellWidget(row, JOB_COLUMN_CANCEL).setEnabled(job.status in (JOB_QUEUED, JOB_RUNNING) and
+                                                                 job._isRunning)
+    if not self.queue.active():
+      self.jobsTimer.stop()
+    if changed or not self.jobsTimer.isActive():
+      self.updateButton()
+
+  def onConcurrentJobsChanged(self, value):
+    self.queue.setMaxRunning(value)
+    self.onJobsTimer()
+
+  def onPBClearJobsPressed(self):
+    """ Removes the finished jobs from the list """
+    self.queue.clearFinished()
+    for job, row in sorted(self.jobRows.items(), key=lambda item: item[1], reverse=True):
+      if job not in self.queue.jobs:
+        self.TW_Jobs.removeRow(row)
+        del self.jobRows[job]
+    # the rows left moved up
+    self.jobRows = {job : row for row, job in enumerate(sorted(self.jobRows, key=self.jobRows.get))}
+
+  def closeEvent(self, event):
+    """ Cancels the jobs left: their results could no longer be imported """
+    self.jobsTimer.stop()
+    self.queue.shutdown()
+    super().closeEvent(event)
 
   def onPBClosePressed(self):
     self.close()
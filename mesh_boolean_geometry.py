@@ -0,0 +1,275 @@
+"""
+Geometric predicates on the operands of the mesh boolean plugin
+no SALOME imports = GUI and study independent
+Meshes are (vertices, faces) arrays, see mesh_boolean_io. The predicates tell when
+the surfaces of two operands can't meet: the boolean operation then has a trivial answer
+computed here without any engine.
+"""
+
+import numpy as np
+
+from meshbooleanplugin.mesh_boolean_io import compactVertices
+
+# Relations of two operands whose surfaces don't meet
+DISJOINT = "disjoint"
+LEFT_INSIDE = "left inside right"
+RIGHT_INSIDE = "right inside left"
+
+# Number of times the boxes of the faces near the other operand are shrunk before giving up
+SEPARATION_ROUNDS = 4
+
+# Segments whose triple product with the triangle edges is below this ratio of the product of their lengths
+# are taken as parallel to the triangle: rounding noise on coplanar faces must not make them cross
+PARALLEL_TOLERANCE = 1e-10
+
+# Pairs of shell boxes compared at once by touchingShells
+SHELL_PAIRS_BATCH = 1 << 22
+
+# Directions of the parity rays, chosen away from the axes and diagonals of the usual CAD meshes
+RAY_DIRECTIONS = np.array([[0.5877852, 0.4539905, 0.6697465],
+                           [-0.3826834, 0.7933533, 0.4733740],
+                           [0.2588190, -0.5224986, 0.8124038]])
+
+def boundingBox(vertices):
+  """ (min corner, max corner) of the vertices """
+  return vertices.min(axis=0), vertices.max(axis=0)
+
+def boxesDisjoint(box_a, box_b):
+  """ True if two axis-aligned boxes don't touch """
+  return bool(np.any(box_a[1] < box_b[0]) or np.any(box_b[1] < box_a[0]))
+
+def orientedBox(vertices):
+  """
+  Box aligned on the principal axes of the vertices: (center, axes as rows, half extents)
+  It is tighter than the axis-aligned box for elongated parts placed in any direction
+  """
+  mean = vertices.mean(axis=0)
+  centered = vertices - mean
+  _, eigenvectors = np.linalg.eigh(centered.T @ centered)
+  axes = eigenvectors.T
+  local = centered @ axes.T
+  low, high = local.min(axis=0), local.max(axis=0)
+  return mean + ((low + high) / 2) @ axes, axes, (high - low) / 2
+
+def orientedBoxesDisjoint(box_a, box_b):
+  """ Separating axis test of two oriented boxes: the 3 + 3 face normals and their 9 cross products """
+  center_a, axes_a, half_a = box_a
+  center_b, axes_b, half_b = box_b
+  candidates = np.vstack([axes_a, axes_b, np.cross(axes_a[:, None, :], axes_b[None, :, :]).reshape(9, 3)])
+  radius_a = np.abs(candidates @ axes_a.T) @ half_a
+  radius_b = np.abs(candidates @ axes_b.T) @ half_b
+  distance = np.abs(candidates @ (center_b - center_a))
+  # parallel axes give null cross products: 0 > 0 never separates
+  return bool(np.any(distance > radius_a + radius_b))
+
+def facesInBox(vertices, faces, box):
+  """ Mask of the faces whose bounding box touches the box """
+  corners = vertices[faces]
+  return np.all(corners.min(axis=1) <= box[1], axis=1) & np.all(corners.max(axis=1) >= box[0], axis=1)
+
+def surfacesSeparated(left, right, rounds = SEPARATION_ROUNDS):
+  """
+  True if the surfaces of the two meshes surely don't meet
+  Only the faces in the common part of the boxes can meet: their boxes are compared again, a few times
+  """
+  (vertices_left, faces_left), (vertices_right, faces_right) = left, right
+  box_left, box_right = boundingBox(vertices_left), boundingBox(vertices_right)
+  for _ in range(rounds):
+    if boxesDisjoint(box_left, box_right):
+      return True
+    common = (np.maximum(box_left[0], box_right[0]), np.minimum(box_left[1], box_right[1]))
+    faces_left = faces_left[facesInBox(vertices_left, faces_left, common)]
+    faces_right = faces_right[facesInBox(vertices_right, faces_right, common)]
+    if len(faces_left) == 0 or len(faces_right) == 0:
+      return True
+    box_left = boundingBox(vertices_left[faces_left].reshape(-1, 3))
+    box_right = boundingBox(vertices_right[faces_right].reshape(-1, 3))
+  return boxesDisjoint(box_left, box_right)
+
+def rayCrossings(origin, direction, vertices, faces):
+  """ Number of faces crossed by the ray, Moller-Trumbore test of all the faces at once """
+  v0, v1, v2 = (vertices[faces[:, i]] for i in range(3))
+  edge1, edge2 = v1 - v0, v2 - v0
+  p = np.cross(direction, edge2)
+  determinant = np.einsum('ij,ij->i', edge1, p)
+  valid = np.abs(determinant) > 1e-300
+  inverse = np.zeros_like(determinant)
+  inverse[valid] = 1.0 / determinant[valid]
+  s = origin - v0
+  u = np.einsum('ij,ij->i', s, p) * inverse
+  q = np.cross(s, edge1)
+  v = (q @ direction) * inverse
+  t = np.einsum('ij,ij->i', edge2, q) * inverse
+  return int(np.count_nonzero(valid & (u >= 0) & (v >= 0) & (u + v <= 1) & (t > 0)))
+
+def segmentsCrossTriangles(start, end, triangles):
+  """
+  Mask of the segments [start, end] crossing their triangle, row by row
+  Segments parallel to their triangle, within PARALLEL_TOLERANCE, never cross: coplanar faces are not compared
+  """
+  direction = end - start
+  edge1 = triangles[:, 1] - triangles[:, 0]
+  edge2 = triangles[:, 2] - triangles[:, 0]
+  p = np.cross(direction, edge2)
+  determinant = np.einsum('ij,ij->i', edge1, p)
+  scale = np.linalg.norm(direction, axis=1) * np.linalg.norm(edge1, axis=1) * np.linalg.norm(edge2, axis=1)
+  valid = np.abs(determinant) > PARALLEL_TOLERANCE * scale
+  inverse = np.zeros_like(determinant)
+  inverse[valid] = 1.0 / determinant[valid]
+  s = start - triangles[:, 0]
+  u = np.einsum('ij,ij->i', s, p) * inverse
+  q = np.cross(s, edge1)
+  v = np.einsum('ij,ij->i', direction, q) * inverse
+  t = np.einsum('ij,ij->i', edge2, q) * inverse
+  return valid & (u >= 0) & (v >= 0) & (u + v <= 1) & (t >= 0) & (t <= 1)
+
+def trianglesIntersect(triangles_a, triangles_b):
+  """ Mask of the pairs of triangles, (n, 3, 3) arrays, where an edge of one crosses the other """
+  crossing = np.zeros(len(triangles_a), dtype=bool)
+  for first, second in ((triangles_a, triangles_b), (triangles_b, triangles_a)):
+    for i in range(3):
+      crossing |= segmentsCrossTriangles(first[:, i], first[:, (i + 1) % 3], second)
+  return crossing
+
+def pointInside(point, vertices, faces):
+  """
+  Ray parity test of a point against a closed surface
+  Three rays vote so that a ray grazing an edge or a vertex doesn't decide alone
+  """
+  votes = sum(rayCrossings(point, direction, vertices, faces) % 2 for direction in RAY_DIRECTIONS)
+  return votes >= 2
+
+def operandsRelation(left, right, oriented = False):
+  """
+  Relation of two closed meshes given as (vertices, faces): DISJOINT, LEFT_INSIDE, RIGHT_INSIDE,
+  or None if their surfaces may meet and an engine is needed
+  oriented=True also compares the oriented boxes of the operands
+  """
+  left, right = compactVertices(*left), compactVertices(*right)
+  if len(left[1]) == 0 or len(right[1]) == 0:
+    return None
+  if boxesDisjoint(boundingBox(left[0]), boundingBox(right[0])):
+    return DISJOINT
+  if oriented and orientedBoxesDisjoint(orientedBox(left[0]), orientedBox(right[0])):
+    return DISJOINT
+  if not surfacesSeparated(left, right):
+    return None
+  # the surfaces don't meet: one point tells on which side of the other surface a whole operand is
+  if pointInside(left[0][0], *right):
+    return LEFT_INSIDE
+  if pointInside(right[0][0], *left):
+    return RIGHT_INSIDE
+  return DISJOINT
+
+def connectedShells(faces):
+  """
+  Label of the connected shell of each face, numbered from 0, and the number of shells
+  Faces sharing a vertex are in the same shell. The labels of the vertices are merged along the
+  edges and shortcut to their root until they don't change, a few passes for any mesh size.
+  """
+  faces = np.asarray(faces, dtype=np.int64)
+  if len(faces) == 0:
+    return np.zeros(0, dtype=np.int64), 0
+  labels = np.arange(int(faces.max()) + 1)
+  ends_a = faces[:, [0, 1]].ravel()
+  ends_b = faces[:, [1, 2]].ravel()
+  while True:
+    lowest = np.minimum(labels[ends_a], labels[ends_b])
+    merged = labels.copy()
+    np.minimum.at(merged, labels[ends_a], lowest)
+    np.minimum.at(merged, labels[ends_b], lowest)
+    while True:
+      shortcut = merged[merged]
+      if np.array_equal(shortcut, merged):
+        break
+      merged = shortcut
+    if np.array_equal(merged, labels):
+      break
+    labels = merged
+  shells, face_labels = np.unique(labels[faces[:, 0]], return_inverse=True)
+  return face_labels.ravel(), len(shells)
+
+def shellBoxes(vertices, faces, labels, count):
+  """ (min corners, max corners) of the shells, (count, 3) arrays """
+  corners = vertices[faces]
+  low = np.full((count, 3), np.inf)
+  high = np.full((count, 3), -np.inf)
+  np.minimum.at(low, labels, corners.min(axis=1))
+  np.maximum.at(high, labels, corners.max(axis=1))
+  return low, high
+
+def touchingShells(low_left, high_left, low_right, high_right, batch = SHELL_PAIRS_BATCH):
+  """
+  Masks of the left shells whose box touches a box of the right shells, and of those right shells
+  The left shells are compared in chunks sorted along x, each chunk against the right shells in its x range:
+  at most batch pairs of boxes at once, whatever the number of shells
+  """
+  touching_left = np.zeros(len(low_left), dtype=bool)
+  touching_right = np.zeros(len(low_right), dtype=bool)
+  order = np.argsort(low_left[:, 0], kind='stable')
+  chunk = max(1, batch // max(len(low_right), 1))
+  for start in range(0, len(order), chunk):
+    rows = order[start:start + chunk]
+    columns = np.flatnonzero((low_right[:, 0] <= high_left[rows, 0].max()) &
+                             (high_right[:, 0] >= low_left[rows, 0].min()))
+    if len(columns) == 0:
+      continue
+    touching = np.all((low_left[rows, None, :] <= high_right[None, columns, :]) &
+                      (low_right[None, columns, :] <= high_left[rows, None, :]), axis=2)
+    touching_left[rows] = touching.any(axis=1)
+    touching_right[columns] |= touching.any(axis=0)
+  return touching_left, touching_right
+
+def subMesh(mesh, mask):
+  """ The faces of the mesh selected by mask, with their vertices only """
+  return compactVertices(mesh[0], np.asarray(mesh[1])[mask])
+
+def localizeOperands(left, right):
+  """
+  Splits the operands into the shells the engine must see and the shells it can skip
+  A shell whose box touches no shell box of the other operand neither meets nor encloses it:
+  it lies outside the other operand and is outside its reach. Returns the meshes
+  (engine left, engine right, skipped left, skipped right).
+  """
+  labels_left, count_left = connectedShells(left[1])
+  labels_right, count_right = connectedShells(right[1])
+  low_left, high_left = shellBoxes(*left, labels_left, count_left)
+  low_right, high_right = shellBoxes(*right, labels_right, count_right)
+  touching_left, touching_right = touchingShells(low_left, high_left, low_right, high_right)
+  engine_left = touching_left[labels_left]
+  engine_right = touching_right[labels_right]
+  return (subMesh(left, engine_left), subMesh(right, engine_right),
+          subMesh(left, ~engine_left), subMesh(right, ~engine_right))
+
+def concatenateMeshes(*meshes):
+  """ One mesh made of the vertices and faces of all the meshes """
+  vertices = [mesh[0] for mesh in meshes]
+  offsets = np.cumsum([0] + [len(v) for v in vertices[:-1]])
+  faces = [np.asarray(mesh[1], dtype=np.int64) + offset for mesh, offset in zip(meshes, offsets)]
+  return np.concatenate(vertices).reshape(-1, 3), np.concatenate(faces).reshape(-1, 3)
+
+def flipped(mesh):
+  """ The mesh with its faces reversed: its normals point inwards """
+  return mesh[0], np.asarray(mesh[1])[:, ::-1]
+
+def trivialResult(relation, operator_name, left, right):
+  """ (vertices, faces) of the boolean operation of two meshes whose surfaces don't meet """
+  empty = (np.zeros((0, 3)), np.zeros((0, 3), dtype=np.int64))
+  # only the asked result is built
+  answers = {
+    DISJOINT : {"union" : lambda: concatenateMeshes(left, right),
+                "intersection" : lambda: empty,
+                "difference" : lambda: left},
+    LEFT_INSIDE : {"union" : lambda: right,
+                   "intersection" : lambda: left,
+                   "difference" : lambda: empty},
+    # the right operand becomes a cavity of the left one
+    RIGHT_INSIDE : {"union" : lambda: left,
+                    "intersection" : lambda: right,
+                    "difference" : lambda: concatenateMeshes(left, flipped(right))},
+  }
+  if relation not in answers:
+    raise ValueError(f"No trivial result for the relation {relation}")
+  if operator_name.lower() not in answers[relation]:
+    raise ValueError(f"Unknown operator {operator_name}")
+  return answers[relation][operator_name.lower()]()
@@ -0,0 +1,149 @@
+"""
+Local history of the boolean operations run by the plugin
+no SALOME imports = GUI and study independent
+Each run is stored with its features (operands face count and bounding boxes overlap),
+its duration and its success in a small sqlite database. The history is used to predict
+the runtime and the failure risk of each engine on new operands.
+"""
+
+import math
+import os
+import sqlite3
+import threading
+import time
+
+from meshbooleanplugin.mesh_boolean_cache import CACHE_DIR
+
+# Database of the runs, can be moved with MESHBOOLEAN_HISTORY
+HISTORY_PATH = os.getenv("MESHBOOLEAN_HISTORY", os.path.join(CACHE_DIR, "history.sqlite"))
+
+# Number of past runs of an engine used for one prediction, the most similar ones
+NEIGHBOURS = 16
+
+# Engines whose predicted failure risk is above this threshold are only chosen if all the others are too
+MAX_FAILURE_RISK = 0.25
+
+# Prior knowledge used while an engine has no history: seconds per million faces and failure rate
+PRIOR_COSTS = {
+  "CGAL" : (20.0, 0.02),
+  "igl"  : (15.0, 0.05),
+  "mcut" : (2.0, 0.15),
+  "irmb" : (1.0, 0.2),
+  "cork" : (3.0, 0.2),
+  "vtk"  : (30.0, 0.3),
+}
+# Weight of the prior, in number of runs
+PRIOR_WEIGHT = 2
+
+def boxesOverlap(box_left, box_right):
+  """
+  Overlap of two bounding boxes (min corner, max corner): volume of their intersection
+  divided by the volume of the smallest box, 0 for disjoint boxes and 1 for nested boxes
+  """
+  (min_left, max_left), (min_right, max_right) = box_left, box_right
+  common = [min(high_left, high_right) - max(low_left, low_right)
+            for low_left, high_left, low_right, high_right in zip(min_left, max_left, min_right, max_right)]
+  if any(length < 0 for length in common):
+    return 0.0
+  sizes_left = [high - low for low, high in zip(min_left, max_left)]
+  sizes_right = [high - low for low, high in zip(min_right, max_right)]
+  # flat boxes are compared on their other axes
+  axes = [axis for axis in range(3) if min(sizes_left[axis], sizes_right[axis]) > 0]
+  if not axes:
+    return 1.0
+  smallest = min(math.prod(sizes_left[axis] for axis in axes), math.prod(sizes_right[axis] for axis in axes))
+  return min(math.prod(common[axis] for axis in axes) / smallest, 1.0)
+
+class RunHistory:
+  """ sqlite database of the runs, one connection per call so that it can be used from any thread """
+  def __init__(self, path):
+    self.path = path
+    self._lock = threading.Lock()
+    self._ready = False
+
+  def _connect(self):
+    os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+    connection = sqlite3.connect(self.path, timeout=5)
+    if not self._ready:
+      with self._lock:
+        connection.execute("""CREATE TABLE IF NOT EXISTS runs (
+                                engine TEXT, operator TEXT, faces INTEGER, overlap REAL,
+                                seconds REAL, success INTEGER, date REAL)""")
+        connection.execute("CREATE INDEX IF NOT EXISTS runs_engine ON runs (engine, operator)")
+        connection.commit()
+        self._ready = True
+    return connection
+
+  def reopen(self, path = None):
+    """ Uses another database file (default: the same one), its table is created at the next access """
+    with self._lock:
+      if path is not None:
+        self.path = path
+      self._ready = False
+
+  def record(self, engine, operator, faces, overlap, seconds, success):
+    """ Stores one run, the history is best effort: errors are only printed """
+    try:
+      connection = self._connect()
+      try:
+        with connection:
+          connection.execute("INSERT INTO runs VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             (engine, operator.lower(), int(faces), float(overlap), float(seconds),
+                              int(bool(success)), time.time()))
+      finally:
+        connection.close()
+    except sqlite3.Error as e:
+      print(f"Could not record the run in {self.path}: {e}")
+
+  def runs(self, engine, operator, limit = 1000):
+    """ (faces, overlap, seconds, success) of the last runs of the engine """
+    try:
+      connection = self._connect()
+      try:
+        return connection.execute("""SELECT faces, overlap, seconds, success FROM runs
+                                     WHERE engine = ? AND operator = ? ORDER BY date DESC LIMIT ?""",
+                                  (engine, operator.lower(), limit)).fetchall()
+      finally:
+        connection.close()
+    except sqlite3.Error as e:
+      print(f"Could not read the history {self.path}: {e}")
+      return []
+
+  def predict(self, engine, operator, faces, overlap):
+    """
+    Predicted (seconds, failure risk) of the engine on operands with faces faces in total
+    The nearest past runs in (log of the faces, overlap) are scaled linearly with the number of faces,
+    the prior of the engine fills in while there are few runs
+    """
+    cost, failure = PRIOR_COSTS.get(engine, (10.0, 0.1))
+    prior_seconds = cost * max(faces, 1) / 1e6 * (0.2 + overlap)
+    runs = self.runs(engine, operator)
+    def distance(run):
+      return abs(math.log10(max(run[0], 1)) - math.log10(max(faces, 1))) + abs(run[1] - overlap)
+    nearest = sorted(runs, key=distance)[:NEIGHBOURS]
+    successes = [run for run in nearest if run[3]]
+    failures = len(nearest) - len(successes)
+    risk = (failures + PRIOR_WEIGHT * failure) / (len(nearest) + PRIOR_WEIGHT)
+    scaled = [seconds * max(faces, 1) / max(run_faces, 1) for run_faces, _, seconds, _ in successes]
+    seconds = (sum(scaled) + PRIOR_WEIGHT * prior_seconds) / (len(scaled) + PRIOR_WEIGHT)
+    return seconds, risk
+
+  def choose(self, engines, operator, faces, overlap):
+    """ Engine with the smallest predicted runtime among the likely successful ones """
+    predictions = {engine : self.predict(engine, operator, faces, overlap) for engine in engines}
+    for engine, (seconds, risk) in predictions.items():
+      print(f"Predicted {engine}: {seconds:.3f} s, failure risk {risk:.0%}")
+    safe = [engine for engine in engines if predictions[engine][1] <= MAX_FAILURE_RISK]
+    if safe:
+      return min(safe, key=lambda engine: predictions[engine][0])
+    return min(engines, key=lambda engine: (predictions[engine][1], predictions[engine][0]))
+
+  def clear(self):
+    """ Forgets all the runs """
+    try:
+      os.remove(self.path)
+    except FileNotFoundError:
+      pass
+    self._ready = False
+
+run_history = RunHistory(HISTORY_PATH)
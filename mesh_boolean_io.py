@@ -0,0 +1,429 @@
+"""
+Mesh files and arrays helpers for the mesh boolean plugin
+no SALOME imports = usable in the engines processes
+Meshes are handled as two contiguous arrays:
+  vertices (n, 3) float64 and faces (m, 3) int64 of triangles
+"""
+
+import os
+import warnings
+
+import numpy as np
+
+# Number of rows formatted at once by the text writers
+CHUNK_SIZE = 1 << 16
+
+# Bytes parsed at once by the readers: their working memory doesn't grow with the file size
+READ_CHUNK_SIZE = 1 << 24
+
+# MEDCoupling geometric types of the surface elements
+NORM_TRI3 = 3
+NORM_QUAD4 = 4
+NORM_POLYGON = 5
+NORM_TRI6 = 6
+NORM_TRI7 = 7
+NORM_QUAD8 = 8
+NORM_QUAD9 = 9
+NORM_QPOLYG = 32
+TRIANGLE_TYPES = (NORM_TRI3, NORM_TRI6, NORM_TRI7)
+QUADRANGLE_TYPES = (NORM_QUAD4, NORM_QUAD8, NORM_QUAD9)
+
+def splitQuadrangles(quads):
+  """ Splits each quadrangle (a, b, c, d) into the triangles (a, b, c) and (a, c, d) """
+  quads = np.asarray(quads)
+  triangles = np.empty((2 * len(quads), 3), dtype=quads.dtype)
+  triangles[0::2] = quads[:, [0, 1, 2]]
+  triangles[1::2] = quads[:, [0, 2, 3]]
+  return triangles
+
+def facesFromNodalConnectivity(connectivity, index):
+  """
+  Extracts the triangles of a MEDCoupling unstructured mesh
+  connectivity and index are the arrays of getNodalConnectivity and getNodalConnectivityIndex:
+  the cell i is [type, node_1, ... node_n] = connectivity[index[i]:index[i+1]]
+  Quadratic cells are reduced to their corner nodes and quadrangles are split in two triangles
+  """
+  connectivity = np.asarray(connectivity, dtype=np.int64)
+  starts = np.asarray(index, dtype=np.int64)[:-1]
+  types = connectivity[starts]
+  unsupported = ~np.isin(types, TRIANGLE_TYPES + QUADRANGLE_TYPES)
+  if unsupported.any():
+    raise ValueError(f"Unsupported surface element type {types[unsupported][0]} (polygons must be split first)")
+  tri_starts = starts[np.isin(types, TRIANGLE_TYPES)] + 1
+  quad_starts = starts[np.isin(types, QUADRANGLE_TYPES)] + 1
+  triangles = connectivity[tri_starts[:, None] + np.arange(3)]
+  quads = connectivity[quad_starts[:, None] + np.arange(4)]
+  return np.concatenate([triangles, splitQuadrangles(quads)])
+
+def fanTriangles(polygons):
+  """ Splits polygons with the same number of vertices into triangles around their first vertex """
+  polygons = np.asarray(polygons)
+  corners = polygons.shape[1]
+  if corners == 3:
+    return polygons
+  triangles = np.empty((len(polygons), corners - 2, 3), dtype=polygons.dtype)
+  triangles[:, :, 0] = polygons[:, :1]
+  triangles[:, :, 1] = polygons[:, 1:-1]
+  triangles[:, :, 2] = polygons[:, 2:]
+  return triangles.reshape(-1, 3)
+
+def compactVertices(vertices, faces):
+  """ Drops the vertices not used by any face and renumbers the faces """
+  used, faces = np.unique(np.asarray(faces).ravel(), return_inverse=True)
+  return np.ascontiguousarray(vertices[used, :3], dtype=np.float64), faces.reshape(-1, 3)
+
+def _writeRows(file, fmt, rows):
+  """ Writes rows with one % formatting per chunk instead of one per value """
+  for start in range(0, len(rows), CHUNK_SIZE):
+    block = rows[start:start + CHUNK_SIZE]
+    file.write((fmt * len(block)) % tuple(block.ravel().tolist()))
+
+def writeObj(path, vertices, faces):
+  """ Writes a triangle mesh in the OBJ format with full double precision """
+  with open(path, 'w') as file:
+    _writeRows(file, "v %.17g %.17g %.17g\n", np.asarray(vertices, dtype=np.float64))
+    _writeRows(file, "f %d %d %d\n", np.asarray(faces, dtype=np.int64) + 1)
+
+def writeOff(path, vertices, faces):
+  """ Writes a triangle mesh in the OFF format with full double precision """
+  with open(path, 'w') as file:
+    file.write(f"OFF\n# Created by meshbooleanplugin\n{len(vertices)} {len(faces)} 0\n")
+    _writeRows(file, "%.17g %.17g %.17g\n", np.asarray(vertices, dtype=np.float64))
+    _writeRows(file, "3 %d %d %d\n", np.asarray(faces, dtype=np.int64))
+
+# Binary PLY faces: the number of vertices (always 3) followed by the indices
+PLY_FACE_DTYPE = np.dtype([('count', 'u1'), ('indices', '<i4', (3,))])
+
+def writePly(path, vertices, faces):
+  """
+  Writes a triangle mesh in the binary little endian PLY format
+  The vertices are stored as doubles, so no precision is lost
+  """
+  vertices = np.asarray(vertices, dtype='<f8')
+  face_rows = np.empty(len(faces), dtype=PLY_FACE_DTYPE)
+  face_rows['count'] = 3
+  face_rows['indices'] = faces
+  header = ("ply\n"
+            "format binary_little_endian 1.0\n"
+            "comment Created by meshbooleanplugin\n"
+            f"element vertex {len(vertices)}\n"
+            "property double x\n"
+            "property double y\n"
+            "property double z\n"
+            f"element face {len(faces)}\n"
+            "property list uchar int vertex_indices\n"
+            "end_header\n")
+  with open(path, 'wb') as file:
+    file.write(header.encode('ascii'))
+    file.write(np.ascontiguousarray(vertices).tobytes())
+    file.write(face_rows.tobytes())
+
+# Binary STL triangles: normal, corners and attribute byte count
+STL_DTYPE = np.dtype([('normal', '<f4', (3,)), ('corners', '<f4', (3, 3)), ('attribute', '<u2')])
+
+def writeStl(path, vertices, faces):
+  """ Writes a triangle mesh in the binary STL format, in single precision as the format requires """
+  vertices = np.asarray(vertices, dtype=np.float64)
+  faces = np.asarray(faces, dtype=np.int64)
+  with open(path, 'wb') as file:
+    file.write(b"Created by meshbooleanplugin".ljust(80, b" "))
+    file.write(np.uint32(len(faces)).tobytes())
+    for start in range(0, len(faces), CHUNK_SIZE):
+      corners = vertices[faces[start:start + CHUNK_SIZE]]
+      normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+      normals /= np.maximum(np.linalg.norm(normals, axis=1), 1e-300)[:, None]
+      rows = np.zeros(len(corners), dtype=STL_DTYPE)
+      rows['normal'] = normals
+      rows['corners'] = corners
+      file.write(rows.tobytes())
+
+# Writers by file extension
+WRITERS = {
+  "obj" : writeObj,
+  "off" : writeOff,
+  "ply" : writePly,
+  "stl" : writeStl,
+}
+
+def writeMesh(path, vertices, faces):
+  """ Writes a triangle mesh, the format is given by the file extension """
+  extension = path.rsplit(".", 1)[-1].lower()
+  if extension not in WRITERS:
+    raise ValueError(f"No writer for the .{extension} format")
+  WRITERS[extension](path, vertices, faces)
+
+def mergeCoincidentVertices(vertices, faces):
+  """ Merges the vertices with the same coordinates, e.g. the corners of the triangles of a STL file """
+  vertices = np.asarray(vertices, dtype=np.float64)
+  # sorted like np.unique(axis=0), about twice as fast on the millions of corners of large STL files
+  order = np.lexsort(vertices.T[::-1])
+  ordered = vertices[order]
+  first = np.ones(len(ordered), dtype=bool)
+  first[1:] = np.any(ordered[1:] != ordered[:-1], axis=1)
+  inverse = np.empty(len(vertices), dtype=np.int64)
+  inverse[order] = np.cumsum(first) - 1
+  return ordered[first], inverse[np.asarray(faces)]
+
+def openEdgesCount(faces):
+  """ Number of edges not shared by exactly two faces, 0 for a closed manifold surface """
+  faces = np.asarray(faces, dtype=np.int64)
+  edges = np.sort(faces[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2), axis=1)
+  # one integer per edge makes the counting a 1D unique
+  codes = edges[:, 0] * (int(faces.max(initial=0)) + 1) + edges[:, 1]
+  _, counts = np.unique(codes, return_counts=True)
+  return int(np.count_nonzero(counts != 2))
+
+# PLY scalar types
+PLY_TYPES = {
+  "char" : "i1", "int8" : "i1", "uchar" : "u1", "uint8" : "u1",
+  "short" : "i2", "int16" : "i2", "ushort" : "u2", "uint16" : "u2",
+  "int" : "i4", "int32" : "i4", "uint" : "u4", "uint32" : "u4",
+  "float" : "f4", "float32" : "f4", "double" : "f8", "float64" : "f8",
+}
+
+def _plyHeader(file):
+  """ Format and elements (name, count, properties) of a PLY file, the file is left at the data """
+  header_format = None
+  elements = []
+  while True:
+    words = file.readline().decode('ascii', errors='replace').split()
+    if not words or words[0] == "end_header":
+      break
+    if words[0] == "format":
+      header_format = words[1]
+    elif words[0] == "element":
+      elements.append((words[1], int(words[2]), []))
+    elif words[0] == "property" and elements:
+      elements[-1][2].append(words[1:])
+  if not elements or elements[0][0] != "vertex" or any(prop[0] == "list" for prop in elements[0][2]):
+    raise ValueError("Unsupported PLY layout")
+  return header_format, elements
+
+def _plyVertices(file, header_format, count, properties):
+  """ Reads the vertex block of a PLY file """
+  names = [prop[1] for prop in properties]
+  if header_format == "ascii":
+    rows = np.loadtxt(file, max_rows=count, ndmin=2)
+    return rows[:, [names.index(axis) for axis in "xyz"]]
+  order = "<" if header_format == "binary_little_endian" else ">"
+  dtype = np.dtype([(prop[1], order + PLY_TYPES[prop[0]]) for prop in properties])
+  rows = np.frombuffer(file.read(count * dtype.itemsize), dtype=dtype, count=count)
+  return np.column_stack([rows[axis] for axis in "xyz"]).astype(np.float64)
+
+def _plySummary(file):
+  """ Face count and vertices of a PLY file, the face block is not read """
+  header_format, elements = _plyHeader(file)
+  counts = {name : count for name, count, _ in elements}
+  _, count, properties = elements[0]
+  return counts.get("face", 0), _plyVertices(file, header_format, count, properties)
+
+def readPly(path):
+  """
+  Reads a triangle mesh from a PLY file as (vertices, faces)
+  The faces must follow the vertices and only hold their list of indices, like the files of writePly
+  """
+  with open(path, 'rb') as file:
+    header_format, elements = _plyHeader(file)
+    _, count, properties = elements[0]
+    vertices = _plyVertices(file, header_format, count, properties)
+    if len(elements) < 2:
+      return vertices, np.zeros((0, 3), dtype=np.int64)
+    name, n_faces, properties = elements[1]
+    if name != "face" or len(properties) != 1 or properties[0][0] != "list":
+      raise ValueError("Unsupported PLY layout")
+    if header_format == "ascii":
+      rows = np.loadtxt(file, max_rows=n_faces, ndmin=2, dtype=np.int64)
+      counts, faces = rows[:, 0], rows[:, 1:4]
+    else:
+      order = "<" if header_format == "binary_little_endian" else ">"
+      count_type, index_type = PLY_TYPES[properties[0][1]], PLY_TYPES[properties[0][2]]
+      dtype = np.dtype([('count', order + count_type), ('indices', order + index_type, (3,))])
+      rows = np.frombuffer(file.read(n_faces * dtype.itemsize), dtype=dtype, count=n_faces)
+      counts, faces = rows['count'], rows['indices']
+  if len(counts) and np.any(counts != 3):
+    raise ValueError("Only triangles are supported")
+  return vertices, faces.astype(np.int64)
+
+def _lineBlocks(file):
+  """ Lists of the complete lines of a binary file, READ_CHUNK_SIZE bytes at a time """
+  rest = b""
+  while True:
+    chunk = file.read(READ_CHUNK_SIZE)
+    if not chunk:
+      break
+    chunk = rest + chunk
+    end = chunk.rfind(b"\n") + 1
+    rest = chunk[end:]
+    if end:
+      yield chunk[:end].splitlines()
+  if rest.strip():
+    yield rest.splitlines()
+
+def _parseValues(lines, dtype):
+  """ All the numbers of text lines in one C pass, None if a line holds something else """
+  with warnings.catch_warnings():
+    # unparsable text only gives a warning and a shorter array
+    warnings.simplefilter("ignore")
+    try:
+      return np.fromstring(b" ".join(lines), dtype=dtype, sep=" ")
+    except ValueError:
+      return None
+
+def _parseVertices(lines):
+  """ (n, 3) coordinates of text lines starting with x y z, any value after them is ignored """
+  width = len(lines[0].split())
+  values = _parseValues(lines, np.float64)
+  if values is not None and width >= 3 and values.size == width * len(lines):
+    return values.reshape(-1, width)[:, :3]
+  return np.array([line.split()[:3] for line in lines], dtype=np.float64).reshape(-1, 3)
+
+def _parseRows(lines):
+  """ Integer rows of text lines, as one array per number of values """
+  width = len(lines[0].split())
+  values = _parseValues(lines, np.int64)
+  if values is not None and values.size == width * len(lines):
+    return [values.reshape(-1, width)]
+  groups = {}
+  for line in lines:
+    row = line.split()
+    groups.setdefault(len(row), []).append(row)
+  return [np.array(rows, dtype=np.int64) for rows in groups.values()]
+
+def _absoluteFaceLines(lines, face_lines, vertex_count):
+  """
+  OBJ face lines with their relative (negative) indices made absolute
+  lines are the lines of the block of the faces, vertex_count the number of vertices before the block
+  """
+  absolute = []
+  face_words = (line.split() for line in face_lines)
+  for line in lines:
+    if line.startswith(b"v "):
+      vertex_count += 1
+    elif line.startswith(b"f "):
+      # -1 is the last vertex read before the face
+      absolute.append(b" ".join(b"%d" % (vertex_count + 1 + int(word)) if word.startswith(b"-") else word
+                                for word in next(face_words)))
+  return absolute
+
+def readObj(path):
+  """
+  Reads a triangle mesh from an OBJ file as (vertices, faces)
+  Only the v and f lines are used, texture and normal indices are dropped and polygons are split in triangles
+  """
+  vertices, faces = [], []
+  vertex_count = 0
+  with open(path, 'rb') as file:
+    for lines in _lineBlocks(file):
+      vertex_lines = [line[2:] for line in lines if line.startswith(b"v ")]
+      face_lines = [line[2:] for line in lines if line.startswith(b"f ")]
+      if face_lines:
+        if any(b"/" in line for line in face_lines):
+          # 'a/t/n' keeps its vertex index a
+          face_lines = [b" ".join(word.split(b"/", 1)[0] for word in line.split()) for line in face_lines]
+        if any(b"-" in line for line in face_lines):
+          face_lines = _absoluteFaceLines(lines, face_lines, vertex_count)
+      if vertex_lines:
+        vertices.append(_parseVertices(vertex_lines))
+        vertex_count += len(vertex_lines)
+      if face_lines:
+        faces.extend(fanTriangles(rows) - 1 for rows in _parseRows(face_lines))
+  return _meshArrays(vertices, faces)
+
+def readOff(path):
+  """ Reads a triangle mesh from an OFF file as (vertices, faces), polygons are split in triangles """
+  vertices, faces = [], []
+  remaining = None
+  with open(path, 'rb') as file:
+    for lines in _lineBlocks(file):
+      lines = [line for line in lines if line.strip() and not line.lstrip().startswith(b"#")]
+      if remaining is None:
+        words = lines.pop(0).split()
+        if words[0].endswith(b"OFF"):
+          words = words[1:] or lines.pop(0).split()
+        remaining = int(words[0])
+      vertex_lines, lines = lines[:remaining], lines[remaining:]
+      remaining -= len(vertex_lines)
+      if vertex_lines:
+        vertices.append(_parseVertices(vertex_lines))
+      if lines:
+        for rows in _parseRows(lines):
+          # each row is the number of corners, the corners and maybe a color
+          counts = rows[:, 0]
+          for count in np.unique(counts):
+            faces.append(fanTriangles(rows[counts == count, 1:count + 1]))
+  return _meshArrays(vertices, faces)
+
+def readStl(path):
+  """
+  Reads a triangle mesh from a binary or ASCII STL file as (vertices, faces)
+  The corners of the triangles are merged into shared vertices
+  """
+  corners = []
+  with open(path, 'rb') as file:
+    header = file.read(84)
+    count = int(np.frombuffer(header[80:84], dtype='<u4')[0]) if len(header) == 84 else -1
+    if os.path.getsize(path) == 84 + count * STL_DTYPE.itemsize:
+      block = READ_CHUNK_SIZE // STL_DTYPE.itemsize
+      while count > 0:
+        rows = np.frombuffer(file.read(min(block, count) * STL_DTYPE.itemsize), dtype=STL_DTYPE)
+        corners.append(rows['corners'].reshape(-1, 3).astype(np.float64))
+        count -= len(rows)
+    else:
+      file.seek(0)
+      for lines in _lineBlocks(file):
+        vertex_lines = [line.split(None, 1)[1] for line in lines if line.lstrip().startswith(b"vertex")]
+        if vertex_lines:
+          corners.append(_parseVertices(vertex_lines))
+  if not corners:
+    return np.zeros((0, 3)), np.zeros((0, 3), dtype=np.int64)
+  corners = np.concatenate(corners)
+  return mergeCoincidentVertices(corners, np.arange(len(corners)).reshape(-1, 3))
+
+def _meshArrays(vertices, faces):
+  """ Contiguous (vertices, faces) arrays of the blocks of a reader """
+  vertices = np.concatenate(vertices) if vertices else np.zeros((0, 3))
+  faces = np.concatenate(faces).astype(np.int64) if faces else np.zeros((0, 3), dtype=np.int64)
+  return np.ascontiguousarray(vertices, dtype=np.float64), faces
+
+# Readers by file extension
+READERS = {
+  "obj" : readObj,
+  "off" : readOff,
+  "ply" : readPly,
+  "stl" : readStl,
+}
+
+def readMesh(path):
+  """ Reads a triangle mesh as (vertices, faces), the format is given by the file extension """
+  extension = path.rsplit(".", 1)[-1].lower()
+  if extension not in READERS:
+    raise ValueError(f"No reader for the .{extension} format")
+  return READERS[extension](path)
+
+def convertMeshFile(file_in, file_out):
+  """ Converts a triangle mesh file between the formats of READERS and WRITERS without meshio """
+  writeMesh(file_out, *readMesh(file_in))
+
+def _summaryBox(vertices):
+  """ (min corner, max corner) of the vertices, the origin for no vertices """
+  if len(vertices) == 0:
+    return np.zeros(3), np.zeros(3)
+  return vertices.min(axis=0), vertices.max(axis=0)
+
+def meshArraysSummary(vertices, faces):
+  """ Number of faces and bounding box (min corner, max corner) of (vertices, faces) arrays """
+  return len(faces), _summaryBox(vertices)
+
+def meshFileSummary(path):
+  """
+  Number of faces and bounding box (min corner, max corner) of a mesh file
+  PLY files are summarized without reading their faces, the other formats are read with READERS
+  """
+  extension = path.rsplit(".", 1)[-1].lower()
+  if extension == "ply":
+    with open(path, 'rb') as file:
+      n_faces, vertices = _plySummary(file)
+    return n_faces, _summaryBox(vertices)
+  if extension not in READERS:
+    raise ValueError(f"No reader for the .{extension} format")
+  return meshArraysSummary(*readMesh(path))
@@ -51,6 +51,9 @@ def MeshBoolean(context):
       items.append('cork')
     if 'MCUT_ROOT_DIR' in os.environ:
       items.append('mcut')
+  # automatic choice of the engine from the history of the runs
+  if len(items) > 1:
+    items.append('auto')
   #
   window = mesh_boolean_dialog.getDialog()
 
@@ -1,16 +1,236 @@
+import atexit
+import math
 import os
+import shutil
+import signal
 import subprocess
 import sys
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
 
-def execCommand(command, waitUntilFinished=False):
+from meshbooleanplugin.mesh_boolean_io import READERS, WRITERS, readMesh, writeMesh, writePly
+
+def _limitFromEnv(variable):
+  """ Reads a limit from the environment, None (no limit) if unset or 0 """
+  value = float(os.getenv(variable, 0) or 0)
+  return value if value > 0 else None
+
+class ResourceLimits:
+  """
+  Limits of one engine run, None means no limit
+  memory_mb caps the resident memory of the engine, cpu_seconds its user + system CPU time
+  and wall_seconds its elapsed time
+  """
+  def __init__(self, memory_mb=None, cpu_seconds=None, wall_seconds=None):
+    self.memory_mb = memory_mb or None
+    self.cpu_seconds = cpu_seconds or None
+    self.wall_seconds = wall_seconds or None
+
+  def __bool__(self):
+    return any((self.memory_mb, self.cpu_seconds, self.wall_seconds))
+
+  def __repr__(self):
+    return f"ResourceLimits(memory_mb={self.memory_mb}, cpu_seconds={self.cpu_seconds}, wall_seconds={self.wall_seconds})"
+
+# Limits of the runs not given their own, set from MESHBOOLEAN_MEMORY_LIMIT (MB),
+# MESHBOOLEAN_CPU_LIMIT and MESHBOOLEAN_WALL_LIMIT (seconds)
+default_limits = ResourceLimits(_limitFromEnv("MESHBOOLEAN_MEMORY_LIMIT"),
+                                _limitFromEnv("MESHBOOLEAN_CPU_LIMIT"),
+                                _limitFromEnv("MESHBOOLEAN_WALL_LIMIT"))
+
+# Limits of the engines started by each thread
+_engine_limits = threading.local()
+
+@contextmanager
+def engineLimits(limits):
+  """ Applies limits to the engines started on this thread in the with block, None keeps the current ones """
+  previous = getattr(_engine_limits, "limits", None)
+  if limits is not None:
+    _engine_limits.limits = limits
+  try:
+    yield currentLimits()
+  finally:
+    _engine_limits.limits = previous
+
+def currentLimits():
+  """ Limits of the engines started on this thread """
+  return getattr(_engine_limits, "limits", None) or default_limits
+
+class ResourceLimitExceeded(RuntimeError):
+  """ Raised when an engine is killed for going over one of its ResourceLimits """
+  def __init__(self, limit, value, usage=None):
+    units = {"memory" : "MB", "cpu" : "s of CPU time", "wall" : "s"}
+    super().__init__(f"Engine killed: {limit} limit of {value:g} {units.get(limit, '')} exceeded")
+    self.limit = limit
+    self.value = value
+    self.usage = usage
+
+# Resources used by an engine process: CPU seconds, peak resident memory in MB and elapsed seconds
+ResourceUsage = namedtuple("ResourceUsage", ["user_cpu", "system_cpu", "max_rss_mb", "wall"])
+
+# Period of the checks of the memory and wall-clock limits, in seconds
+WATCH_PERIOD = 0.1
+
+def processRSS(pid):
+  """ Resident memory of a process in MB, None where /proc is not available """
+  try:
+    with open(f"/proc/{pid}/status") as status:
+      for line in status:
+        if line.startswith("VmRSS:"):
+          return int(line.split()[1]) / 1024.0
+  except (OSError, ValueError):
+    return None
+  # zombie: the process is over
+  return 0.0
+
+class EngineProcess(subprocess.Popen):
+  """
+  Engine process held to its ResourceLimits
+  The CPU time is capped by the kernel (RLIMIT_CPU), the resident memory and the elapsed time are
+  checked by a watchdog thread killing the process. limit_exceeded names the limit that stopped it.
+  wait() reaps the process with wait4 so that usage holds its ResourceUsage.
+  """
+  def __init__(self, command, limits=None, **kwargs):
+    super().__init__(command, **kwargs)
+    self.limits = limits or ResourceLimits()
+    self.usage = None
+    self.limit_exceeded = None
+    self._start = time.perf_counter()
+    if self.limits.cpu_seconds:
+      self._limitCpu()
+    if self.limits.memory_mb or self.limits.wall_seconds:
+      threading.Thread(target=self._watch, daemon=True).start()
+
+  def _limitCpu(self):
+    seconds = int(math.ceil(self.limits.cpu_seconds))
+    try:
+      import resource
+      # SIGXCPU at the soft limit, SIGKILL one second later if the engine handles it
+      resource.prlimit(self.pid, resource.RLIMIT_CPU, (seconds, seconds + 1))
+    except (ImportError, AttributeError, OSError) as e:
+      print(f"CPU time limit not applied to {self.args[0]}: {e}")
+
+  def _watch(self):
+    memory, wall = self.limits.memory_mb, self.limits.wall_seconds
+    while self.returncode is None:
+      if wall and time.perf_counter() - self._start > wall:
+        self._exceed("wall")
+        return
+      if memory:
+        rss = processRSS(self.pid)
+        if rss is None:
+          print(f"Memory limit not applied to {self.args[0]}: no /proc")
+          memory = None
+        elif rss > memory:
+          self._exceed("memory")
+          return
+      time.sleep(WATCH_PERIOD)
+
+  def _exceed(self, limit):
+    if self.returncode is not None:
+      return
+    self.limit_exceeded = limit
+    print(f"{self.args[0]} went over its {limit} limit, killing it")
+    try:
+      self.kill()
+    except OSError:
+      pass
+
+  def wait(self, timeout=None):
+    if self.returncode is None and timeout is None and hasattr(os, "wait4"):
+      try:
+        _, status, rusage = os.wait4(self.pid, 0)
+      except ChildProcessError:
+        # already reaped by poll()
+        pass
+      else:
+        self.returncode = os.waitstatus_to_exitcode(status)
+        # ru_maxrss is in kB on Linux, in bytes on macOS
+        max_rss = rusage.ru_maxrss / (1024.0 * 1024.0 if sys.platform == "darwin" else 1024.0)
+        self.usage = ResourceUsage(rusage.ru_utime, rusage.ru_stime, max_rss, time.perf_counter() - self._start)
+    returncode = super().wait(timeout)
+    cpu_limit = self.limits.cpu_seconds
+    if self.limit_exceeded is None and cpu_limit and returncode != 0:
+      # SIGXCPU only comes from RLIMIT_CPU, SIGKILL also from its hard limit
+      cpu = self.usage.user_cpu + self.usage.system_cpu if self.usage else None
+      if returncode == -signal.SIGXCPU or (returncode == -signal.SIGKILL and cpu is not None and cpu >= cpu_limit):
+        self.limit_exceeded = "cpu"
+    return returncode
+
+def watchWallClock(process, seconds):
+  """
+  Wall-clock limit of an engine that is not an EngineProcess (in-process or server run):
+  kills it after seconds and sets its limit_exceeded. Returns the timer, to cancel once the run is over.
+  """
+  def expire():
+    if process.poll() is None:
+      process.limit_exceeded = "wall"
+      print(f"Engine went over its wall limit of {seconds:g} s, killing it")
+      process.kill()
+  timer = threading.Timer(seconds, expire)
+  timer.daemon = True
+  timer.start()
+  return timer
+
+# RAM-backed file systems tried for the intermediate files, in order
+RAM_DIRECTORIES = ["/dev/shm"]
+
+# Part of the available memory the intermediate files may take in a RAM-backed directory
+RAM_FRACTION = 0.5
+
+# Bytes reserved in each RAM-backed directory by the directories handed out and not released yet
+_ram_reserved = {}
+_ram_lock = threading.Lock()
+
+def memoryAvailable():
+  """ Memory available for new allocations in bytes, from /proc/meminfo, None if unknown """
+  try:
+    with open("/proc/meminfo") as file:
+      for line in file:
+        if line.startswith("MemAvailable:"):
+          return int(line.split()[1]) * 1024
+  except OSError:
+    pass
+  return None
+
+def ramDirectory(size):
+  """
+  Writable RAM-backed directory where size bytes of files fit, None if there is none
+  Files there take memory: they must fit in RAM_FRACTION of the available memory and in the free space,
+  next to the sizes reserved by the concurrent operations. The size is reserved until releaseRamDirectory
+  """
+  available = memoryAvailable()
+  if available is None:
+    return None
+  with _ram_lock:
+    for directory in RAM_DIRECTORIES:
+      if not os.path.isdir(directory) or not os.access(directory, os.W_OK | os.X_OK):
+        continue
+      stat = os.statvfs(directory)
+      reserved = _ram_reserved.get(directory, 0)
+      if reserved + size <= min(stat.f_bavail * stat.f_frsize, available * RAM_FRACTION):
+        _ram_reserved[directory] = reserved + size
+        return directory
+  return None
+
+def releaseRamDirectory(directory, size):
+  """ Gives back the size reserved in directory by ramDirectory """
+  with _ram_lock:
+    _ram_reserved[directory] = max(_ram_reserved.get(directory, 0) - size, 0)
+
+def execCommand(command, waitUntilFinished=False, limits=None):
   """
   Run a command
   Print output in real time
+  The process is held to limits, by default the limits of the engines of this thread (see engineLimits)
   """
   print("Executing: ", " ".join(command))
   try:
-    process = subprocess.Popen(
+    process = EngineProcess(
         command,
+        limits=limits if limits is not None else currentLimits(),
         shell=False, # needed for meshio to run in SALOME environment
         encoding='utf-8',
         errors='replace'
@@ -21,12 +241,277 @@ def execCommand(command, waitUntilFinished=False):
     raise
   return process
 
-def meshIOConvert(file_in, file_out):
+def binaryVersion(binary_path):
+  """ Version stamp of an executable: its size and modification time """
+  path = binary_path if os.path.exists(binary_path) else shutil.which(binary_path)
+  if not path:
+    return "missing"
+  stat = os.stat(path)
+  return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+class ProcessCancelled(RuntimeError):
+  """ Raised when a request is aborted because its resident process was killed """
+
+class ResidentProcess:
+  """
+  Long-lived helper process driven through a line protocol.
+  Each request is written as one line of tab separated fields on its stdin,
+  each answer is read as one line 'OK<TAB>payload' or 'ERROR<TAB>message' on its stdout.
+  The process is (re)started on demand, so killing it only aborts the pending request.
+  """
+  def __init__(self, command):
+    self.command = command
+    self.process = None
+    self._lock = threading.Lock()
+
+  def isAlive(self):
+    return self.process is not None and self.process.poll() is None
+
+  def start(self):
+    """ Starts the process if it is not running yet """
+    if not self.isAlive():
+      print("Starting resident process: ", self.command[0])
+      self.process = subprocess.Popen(
+          self.command,
+          shell=False,
+          stdin=subprocess.PIPE,
+          stdout=subprocess.PIPE,
+          encoding='utf-8',
+          errors='replace',
+          bufsize=1
+      )
+    return self.process
+
+  def request(self, *fields):
+    """ Sends one request and returns the payload of the answer """
+    with self._lock:
+      process = self.start()
+      try:
+        process.stdin.write("\t".join(str(field) for field in fields) + "\n")
+        process.stdin.flush()
+        answer = process.stdout.readline()
+      except (BrokenPipeError, OSError, ValueError):
+        answer = ""
+      if not answer:
+        # the process died while handling the request: killed by the user or crashed
+        process.wait()
+        raise ProcessCancelled(f"{self.command[0]} exited with code {process.returncode}")
+    status, _, payload = answer.rstrip("\n").partition("\t")
+    if status != "OK":
+      raise RuntimeError(payload)
+    return payload
+
+  def kill(self):
+    """ Kills the process, a pending request raises ProcessCancelled """
+    process = self.process
+    if process is not None and process.poll() is None:
+      process.kill()
+
+  def close(self):
+    """ Asks the process to exit by closing its input """
+    process = self.process
+    if process is not None and process.poll() is None:
+      try:
+        process.stdin.close()
+        process.wait(timeout=5)
+      except Exception: # pylint: disable=broad-exception-caught
+        process.kill()
+    self.process = None
+
+# Script run by the resident meshio converter, meshio is imported only once per process.
+# Anything printed by meshio goes to stderr, stdout is kept for the answers.
+_CONVERTER_SCRIPT = r"""
+import sys
+import time
+answer = sys.stdout
+sys.stdout = sys.stderr
+import meshio
+for line in sys.stdin:
+  file_in, file_out = line.rstrip("\n").split("\t")
+  start = time.perf_counter()
+  try:
+    meshio.read(file_in).write(file_out)
+    answer.write(f"OK\t{time.perf_counter() - start}\n")
+  except Exception as e:
+    answer.write("ERROR\t" + f"{type(e).__name__}: {e}".replace("\n", " ") + "\n")
+  answer.flush()
+"""
+
+class MeshConverter(ResidentProcess):
+  """ Warm meshio process reused for every conversion """
+  def __init__(self):
+    super().__init__(['python3', '-c', _CONVERTER_SCRIPT])
+
+  def convert(self, file_in, file_out):
+    """ Converts file_in into file_out, returns the conversion time in seconds """
+    return float(self.request(file_in, file_out))
+
+# Idle converters, one is taken for each conversion so that concurrent conversions don't wait for each other
+_idle_converters = []
+_converters_lock = threading.Lock()
+
+@contextmanager
+def acquireConverter():
+  """ Gives a warm converter for the duration of the with block """
+  with _converters_lock:
+    converter = _idle_converters.pop() if _idle_converters else MeshConverter()
+  try:
+    yield converter
+  finally:
+    with _converters_lock:
+      _idle_converters.append(converter)
+
+@atexit.register
+def closeConverters():
+  """ Stops all the idle converter processes """
+  with _converters_lock:
+    for converter in _idle_converters:
+      converter.close()
+    _idle_converters.clear()
+
+# Text formats parsed with NumPy before meshio, which reads them line by line
+TEXT_FORMATS = ("obj", "off", "stl")
+
+def _convertArrays(file_in, file_out):
+  """
+  Converts between the triangle formats of mesh_boolean_io without meshio
+  Returns the file meshio must convert next: file_in, the text file_in as a binary PLY, or None when done
+  """
+  extension_in = file_in.rsplit(".", 1)[-1].lower()
+  extension_out = file_out.rsplit(".", 1)[-1].lower()
+  if extension_in not in READERS:
+    return file_in
+  if extension_out not in WRITERS and extension_in not in TEXT_FORMATS:
+    return file_in
+  try:
+    vertices, faces = readMesh(file_in)
+  except ValueError:
+    # polygons or PLY properties mesh_boolean_io doesn't read
+    return file_in
+  if extension_out in WRITERS:
+    writeMesh(file_out, vertices, faces)
+    return None
+  ply_file = file_in + ".ply"
+  writePly(ply_file, vertices, faces)
+  return ply_file
+
+def meshIOConvert(file_in, file_out, worker=None):
   """
   Convert files with meshio
+  obj, off, ply and stl files are converted between each other with mesh_boolean_io, the text ones are
+  parsed with NumPy and handed to meshio as binary PLY for the other formats (e.g. MED)
+  The conversion runs in a resident process, the worker can cancel it by killing worker.process
+  Returns the conversion time in seconds
   """
-  command = ['python3', '-c', f'import meshio; m = meshio.read(r"{file_in}"); m.write(r"{file_out}")']
-  #command = ['meshio', 'convert', file_in, file_out]
-  execCommand(command, waitUntilFinished=True)
+  start = time.perf_counter()
+  file_in = _convertArrays(file_in, file_out)
+  if file_in is None:
+    elapsed = time.perf_counter() - start
+    print(f"Converted to {file_out} in {elapsed:.3f} s")
+    return elapsed
+  parsing = time.perf_counter() - start
+  with acquireConverter() as converter:
+    if worker is not None:
+      worker.process = converter
+    elapsed = parsing + converter.convert(file_in, file_out)
+  print(f"Converted {file_in} to {file_out} in {elapsed:.3f} s")
   if os.path.getsize(file_out) == 0:
     raise RuntimeError(f"Error in meshio convert. {file_out} is void")
+  return elapsed
+
+# Engines run as resident servers, MESHBOOLEAN_ENGINE_SERVERS lists them (comma separated, or 'all')
+_server_engines = {name.strip().lower() for name in os.getenv("MESHBOOLEAN_ENGINE_SERVERS", "").split(",") if name.strip()}
+
+def useEngineServer(engine):
+  """ True if the boolean operations of the engine are sent to a resident server """
+  return engine.lower() in _server_engines or "all" in _server_engines
+
+def setEngineServers(engines):
+  """ Selects the engines run as resident servers, the servers of the other engines are stopped """
+  _server_engines.clear()
+  _server_engines.update(engine.lower() for engine in engines)
+  with _servers_lock:
+    for key in list(_idle_servers):
+      engine, _ = key
+      if not useEngineServer(engine):
+        for server in _idle_servers.pop(key):
+          server.close()
+
+class EngineServer(ResidentProcess):
+  """
+  Warm engine process computing one boolean operation per request
+  A request is 'operation<TAB>mesh_left<TAB>mesh_right<TAB>output', the answer carries the output path
+  """
+  def compute(self, operation, file_left, file_right, file_out):
+    return self.request(operation, file_left, file_right, file_out)
+
+# Idle servers by engine and command, several servers of the same engine run concurrent operations
+_idle_servers = {}
+_servers_lock = threading.Lock()
+
+@contextmanager
+def acquireServer(engine, command):
+  """ Gives a warm server of the engine running command for the duration of the with block """
+  key = (engine.lower(), tuple(command))
+  with _servers_lock:
+    idle = _idle_servers.setdefault(key, [])
+    server = idle.pop() if idle else EngineServer(list(command))
+  try:
+    yield server
+  finally:
+    with _servers_lock:
+      _idle_servers.setdefault(key, []).append(server)
+
+@atexit.register
+def closeServers():
+  """ Stops all the idle engine servers """
+  with _servers_lock:
+    for servers in _idle_servers.values():
+      for server in servers:
+        server.close()
+    _idle_servers.clear()
+
+class EngineRequest:
+  """
+  Boolean operation sent to a resident engine server
+  It stands for the Popen object returned by execCommand: wait() runs the request and
+  returns its exit code, kill() aborts it by killing the server, restarted by the next request
+  """
+  def __init__(self, engine, command, operation, file_left, file_right, file_out):
+    self.engine = engine
+    self.command = command
+    self.fields = (operation, file_left, file_right, file_out)
+    self.server = None
+    self.returncode = None
+    self._killed = False
+
+  def wait(self):
+    if self.returncode is not None:
+      return self.returncode
+    print("Sending to engine server: ", " ".join(self.fields))
+    with acquireServer(self.engine, self.command) as server:
+      self.server = server
+      if self._killed:
+        self.returncode = -9
+        return self.returncode
+      try:
+        server.compute(*self.fields)
+        self.returncode = 0
+      except ProcessCancelled as e:
+        print(e)
+        self.returncode = server.process.returncode or -9
+      except RuntimeError as e:
+        print("Engine server error: ", e)
+        self.returncode = 1
+      finally:
+        self.server = None
+    return self.returncode
+
+  def poll(self):
+    return self.returncode
+
+  def kill(self):
+    self._killed = True
+    server = self.server
+    if server is not None:
+      server.kill()
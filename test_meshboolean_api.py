@@ -91,6 +91,11 @@ class TestMesh(unittest.TestCase):
       if os.getenv(env_var):
         self.algos[name] = algo
 
+    # the engines must really run: disable the result cache, test_result_cache enables it again
+    from meshbooleanplugin.mesh_boolean_cache import result_cache
+    self.result_cache_size = result_cache.max_size
+    mesh_boolean_api.setResultCacheSize(0)
+
   #Functions to get the expected area of a mesh so we can compare it with the results of our algorithms
   #put it in fonctions to change it after
   def computeExpectedDifference(self):
@@ -140,8 +145,493 @@ class TestMesh(unittest.TestCase):
           computed_area = result_mesh.GetArea()
           self.assertAlmostEqual(expected_area, computed_area, delta = 5e-4)
 
+  #Runs the three operations on all the algorithms as one batch
+  def test_batch(self):
+    expected_areas = {
+      "union" : self.computeExpectedUnion(),
+      "intersection" : self.computeExpectedIntersection(),
+      "difference" : self.computeExpectedDifference()
+    }
+    for datasets in self.datasets:
+      mesh_1, mesh_2 = datasets
+      jobs = [(operator, mesh_1, mesh_2, algo) for algo in self.algos.values() for operator in expected_areas]
+      jobs = mesh_boolean_api.batchBooleanOperation(jobs, max_workers = 4)
+      self.assertEqual(len(jobs), 3 * len(self.algos))
+      for job in jobs:
+        with self.subTest(algo = job.algo.value, operator = job.operator_name):
+          type(self).test_counter +=1
+          self.assertIsNone(job.error)
+          self.assertAlmostEqual(expected_areas[job.operator_name], job.result.GetArea(), delta = 5e-4)
+
+  #Batch jobs go through the same checks as booleanOperation: disjoint operands don't need any engine
+  def test_batch_fast_path(self):
+    box_far = self.mesh_1.TranslateObjectMakeMesh(self.mesh_1, [3, 0, 0], 0, 'box_far')
+    faces = self.mesh_1.NbFaces()
+    jobs = [("union", self.mesh_1, box_far, algo) for algo in self.algos.values()]
+    for job in mesh_boolean_api.batchBooleanOperation(jobs, max_workers = 4):
+      with self.subTest(algo = job.algo.value):
+        type(self).test_counter +=1
+        self.assertIsNone(job.error)
+        self.assertEqual(job.result.NbFaces(), 2 * faces)
+        self.assertEqual(job.timings.stages["engine"], 0)
+
+  #Disjoint unions in a batch or in a CSG tree never launch an engine
+  def test_fast_path_no_engine(self):
+    from unittest import mock
+    box_far = self.mesh_1.TranslateObjectMakeMesh(self.mesh_1, [3, 0, 0], 0, 'box_far')
+    faces = self.mesh_1.NbFaces()
+    for algo_name, algo in self.algos.items():
+      with self.subTest(algo = algo_name):
+        type(self).test_counter +=1
+        with mock.patch.object(mesh_boolean_api, "runAlgo") as run_algo:
+          job, = mesh_boolean_api.batchBooleanOperation([("union", self.mesh_1, box_far, algo)])
+          result_mesh = mesh_boolean_api.evaluateCSG(mesh_boolean_api.CSGUnion(self.mesh_1, box_far), algo)
+        run_algo.assert_not_called()
+        self.assertIsNone(job.error)
+        self.assertEqual(job.result.NbFaces(), 2 * faces)
+        self.assertEqual(result_mesh.NbFaces(), 2 * faces)
+
+  #Runs the same operation twice, the second run takes its operands from the cache
+  def test_operand_cache(self):
+    from meshbooleanplugin.mesh_boolean_cache import operand_cache
+    from meshbooleanplugin.vtk import exec_vtk
+    # the checks run before the engine prepare PLY files of their own
+    self.addCleanup(mesh_boolean_api.setFastPath, mesh_boolean_api.fast_path)
+    self.addCleanup(mesh_boolean_api.setLocalized, mesh_boolean_api.localized)
+    self.addCleanup(mesh_boolean_api.setPrecheck, mesh_boolean_api.precheck)
+    mesh_boolean_api.setFastPath("off")
+    mesh_boolean_api.setLocalized(False)
+    mesh_boolean_api.setPrecheck("off")
+    expected_area = self.computeExpectedDifference()
+    for algo_name, algo in self.algos.items():
+      for datasets in self.datasets:
+        mesh_1, mesh_2 = datasets
+        with self.subTest(algo = algo_name):
+          type(self).test_counter +=1
+          mesh_boolean_api.clearOperandCache()
+          mesh_boolean_api.Difference(mesh_1, mesh_2, algo = algo)
+          # the in-process VTK engine takes SMESH operands as arrays, without prepared files
+          arrays_only = algo == mesh_boolean_api.VTK and hasattr(mesh_1, "ExportSTL") and exec_vtk.in_process
+          if operand_cache.enabled() and not arrays_only:
+            self.assertEqual(len(operand_cache.entries()), 2)
+          result_mesh = mesh_boolean_api.Difference(mesh_1, mesh_2, algo = algo)
+          self.assertAlmostEqual(expected_area, result_mesh.GetArea(), delta = 5e-4)
+
+  #Runs the same operation twice, the second result comes from the cache until it is invalidated
+  def test_result_cache(self):
+    from meshbooleanplugin.mesh_boolean_cache import result_cache
+    if self.result_cache_size == 0:
+      self.skipTest("result cache disabled")
+    result_cache.max_size = self.result_cache_size
+    expected_area = self.computeExpectedUnion()
+    for algo_name, algo in self.algos.items():
+      mesh_1, mesh_2 = self.datasets[1]
+      with self.subTest(algo = algo_name):
+        type(self).test_counter +=1
+        mesh_boolean_api.invalidateResult("union", mesh_1, mesh_2, algo)
+        entries = len(result_cache.entries())
+        mesh_boolean_api.Union(mesh_1, mesh_2, algo = algo)
+        self.assertEqual(len(result_cache.entries()), entries + 1)
+        result_mesh = mesh_boolean_api.Union(mesh_1, mesh_2, algo = algo)
+        self.assertEqual(len(result_cache.entries()), entries + 1)
+        self.assertAlmostEqual(expected_area, result_mesh.GetArea(), delta = 5e-4)
+        mesh_boolean_api.invalidateResult("union", mesh_1, mesh_2, algo)
+        self.assertEqual(len(result_cache.entries()), entries)
+
+  #Evaluates CSG expressions of more than two operands, the repeated operands don't change the result
+  def test_csg(self):
+    for algo_name, algo in self.algos.items():
+      for datasets in self.datasets:
+        mesh_1, mesh_2 = datasets
+        with self.subTest(algo = algo_name):
+          type(self).test_counter +=1
+          tree = mesh_boolean_api.CSGUnion(mesh_1, mesh_2, mesh_1)
+          result_mesh = mesh_boolean_api.evaluateCSG(tree, algo)
+          self.assertAlmostEqual(self.computeExpectedUnion(), result_mesh.GetArea(), delta = 5e-4)
+          tree = mesh_boolean_api.CSGDifference(mesh_1, mesh_2, mesh_2)
+          result_mesh = mesh_boolean_api.evaluateCSG(tree, algo)
+          self.assertAlmostEqual(self.computeExpectedDifference(), result_mesh.GetArea(), delta = 5e-4)
+
+  #Runs the operations twice on the resident servers, the second run reuses the warm server
+  def test_engine_servers(self):
+    # the engines with a resident server, among the ones built
+    algos = [algo for algo in (mesh_boolean_api.CGAL, mesh_boolean_api.IGL, mesh_boolean_api.VTK)
+             if algo in self.algos.values()]
+    if not algos:
+      self.skipTest("No engine with a resident server available")
+    mesh_boolean_api.setEngineServers(*algos)
+    mesh_boolean_api.setVTKInProcess(False)
+    try:
+      for algo in algos:
+        mesh_1, mesh_2 = self.datasets[1]
+        with self.subTest(algo = algo.value):
+          type(self).test_counter +=1
+          for _ in range(2):
+            result_mesh = mesh_boolean_api.Union(mesh_1, mesh_2, algo = algo)
+            self.assertAlmostEqual(self.computeExpectedUnion(), result_mesh.GetArea(), delta = 5e-4)
+    finally:
+      mesh_boolean_api.setEngineServers()
+      mesh_boolean_api.setVTKInProcess(True)
+
+  #Runs VTK in process and in its own process, the results are the same
+  def test_vtk_in_process(self):
+    algo = mesh_boolean_api.VTK
+    if algo not in self.algos.values():
+      self.skipTest("VTK not available")
+    for datasets in self.datasets:
+      mesh_1, mesh_2 = datasets
+      for in_process in (True, False):
+        with self.subTest(in_process = in_process):
+          type(self).test_counter +=1
+          mesh_boolean_api.setVTKInProcess(in_process)
+          try:
+            # the second operation reuses the cleaned inputs of the first one
+            result_mesh = mesh_boolean_api.Union(mesh_1, mesh_2, algo = algo)
+            self.assertAlmostEqual(self.computeExpectedUnion(), result_mesh.GetArea(), delta = 5e-4)
+            result_mesh = mesh_boolean_api.Intersection(mesh_1, mesh_2, algo = algo)
+            self.assertAlmostEqual(self.computeExpectedIntersection(), result_mesh.GetArea(), delta = 5e-4)
+          finally:
+            mesh_boolean_api.setVTKInProcess(True)
+
+  #A killed in-process operation is reported once its filter thread is over
+  def test_vtk_in_process_kill(self):
+    if mesh_boolean_api.VTK not in self.algos.values():
+      self.skipTest("VTK not available")
+    from meshbooleanplugin.vtk import exec_vtk
+    type(self).test_counter +=1
+    operands = [exec_vtk.PolyDataOperand(mesh_boolean_api.getSmeshArrays(mesh)) for mesh in (self.mesh_1, self.mesh_2)]
+    with tempfile.TemporaryDirectory() as tmp_path:
+      process = exec_vtk.InProcessBoolean("union", *operands, os.path.join(tmp_path, "result.med"))
+      process.kill()
+      self.assertEqual(process.wait(), -9)
+      self.assertFalse(process._thread.is_alive())
+
+  #Races the engines available in the environment, any winner gives the expected area
+  def test_race(self):
+    if not self.algos:
+      self.skipTest("no engine available")
+    mesh_boolean_api.setRaceEngines(*self.algos.values())
+    try:
+      for datasets in self.datasets:
+        mesh_1, mesh_2 = datasets
+        with self.subTest(dataset = type(mesh_1).__name__):
+          type(self).test_counter +=1
+          result_mesh = mesh_boolean_api.Union(mesh_1, mesh_2, algo = mesh_boolean_api.RACE)
+          self.assertAlmostEqual(self.computeExpectedUnion(), result_mesh.GetArea(), delta = 5e-4)
+    finally:
+      mesh_boolean_api.setRaceEngines()
+
+  #Lets AUTO choose the engine, every run is added to the history
+  def test_auto(self):
+    from meshbooleanplugin.mesh_boolean_history import run_history
+    if not self.algos:
+      self.skipTest("no engine available")
+    history_path = run_history.path
+    with tempfile.TemporaryDirectory() as tmp_dir:
+      mesh_boolean_api.setRunHistory(os.path.join(tmp_dir, "history.sqlite"))
+      try:
+        for datasets in self.datasets:
+          mesh_1, mesh_2 = datasets
+          with self.subTest(dataset = type(mesh_1).__name__):
+            type(self).test_counter +=1
+            result_mesh = mesh_boolean_api.Union(mesh_1, mesh_2, algo = mesh_boolean_api.AUTO)
+            self.assertAlmostEqual(self.computeExpectedUnion(), result_mesh.GetArea(), delta = 5e-4)
+        runs = sum(len(run_history.runs(algo.value, "union")) for algo in mesh_boolean_api.availableEngines())
+        self.assertEqual(runs, len(self.datasets))
+      finally:
+        mesh_boolean_api.setRunHistory(history_path)
+
+  #Collects the stage timings of an operation through the callback and the timings object
+  def test_stage_timings(self):
+    for algo_name, algo in self.algos.items():
+      for datasets in self.datasets:
+        mesh_1, mesh_2 = datasets
+        with self.subTest(algo = algo_name):
+          type(self).test_counter +=1
+          stages = []
+          timings = mesh_boolean_api.StageTimings(callback = lambda stage, seconds: stages.append(stage))
+          mesh_boolean_api.booleanOperation("union", mesh_1, mesh_2, algo, timings = timings)
+          self.assertIn("engine", stages)
+          self.assertIn("import", stages)
+          self.assertGreater(timings.stages["engine"], 0)
+          self.assertAlmostEqual(timings.total(), sum(timings.stages.values()))
+
+  def test_resource_limits(self):
+    mesh_1, mesh_2 = self.datasets[0]
+    for algo_name, algo in self.algos.items():
+      with self.subTest(algo = algo_name):
+        type(self).test_counter +=1
+        timings = mesh_boolean_api.StageTimings()
+        result = mesh_boolean_api.booleanOperation("union", mesh_1, mesh_2, algo, timings = timings)
+        self.assertIsNotNone(result)
+        if timings.usage is not None:
+          self.assertGreater(timings.usage.max_rss_mb, 0)
+        limits = mesh_boolean_api.ResourceLimits(wall_seconds = 1e-4)
+        with self.assertRaises(mesh_boolean_api.ResourceLimitExceeded) as raised:
+          mesh_boolean_api.booleanOperation("union", mesh_1, mesh_2, algo, limits = limits)
+        self.assertEqual(raised.exception.limit, "wall")
+
+  def test_fast_path(self):
+    from salome.smesh import smeshBuilder
+    smesh = smeshBuilder.New()
+    box_far = self.mesh_1.TranslateObjectMakeMesh(self.mesh_1, [3, 0, 0], 0, 'box_far')
+    box_small = self.mesh_1.ScaleMakeMesh(self.mesh_1, smesh.PointStruct(0.5, 0.5, 0.5), [0.5, 0.5, 0.5],
+                                          0, 'box_small')
+    faces = self.mesh_1.NbFaces()
+    # the engine is never run: the results only depend on the operands
+    cases = [
+      ("union", box_far, 2 * faces),
+      ("intersection", box_far, 0),
+      ("difference", box_far, faces),
+      ("union", box_small, faces),
+      ("intersection", box_small, faces),
+      ("difference", box_small, 2 * faces),
+    ]
+    for operator_name, other, expected_faces in cases:
+      with self.subTest(operator = operator_name, other = other.GetName()):
+        type(self).test_counter +=1
+        timings = mesh_boolean_api.StageTimings()
+        result = mesh_boolean_api.booleanOperation(operator_name, self.mesh_1, other, mesh_boolean_api.CGAL,
+                                                   timings = timings)
+        self.assertEqual(result.NbFaces(), expected_faces)
+        self.assertEqual(timings.stages["engine"], 0)
+
+  def test_localized(self):
+    from salome.smesh import smeshBuilder
+    smesh = smeshBuilder.New()
+    box_far = self.mesh_1.TranslateObjectMakeMesh(self.mesh_1, [3, 0, 0], 0, 'box_far')
+    # two shells: only the first one meets the other operand and goes to the engine
+    two_boxes = smesh.Concatenate([self.mesh_1, box_far], 1, 1, 1e-05, False, 'two_boxes')
+    expected_areas = {
+      "union" : self.computeExpectedUnion() + 6,
+      "intersection" : self.computeExpectedIntersection(),
+      "difference" : self.computeExpectedDifference() + 6
+    }
+    for algo_name, algo in self.algos.items():
+      for operator_name, expected_area in expected_areas.items():
+        with self.subTest(algo = algo_name, operator = operator_name):
+          type(self).test_counter +=1
+          result_mesh = mesh_boolean_api.booleanOperation(operator_name, two_boxes, self.mesh_2, algo)
+          self.assertAlmostEqual(expected_area, result_mesh.GetArea(), delta = 5e-4)
+
+  #Shell boxes compared in small chunks give the same shells as the dense comparison
+  def test_touching_shells(self):
+    import numpy as np
+    from meshbooleanplugin.mesh_boolean_geometry import touchingShells
+    rng = np.random.default_rng(0)
+    low_left, low_right = rng.random((300, 3)) * 10, rng.random((200, 3)) * 10
+    high_left, high_right = low_left + rng.random((300, 3)), low_right + rng.random((200, 3))
+    touching = np.all((low_left[:, None, :] <= high_right[None, :, :]) &
+                      (low_right[None, :, :] <= high_left[:, None, :]), axis=2)
+    touching_left, touching_right = touchingShells(low_left, high_left, low_right, high_right, batch = 1000)
+    np.testing.assert_array_equal(touching_left, touching.any(axis=1))
+    np.testing.assert_array_equal(touching_right, touching.any(axis=0))
+
+  #With the checks run before the engine, each operand is exported once per operation
+  def test_prepared_operands(self):
+    from unittest import mock
+    for algo_name, algo in self.algos.items():
+      with self.subTest(algo = algo_name):
+        type(self).test_counter +=1
+        with mock.patch.object(mesh_boolean_api, "getSmeshArrays", wraps=mesh_boolean_api.getSmeshArrays) as export:
+          result_mesh = mesh_boolean_api.Union(self.mesh_1, self.mesh_2, algo = algo)
+        self.assertAlmostEqual(self.computeExpectedUnion(), result_mesh.GetArea(), delta = 5e-4)
+        self.assertEqual(export.call_count, 2)
+
+  def test_precheck(self):
+    from salome.smesh import smeshBuilder
+    smesh = smeshBuilder.New()
+    open_box = smesh.CopyMesh(self.mesh_1, 'open_box')
+    open_box.RemoveElements(open_box.GetElementsByType(smeshBuilder.SMESH.FACE)[:1])
+    self.addCleanup(mesh_boolean_api.setPrecheck, mesh_boolean_api.precheck)
+    mesh_boolean_api.setPrecheck("basic")
+    for algo_name, algo in self.algos.items():
+      with self.subTest(algo = algo_name):
+        type(self).test_counter +=1
+        timings = mesh_boolean_api.StageTimings()
+        with self.assertRaises(mesh_boolean_api.InvalidOperand) as raised:
+          mesh_boolean_api.booleanOperation("union", open_box, self.mesh_2, algo, timings = timings)
+        self.assertEqual(raised.exception.operand, "left")
+        self.assertEqual(raised.exception.defects.boundary_edges, 3)
+        self.assertEqual(timings.stages["engine"], 0)
+    # degenerate faces alone are only reported, the engines handle them
+    from meshbooleanplugin.mesh_boolean_check import MeshDefects
+    self.assertFalse(MeshDefects(0, 0, 0, 2, None).fatal())
+    self.assertTrue(MeshDefects(0, 1, 0, 0, None).fatal())
+
+  #Coplanar faces of a rotated box are no self-intersections, overlapping boxes are
+  def test_self_intersections(self):
+    import numpy as np
+    from meshbooleanplugin.mesh_boolean_check import checkMesh
+    vertices, faces = mesh_boolean_api.getSmeshArrays(self.mesh_1)
+    for angle in (0.3, 0.7, 1.1):
+      with self.subTest(angle = angle):
+        type(self).test_counter +=1
+        cos, sin = np.cos(angle), np.sin(angle)
+        rotation = np.array([[cos, -sin, 0], [sin, cos, 0], [0, 0, 1]]) @ np.array([[1, 0, 0], [0, cos, -sin],
+                                                                                     [0, sin, cos]])
+        defects = checkMesh(vertices @ rotation.T, faces, self_intersections = True)
+        self.assertTrue(defects.valid(), defects.describe())
+    defects = checkMesh(np.vstack([vertices, vertices + 0.5]), np.vstack([faces, faces + len(vertices)]),
+                        self_intersections = True)
+    self.assertGreater(defects.self_intersections, 0)
+
+  def test_mesh_files(self):
+    from meshbooleanplugin.mesh_boolean_io import writeMesh, readMesh
+    vertices, faces = mesh_boolean_api.getSmeshArrays(self.mesh_1)
+    with tempfile.TemporaryDirectory() as tmp_path:
+      for mesh_format in ("obj", "off", "ply", "stl"):
+        with self.subTest(format = mesh_format):
+          type(self).test_counter +=1
+          path = os.path.join(tmp_path, "box." + mesh_format)
+          writeMesh(path, vertices, faces)
+          read_vertices, read_faces = readMesh(path)
+          self.assertEqual(read_vertices.shape, vertices.shape)
+          self.assertEqual(read_faces.shape, faces.shape)
+          self.assertAlmostEqual(read_vertices.sum(), vertices.sum(), places = 4)
+      # relative indices count back from the last vertex read
+      path = os.path.join(tmp_path, "relative.obj")
+      with open(path, "w") as file:
+        file.write("v 0 0 0\nv 1 0 0\nv 0 1 0\nf -3 -2 -1\nv 0 0 1\nf 1/1 -3/2 -1\n")
+      _, read_faces = readMesh(path)
+      self.assertEqual(read_faces.tolist(), [[0, 1, 2], [0, 1, 3]])
+
+  def test_array_import(self):
+    vertices, faces = mesh_boolean_api.getSmeshArrays(self.mesh_1)
+    max_faces = mesh_boolean_api.DIRECT_IMPORT_MAX_FACES
+    self.addCleanup(setattr, mesh_boolean_api, "DIRECT_IMPORT_MAX_FACES", max_faces)
+    # node by node, then through a MED file
+    for direct_max_faces in (len(faces), 0):
+      with self.subTest(direct = direct_max_faces > 0):
+        type(self).test_counter +=1
+        mesh_boolean_api.DIRECT_IMPORT_MAX_FACES = direct_max_faces
+        mesh = mesh_boolean_api.importArraysToSmesh(vertices, faces, operator_name = "union")
+        self.assertEqual(mesh.NbFaces(), len(faces))
+        self.assertEqual(mesh.NbNodes(), len(vertices))
+        self.assertAlmostEqual(mesh.GetArea(), self.mesh_1.GetArea(), delta = 1e-9)
+
+  def test_tmp_dir(self):
+    self.addCleanup(mesh_boolean_api.setTmpDir, mesh_boolean_api.tmp_dir)
+    with tempfile.TemporaryDirectory() as work_dir:
+      mesh_boolean_api.setTmpDir(work_dir)
+      with mesh_boolean_api.tmpDir() as tmp_path:
+        self.assertEqual(os.path.dirname(tmp_path), work_dir)
+      for algo_name, algo in self.algos.items():
+        with self.subTest(algo = algo_name):
+          type(self).test_counter +=1
+          result_mesh = mesh_boolean_api.booleanOperation("union", self.mesh_1, self.mesh_2, algo)
+          self.assertAlmostEqual(self.computeExpectedUnion(), result_mesh.GetArea(), delta = 5e-4)
+      # the intermediate files are removed with their directory
+      self.assertEqual(os.listdir(work_dir), [])
+    with self.assertRaises(ValueError):
+      mesh_boolean_api.setTmpDir(os.path.join(work_dir, "missing"))
+
+  #Concurrent operations share the space of the RAM-backed directory
+  def test_ram_reservation(self):
+    from meshbooleanplugin import mesh_boolean_utils
+    self.addCleanup(mesh_boolean_api.setTmpDir, mesh_boolean_api.tmp_dir)
+    mesh_boolean_api.setTmpDir("auto")
+    directory = mesh_boolean_utils.RAM_DIRECTORIES[0]
+    available = mesh_boolean_utils.memoryAvailable()
+    if available is None or not os.path.isdir(directory):
+      self.skipTest("No RAM-backed directory")
+    stat = os.statvfs(directory)
+    size = int(0.6 * min(stat.f_bavail * stat.f_frsize, available * mesh_boolean_utils.RAM_FRACTION))
+    first = mesh_boolean_api.tmpDir(size)
+    self.assertEqual(os.path.dirname(first.name), directory)
+    # the second one doesn't fit next to the first one
+    with mesh_boolean_api.tmpDir(size) as tmp_path:
+      self.assertNotEqual(os.path.dirname(tmp_path), directory)
+    first.cleanup()
+    with mesh_boolean_api.tmpDir(size) as tmp_path:
+      self.assertEqual(os.path.dirname(tmp_path), directory)
+
+  #A batch reserves the estimated size of each of its jobs once
+  def test_batch_ram_reservation(self):
+    from unittest import mock
+    self.addCleanup(mesh_boolean_api.setTmpDir, mesh_boolean_api.tmp_dir)
+    mesh_boolean_api.setTmpDir("auto")
+    size = mesh_boolean_api.estimateIntermediateSize(self.mesh_1, self.mesh_2)
+    if size is None:
+      size = mesh_boolean_api.DEFAULT_INTERMEDIATE_SIZE
+    if not self.algos:
+      self.skipTest("No engine available")
+    algo = next(iter(self.algos.values()))
+    jobs = [(operator, self.mesh_1, self.mesh_2, algo) for operator in ("union", "intersection", "difference")]
+    type(self).test_counter +=1
+    with mock.patch.object(mesh_boolean_api, "ramDirectory", wraps=mesh_boolean_api.ramDirectory) as ram_directory:
+      mesh_boolean_api.batchBooleanOperation(jobs)
+    reserved = sum(call.args[0] for call in ram_directory.call_args_list)
+    self.assertEqual(reserved, len(jobs) * size)
+
+  def test_async(self):
+    import asyncio
+    from concurrent.futures import CancelledError
+    for algo_name, algo in self.algos.items():
+      with self.subTest(algo = algo_name):
+        type(self).test_counter +=1
+        stages = []
+        future = mesh_boolean_api.UnionAsync(self.mesh_1, self.mesh_2, algo,
+                                             progress = lambda stage, seconds: stages.append(stage))
+        self.assertAlmostEqual(self.computeExpectedUnion(), future.result().GetArea(), delta = 5e-4)
+        self.assertIn("engine", stages)
+
+        result_mesh = asyncio.run(mesh_boolean_api.booleanOperationAsync("intersection", self.mesh_1,
+                                                                         self.mesh_2, algo))
+        self.assertAlmostEqual(self.computeExpectedIntersection(), result_mesh.GetArea(), delta = 5e-4)
+
+        # pending or running, the operation is cancelled: a running engine is killed
+        future = mesh_boolean_api.DifferenceAsync(self.mesh_1, self.mesh_2, algo)
+        self.assertTrue(future.cancel())
+        with self.assertRaises(CancelledError):
+          future.result()
+
+  #A cancel landing while the result is imported is ignored: the imported mesh is the result
+  def test_async_cancel_import(self):
+    from unittest import mock
+    algo = next(iter(self.algos.values()))
+    type(self).test_counter +=1
+    futures = []
+    import_result = mesh_boolean_api._importJobResult
+    def cancelledImport(job, algo, result):
+      self.assertFalse(futures[0].cancel())
+      return import_result(job, algo, result)
+    with mock.patch.object(mesh_boolean_api, "_importJobResult", side_effect = cancelledImport):
+      futures.append(mesh_boolean_api.UnionAsync(self.mesh_1, self.mesh_2, algo))
+      self.assertAlmostEqual(self.computeExpectedUnion(), futures[0].result().GetArea(), delta = 5e-4)
+    self.assertFalse(futures[0].cancelled())
+
+  #Queues the three operations on all the algorithms, two of them compute at once
+  def test_job_queue(self):
+    import time
+    expected_areas = {
+      "union" : self.computeExpectedUnion(),
+      "intersection" : self.computeExpectedIntersection(),
+      "difference" : self.computeExpectedDifference()
+    }
+    queue = mesh_boolean_api.BooleanJobQueue(max_running = 2)
+    jobs = [queue.add(operator, self.mesh_1, self.mesh_2, algo)
+            for algo in self.algos.values() for operator in expected_areas]
+    cancelled = queue.add("union", self.mesh_1, self.mesh_2, mesh_boolean_api.VTK)
+    queue.cancel(cancelled)
+    while queue.active():
+      queue.poll()
+      self.assertLessEqual(sum(job.status == mesh_boolean_api.JOB_RUNNING for job in queue.jobs), 2)
+      time.sleep(0.05)
+    self.assertEqual(cancelled.status, mesh_boolean_api.JOB_CANCELLED)
+    for job in jobs:
+      with self.subTest(algo = job.algo.value, operator = job.operator_name):
+        type(self).test_counter +=1
+        self.assertEqual(job.status, mesh_boolean_api.JOB_DONE)
+        self.assertGreater(job.elapsed(), 0)
+        self.assertAlmostEqual(expected_areas[job.operator_name], job.result.GetArea(), delta = 5e-4)
+    queue.clearFinished()
+    self.assertEqual(queue.jobs, [])
+
   def tearDown(self):
     # stuff done after launching test
+    from meshbooleanplugin.mesh_boolean_cache import result_cache
+    result_cache.max_size = self.result_cache_size
     # show the exact number of tests run(including the subtests)
     print(f"Total sub-tests ran : {self.test_counter}")
     os.remove(self.filename1)
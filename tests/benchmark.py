@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the mesh boolean engines
+Sweeps the engines and operators over pairs of spheres of increasing size and overlap, each run
+goes through the API like the users' operations and records the StageTimings measured by the plugin,
+the CPU time and peak RSS of the engine. The caches are off unless --cache is given.
+Run it in a SALOME shell:
+  salome shell -- python3 benchmark.py --sizes 1e3 1e4 1e5 --json results.json
+  salome shell -- python3 benchmark.py --compare old.json results.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+from gen_synthetic_meshes import uvSphere
+
+# Sizes in triangles of each operand and overlaps of their bounding boxes swept by default
+DEFAULT_SIZES = [1e3, 1e4, 1e5, 1e6]
+DEFAULT_OVERLAPS = [0.1, 0.5, 0.9]
+DEFAULT_OPERATIONS = ["union", "intersection", "difference"]
+
+# Slowdown reported as a regression by --compare
+REGRESSION_RATIO = 1.2
+
+def generatePair(directory, triangles, overlap):
+  """ Writes two unit spheres whose bounding boxes overlap by the given ratio, returns their files """
+  from meshbooleanplugin.mesh_boolean_io import writePly
+  paths = []
+  # boxes of side 2 shifted along x: the common part is 2 - shift
+  shift = 2.0 * (1.0 - overlap)
+  for name, center in (("left", (0.0, 0.0, 0.0)), ("right", (shift, 0.1, 0.1))):
+    vertices, faces = uvSphere(triangles, center)
+    path = os.path.join(directory, f"sphere_{int(triangles)}_{overlap}_{name}.ply")
+    writePly(path, vertices, faces)
+    paths.append(path)
+  return paths, len(faces)
+
+def runCase(mesh_boolean_api, algo, operation, file_left, file_right, import_result):
+  """
+  Runs one operation like booleanOperation, with the operands checks and fast paths, returns the measures
+  The stage times come from the StageTimings of the plugin. The CPU time and peak RSS are only known
+  for the engines run as processes
+  """
+  record = {}
+  job = mesh_boolean_api.BooleanJob(operation, file_left, file_right, algo)
+  timings = job.timings
+  if import_result:
+    mesh = mesh_boolean_api.booleanOperation(operation, file_left, file_right, algo, timings = timings)
+    record["result_faces"] = mesh.NbFaces()
+  else:
+    with tempfile.TemporaryDirectory(prefix="BooleanMeshBenchmark") as tmp_path:
+      _, result = mesh_boolean_api.computeBooleanJob(job, tmp_path)
+      if isinstance(result, str):
+        with mesh_boolean_api.timedOperation(timings), mesh_boolean_api.timedStage("result_conversion"):
+          result = mesh_boolean_api.resultArrays(result)
+    record["result_faces"] = len(result[1])
+  record["stages"] = dict(timings.stages)
+  record["engine_cpu"] = timings.usage.user_cpu + timings.usage.system_cpu if timings.usage else None
+  record["peak_rss_mb"] = timings.usage.max_rss_mb if timings.usage else None
+  record["total"] = timings.total()
+  return record
+
+def clearCaches(mesh_boolean_api):
+  """ Forgets the operands, results, verdicts and cleaned VTK inputs of the previous runs """
+  mesh_boolean_api.clearOperandCache()
+  mesh_boolean_api.clearResultCache()
+  mesh_boolean_api.clearVerdicts()
+  mesh_boolean_api.exec_vtk.ClearCleanedInputs()
+
+def runBenchmark(args):
+  from salome.kernel import salome
+  salome.salome_init()
+  from meshbooleanplugin import mesh_boolean_api, __version__
+
+  if not args.cache:
+    # cold runs: nothing is taken from the caches
+    mesh_boolean_api.setOperandCacheSize(0)
+    mesh_boolean_api.setResultCacheSize(0)
+  if args.engine:
+    algos = [mesh_boolean_api.BooleanMeshAlgorithm(engine) for engine in args.engine]
+  else:
+    algos = mesh_boolean_api.availableEngines()
+
+  report = {
+    "plugin_version" : __version__,
+    "date" : time.strftime("%Y-%m-%d %H:%M:%S"),
+    "host" : platform.node(),
+    "engines" : {algo.value : mesh_boolean_api.engineVersion(algo) for algo in algos},
+    "cache" : args.cache,
+    "runs" : [],
+  }
+  with tempfile.TemporaryDirectory(prefix="BooleanMeshBenchmarkInputs") as inputs:
+    for size in args.sizes:
+      for overlap in args.overlaps:
+        (file_left, file_right), triangles = generatePair(inputs, size, overlap)
+        for algo in algos:
+          for operation in args.operation:
+            print(f"{algo.value:>5} {operation:<12} {triangles:>9} triangles, overlap {overlap}", flush=True)
+            run = {"engine" : algo.value, "operation" : operation, "triangles" : triangles, "overlap" : overlap}
+            if not args.cache:
+              clearCaches(mesh_boolean_api)
+            try:
+              run.update(runCase(mesh_boolean_api, algo, operation, file_left, file_right, args.import_result))
+              run["status"] = "ok"
+            except Exception as e: # pylint: disable=broad-exception-caught
+              run["status"] = "error"
+              run["error"] = str(e)
+            report["runs"].append(run)
+            if args.json:
+              # rewritten after each run so that a long sweep can be stopped
+              with open(args.json, 'w') as file:
+                json.dump(report, file, indent=1)
+  printSummary(report)
+  return report
+
+def printSummary(report):
+  """ One line per run: stage times, CPU time and peak RSS of the engine """
+  print(f"\nPlugin {report['plugin_version']} on {report['host']}, {report['date']}")
+  header = f"{'engine':>6} {'operation':<12} {'triangles':>9} {'overlap':>7} {'precheck':>8} {'export':>8} " \
+           f"{'engine':>8} {'convert':>8} {'import':>8} {'cpu':>8} {'rss MB':>8}  status"
+  print(header)
+  print("-" * len(header))
+  def number(value):
+    return f"{value:8.3f}" if value is not None else f"{'-':>8}"
+  for run in report["runs"]:
+    stages = run.get("stages", {})
+    # the operands conversion and the result conversion are shown together, the import with its dump
+    convert = stages.get("conversion", 0) + stages.get("result_conversion", 0) if stages else None
+    imported = stages.get("import", 0) + stages.get("dump", 0) if stages else None
+    print(f"{run['engine']:>6} {run['operation']:<12} {run['triangles']:>9} {run['overlap']:>7} "
+          f"{number(stages.get('precheck'))} {number(stages.get('export'))} {number(stages.get('engine'))} "
+          f"{number(convert)} {number(imported)} {number(run.get('engine_cpu'))} {number(run.get('peak_rss_mb'))}  "
+          f"{run['status']}")
+
+def compareReports(old_path, new_path, ratio = REGRESSION_RATIO):
+  """ Prints the runs slower than ratio times their time in the old report, returns their number """
+  with open(old_path) as file:
+    old = json.load(file)
+  with open(new_path) as file:
+    new = json.load(file)
+  def key(run):
+    return (run["engine"], run["operation"], run["triangles"], run["overlap"])
+  old_runs = {key(run) : run for run in old["runs"] if run["status"] == "ok"}
+  regressions = 0
+  print(f"Plugin {old['plugin_version']} -> {new['plugin_version']}")
+  for run in new["runs"]:
+    previous = old_runs.get(key(run))
+    if previous is None:
+      continue
+    if run["status"] != "ok":
+      print(f"FAILED    {key(run)}: {run.get('error')}")
+      regressions += 1
+      continue
+    slowdown = run["total"] / max(previous["total"], 1e-9)
+    if slowdown > ratio:
+      print(f"SLOWER x{slowdown:.2f} {key(run)}: {previous['total']:.3f} s -> {run['total']:.3f} s")
+      regressions += 1
+  print(f"{regressions} regression(s)")
+  return regressions
+
+def main():
+  parser = argparse.ArgumentParser(description="Mesh boolean engines benchmark")
+  parser.add_argument("--engine", nargs='+', help="Engines to run (default: the installed ones)")
+  parser.add_argument("--operation", nargs='+', default=DEFAULT_OPERATIONS, help="Operations to run")
+  parser.add_argument("--sizes", nargs='+', type=float, default=DEFAULT_SIZES,
+                      help="Triangles of each operand, up to 1e7")
+  parser.add_argument("--overlaps", nargs='+', type=float, default=DEFAULT_OVERLAPS,
+                      help="Overlap ratios of the operands bounding boxes, in [0, 1]")
+  parser.add_argument("--no-import", dest="import_result", action="store_false",
+                      help="Skip the import of the results in the study")
+  parser.add_argument("--cache", action="store_true",
+                      help="Keep the caches between the runs (default: every run is cold)")
+  parser.add_argument("--json", help="JSON report written during the sweep")
+  parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two JSON reports")
+  args = parser.parse_args()
+
+  if args.compare:
+    sys.exit(1 if compareReports(*args.compare) else 0)
+  runBenchmark(args)
+
+if __name__ == "__main__":
+  main()
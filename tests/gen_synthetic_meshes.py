@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Synthetic closed triangle meshes for the tests and the benchmark, numpy and the plugin writers only:
+no SALOME session needed, but meshbooleanplugin must be importable as in a SALOME shell
+Spheres, boxes, cylinders, tori and random blobs of any resolution, with outward normals
+and shared vertices (watertight). Each mesh is (vertices, faces) arrays, see mesh_boolean_io.
+  python3 gen_synthetic_meshes.py --triangles 1e6 --format ply off
+  python3 gen_synthetic_meshes.py --shape sphere torus --triangles 1e4 --overlap 0.5 --output samples
+"""
+
+import argparse
+import math
+import os
+import sys
+
+import numpy as np
+from meshbooleanplugin.mesh_boolean_io import writeMesh, openEdgesCount, WRITERS
+
+SHAPES = ["sphere", "box", "cylinder", "torus", "blob"]
+
+def gridFaces(rows, columns, wrap = False):
+  """ Two triangles per cell of a rows x columns grid of vertices numbered row by row, wrap closes the rows """
+  cells = columns if wrap else columns - 1
+  i, j = np.meshgrid(np.arange(rows - 1), np.arange(cells), indexing='ij')
+  a = i * columns + j
+  b = i * columns + (j + 1) % columns
+  c = a + columns
+  d = b + columns
+  return np.concatenate([np.column_stack([a.ravel(), c.ravel(), d.ravel()]),
+                         np.column_stack([a.ravel(), d.ravel(), b.ravel()])])
+
+def signedVolume(vertices, faces):
+  """ Volume enclosed by the surface, negative if its normals point inwards """
+  v0, v1, v2 = (vertices[faces[:, i]] for i in range(3))
+  return float(np.einsum('ij,ij->i', v0, np.cross(v1, v2)).sum() / 6.0)
+
+def orientOutward(vertices, faces):
+  """ Reverses the faces of a surface whose normals point inwards """
+  if signedVolume(vertices, faces) < 0:
+    faces = faces[:, ::-1]
+  return vertices, np.ascontiguousarray(faces, dtype=np.int64)
+
+def weld(vertices, faces):
+  """ Merges the vertices at the same position, the seams of the parametric surfaces are closed this way """
+  vertices, inverse = np.unique(np.round(vertices, 12), axis=0, return_inverse=True)
+  faces = inverse.ravel()[faces]
+  # faces collapsed at the poles and at the centers of the caps
+  keep = (faces[:, 0] != faces[:, 1]) & (faces[:, 1] != faces[:, 2]) & (faces[:, 2] != faces[:, 0])
+  return vertices, faces[keep]
+
+def uvSphere(triangles, center = (0.0, 0.0, 0.0), radius = 1.0):
+  """
+  Closed sphere of about the given number of triangles
+  n_lat rings of 2 n_lat vertices between the two poles
+  """
+  n_lat = max(int(math.sqrt(triangles / 4.0)), 3)
+  n_lon = 2 * n_lat
+  theta = np.linspace(0.0, math.pi, n_lat + 1)[1:-1]
+  phi = np.linspace(0.0, 2.0 * math.pi, n_lon, endpoint=False)
+  theta, phi = np.meshgrid(theta, phi, indexing='ij')
+  ring = np.column_stack([(np.sin(theta) * np.cos(phi)).ravel(),
+                          (np.sin(theta) * np.sin(phi)).ravel(),
+                          np.cos(theta).ravel()])
+  vertices = np.vstack([[0.0, 0.0, 1.0], ring, [0.0, 0.0, -1.0]]) * radius + np.asarray(center)
+  south = len(vertices) - 1
+
+  def index(i, j):
+    return 1 + i * n_lon + j % n_lon
+
+  j = np.arange(n_lon)
+  faces = [np.column_stack([np.zeros(n_lon, dtype=np.int64), index(0, j), index(0, j + 1)])]
+  for i in range(n_lat - 2):
+    faces.append(np.column_stack([index(i, j), index(i + 1, j), index(i + 1, j + 1)]))
+    faces.append(np.column_stack([index(i, j), index(i + 1, j + 1), index(i, j + 1)]))
+  faces.append(np.column_stack([index(n_lat - 2, j), np.full(n_lon, south), index(n_lat - 2, j + 1)]))
+  return orientOutward(vertices, np.concatenate(faces).astype(np.int64))
+
+def box(triangles, center = (0.0, 0.0, 0.0), size = (2.0, 2.0, 2.0)):
+  """ Closed box of about the given number of triangles, each side is a grid of n x n cells """
+  n = max(int(math.sqrt(triangles / 12.0)), 1)
+  ticks = np.linspace(-0.5, 0.5, n + 1)
+  u, v = (grid.ravel() for grid in np.meshgrid(ticks, ticks, indexing='ij'))
+  vertices = []
+  faces = []
+  for axis in range(3):
+    for side in (-0.5, 0.5):
+      points = np.empty((len(u), 3))
+      points[:, axis] = side
+      points[:, (axis + 1) % 3] = u
+      points[:, (axis + 2) % 3] = v
+      side_faces = gridFaces(n + 1, n + 1)
+      if side < 0:
+        side_faces = side_faces[:, ::-1]
+      faces.append(side_faces + sum(len(p) for p in vertices))
+      vertices.append(points)
+  vertices, faces = weld(np.concatenate(vertices), np.concatenate(faces))
+  return orientOutward(vertices * np.asarray(size) + np.asarray(center), faces)
+
+def cylinder(triangles, center = (0.0, 0.0, 0.0), radius = 1.0, height = 2.0):
+  """ Closed cylinder along z of about the given number of triangles, the caps are made of concentric rings """
+  n_around = max(int(math.sqrt(triangles)), 6)
+  n_height = max(int(triangles / (2.0 * n_around) * 0.6), 1)
+  n_rings = max(int(triangles / (2.0 * n_around) * 0.2), 1)
+  phi = np.linspace(0.0, 2.0 * math.pi, n_around, endpoint=False)
+  circle = np.column_stack([np.cos(phi), np.sin(phi)])
+  # side: rows of the circle from the bottom to the top
+  z = np.linspace(-0.5, 0.5, n_height + 1)
+  side = np.column_stack([np.tile(circle, (len(z), 1)), np.repeat(z, n_around)])
+  parts = [(side, gridFaces(len(z), n_around, wrap=True))]
+  # caps: rings from the rim to the center, the last ring collapses on the center
+  scales = np.linspace(1.0, 0.0, n_rings + 1)
+  for cap_z, flip in ((-0.5, True), (0.5, False)):
+    cap = np.column_stack([np.repeat(scales, n_around)[:, None] * np.tile(circle, (len(scales), 1)),
+                           np.full(len(scales) * n_around, cap_z)])
+    cap_faces = gridFaces(len(scales), n_around, wrap=True)
+    parts.append((cap, cap_faces[:, ::-1] if flip else cap_faces))
+  offsets = np.cumsum([0] + [len(points) for points, _ in parts[:-1]])
+  vertices = np.concatenate([points for points, _ in parts])
+  faces = np.concatenate([part_faces + offset for (_, part_faces), offset in zip(parts, offsets)])
+  vertices, faces = weld(vertices, faces)
+  return orientOutward(vertices * np.array([radius, radius, height]) + np.asarray(center), faces)
+
+def torus(triangles, center = (0.0, 0.0, 0.0), radius = 1.0, tube = 0.35):
+  """ Closed torus around z of about the given number of triangles """
+  n_tube = max(int(math.sqrt(triangles * tube / (2.0 * radius))), 3)
+  n_around = max(int(triangles / (2.0 * n_tube)), 3)
+  phi, theta = np.meshgrid(np.linspace(0.0, 2.0 * math.pi, n_around, endpoint=False),
+                           np.linspace(0.0, 2.0 * math.pi, n_tube, endpoint=False), indexing='ij')
+  ring = radius + tube * np.cos(theta)
+  vertices = np.column_stack([(ring * np.cos(phi)).ravel(), (ring * np.sin(phi)).ravel(),
+                              (tube * np.sin(theta)).ravel()])
+  # the grid wraps along the tube, the last row is joined to the first one
+  faces = gridFaces(n_around + 1, n_tube, wrap=True) % len(vertices)
+  return orientOutward(vertices + np.asarray(center), faces)
+
+def blob(triangles, center = (0.0, 0.0, 0.0), radius = 1.0, roughness = 0.3, seed = 0):
+  """
+  Random closed blob: a sphere whose radius varies smoothly with the direction
+  The radius stays positive so the surface can't intersect itself
+  """
+  if not 0 <= roughness < 1:
+    raise ValueError("The roughness must be in [0, 1)")
+  vertices, faces = uvSphere(triangles)
+  rng = np.random.default_rng(seed)
+  # a few random low frequency waves over the directions, scaled to [-1, 1]
+  waves = rng.normal(size=(6, 3)) * 2.0
+  phases = rng.uniform(0.0, 2.0 * math.pi, size=6)
+  bumps = np.sin(vertices @ waves.T + phases).sum(axis=1)
+  bumps /= max(np.abs(bumps).max(), 1e-12)
+  vertices = vertices * (radius * (1.0 + roughness * bumps))[:, None]
+  return orientOutward(vertices + np.asarray(center), faces)
+
+GENERATORS = {
+  "sphere" : uvSphere,
+  "box" : box,
+  "cylinder" : cylinder,
+  "torus" : torus,
+  "blob" : blob,
+}
+
+def translated(mesh, offset):
+  """ The mesh moved by offset """
+  return mesh[0] + np.asarray(offset), mesh[1]
+
+def placeOverlapping(fixed, moving, overlap, axis = 0):
+  """
+  Translates moving along the axis so that the bounding boxes overlap by the given ratio
+  of the smallest box length: 1 centers it on fixed, 0 makes the boxes touch, < 0 separates them
+  """
+  fixed_min, fixed_max = fixed[0].min(axis=0), fixed[0].max(axis=0)
+  moving_min, moving_max = moving[0].min(axis=0), moving[0].max(axis=0)
+  common = overlap * min(fixed_max[axis] - fixed_min[axis], moving_max[axis] - moving_min[axis])
+  offset = np.zeros(3)
+  # moving starts at the end of fixed minus the common length, then the boxes centers are aligned on the other axes
+  offset[axis] = fixed_max[axis] - common - moving_min[axis]
+  if overlap >= 1:
+    offset[axis] = (fixed_min[axis] + fixed_max[axis] - moving_min[axis] - moving_max[axis]) / 2
+  for other in range(3):
+    if other != axis:
+      offset[other] = (fixed_min[other] + fixed_max[other] - moving_min[other] - moving_max[other]) / 2
+  return translated(moving, offset)
+
+def writeMeshFile(path, vertices, faces):
+  """ Writes a mesh in the format of its extension: obj, off, ply and stl by the plugin, the others with meshio """
+  extension = path.rsplit(".", 1)[-1].lower()
+  if extension in WRITERS:
+    writeMesh(path, vertices, faces)
+    return
+  # med and the other formats need meshio, and h5py for med
+  import meshio
+  meshio.write(path, meshio.Mesh(vertices, [("triangle", faces)]))
+
+def main():
+  parser = argparse.ArgumentParser(description="Synthetic closed triangle meshes")
+  parser.add_argument("--shape", nargs='+', default=SHAPES, choices=SHAPES, help="Shapes to generate")
+  parser.add_argument("--triangles", nargs='+', type=float, default=[1e4], help="Approximate triangles of each mesh")
+  parser.add_argument("--format", nargs='+', default=["ply"], help="File formats: ply, off, obj, stl, med...")
+  parser.add_argument("--center", nargs=3, type=float, default=[0.0, 0.0, 0.0], help="Center of the meshes")
+  parser.add_argument("--scale", type=float, default=1.0, help="Size of the meshes")
+  parser.add_argument("--overlap", type=float,
+                      help="Also write each mesh shifted along x, its box overlapping the first one by this ratio")
+  parser.add_argument("--seed", type=int, default=0, help="Seed of the random blobs")
+  parser.add_argument("--output", default="samples", help="Output directory")
+  parser.add_argument("--check", action="store_true", help="Check that every mesh is closed")
+  args = parser.parse_args()
+
+  os.makedirs(args.output, exist_ok=True)
+  failures = 0
+  for shape in args.shape:
+    for triangles in args.triangles:
+      kwargs = {"seed" : args.seed} if shape == "blob" else {}
+      mesh = GENERATORS[shape](triangles, **kwargs)
+      mesh = (mesh[0] * args.scale + np.asarray(args.center), mesh[1])
+      meshes = {f"{shape}_{int(triangles)}" : mesh}
+      if args.overlap is not None:
+        meshes[f"{shape}_{int(triangles)}_shifted"] = placeOverlapping(mesh, mesh, args.overlap)
+      for name, (vertices, faces) in meshes.items():
+        if args.check and openEdgesCount(faces):
+          print(f"{name}: {openEdgesCount(faces)} open edges")
+          failures += 1
+        for extension in args.format:
+          path = os.path.join(args.output, f"{name}.{extension}")
+          writeMeshFile(path, vertices, faces)
+          print(f"{path}: {len(faces)} triangles")
+  sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Parallel runner of the mesh boolean test matrix
+Runs the cases of tests.py (every ordered pair of samples x operator x engine) through the API,
+without the dialog nor the study, on a pool of workers. Each case is reported with its status,
+its time per stage and the check of its result.
+Run it in a SALOME shell:
+  salome shell -- python3 run_tests.py --workers 8 --json report.json
+  salome shell -- python3 run_tests.py --engine CGAL --operation union --shard 1/4
+"""
+
+import argparse
+import fnmatch
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import permutations
+
+SAMPLES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "samples")
+OPERATIONS = ["union", "intersection", "difference"]
+ENGINES = ["CGAL", "igl", "vtk", "irmb", "cork", "mcut"]
+# Operations whose result may be empty: the intersections of disjoint samples
+EMPTY_RESULT_OPERATIONS = ["intersection"]
+
+def listSamples(path):
+  """ Mesh files of the samples directory, sorted """
+  return sorted(os.path.join(path, name) for name in os.listdir(path)
+                if os.path.isfile(os.path.join(path, name)) and not name.startswith("."))
+
+def generateCases(samples, engines, operations, pattern = None):
+  """ (engine, operation, object, tool) of every case, with pattern only the cases of a sample matching it """
+  pairs = [(obj, tool) for obj, tool in permutations(samples, 2)
+           if not pattern or any(fnmatch.fnmatch(os.path.basename(sample), pattern) for sample in (obj, tool))]
+  return [(engine, operation, obj, tool) for operation in operations for engine in engines for obj, tool in pairs]
+
+def shardCases(cases, shard):
+  """ Cases of the shard 'index/count', index from 1: every count-th case starting at index """
+  index, count = (int(value) for value in shard.split("/"))
+  if not 1 <= index <= count:
+    raise ValueError(f"Invalid shard {shard}")
+  return cases[index - 1::count]
+
+def runCase(mesh_boolean_api, case, limits = None):
+  """
+  Computes one case like booleanOperation up to the result to import, without the study, and checks it
+  The operands checks, fast paths and localized operations run like for the users. Returns its record
+  """
+  engine, operation, obj, tool = case
+  record = {"engine" : engine, "operation" : operation,
+            "object" : os.path.basename(obj), "tool" : os.path.basename(tool)}
+  algo = mesh_boolean_api.BooleanMeshAlgorithm(engine)
+  if not mesh_boolean_api.engineAvailable(algo):
+    record["status"] = "skipped"
+    return record
+  job = mesh_boolean_api.BooleanJob(operation, obj, tool, algo, limits = limits)
+  timings = job.timings
+  start = time.perf_counter()
+  try:
+    with tempfile.TemporaryDirectory(prefix="BooleanMeshTest") as tmp_path:
+      _, result = mesh_boolean_api.computeBooleanJob(job, tmp_path)
+      if isinstance(result, str):
+        with mesh_boolean_api.timedOperation(timings), mesh_boolean_api.timedStage("result_conversion"):
+          result = mesh_boolean_api.resultArrays(result)
+      check = mesh_boolean_api.checkResultArrays(*result)
+    record["check"] = check or "ok"
+    # intersections of disjoint samples are empty: only a readable result is required
+    accepted = check is None or (check == "empty result" and operation in EMPTY_RESULT_OPERATIONS)
+    record["status"] = "pass" if accepted else "fail"
+    if not accepted:
+      record["error"] = f"Invalid result: {check}"
+  except Exception as e: # pylint: disable=broad-exception-caught
+    record["status"] = "fail"
+    record["error"] = f"{type(e).__name__}: {e}"
+  record["seconds"] = time.perf_counter() - start
+  record["stages"] = {stage : seconds for stage, seconds in timings.stages.items() if seconds}
+  if timings.usage is not None:
+    record["peak_rss_mb"] = timings.usage.max_rss_mb
+  return record
+
+def runTests(args):
+  cases = generateCases(listSamples(args.samples), args.engine, args.operation, args.match)
+  if args.shard:
+    cases = shardCases(cases, args.shard)
+  if args.list:
+    for engine, operation, obj, tool in cases:
+      print(f"{engine:>5} {operation:<12} {os.path.basename(obj)} {os.path.basename(tool)}")
+    return 0
+
+  from salome.kernel import salome
+  salome.salome_init()
+  from meshbooleanplugin import mesh_boolean_api, __version__
+  # every case must run its engine
+  mesh_boolean_api.setResultCacheSize(0)
+  limits = mesh_boolean_api.ResourceLimits(wall_seconds = args.timeout) if args.timeout else None
+
+  report = {
+    "plugin_version" : __version__,
+    "date" : time.strftime("%Y-%m-%d %H:%M:%S"),
+    "host" : platform.node(),
+    "shard" : args.shard,
+    "cases" : [],
+  }
+  start = time.perf_counter()
+  with ThreadPoolExecutor(max_workers = args.workers) as pool:
+    futures = [pool.submit(runCase, mesh_boolean_api, case, limits) for case in cases]
+    for done, future in enumerate(as_completed(futures), start=1):
+      record = future.result()
+      report["cases"].append(record)
+      print(f"[{done}/{len(cases)}] {record['status']:<7} {record['engine']:>5} {record['operation']:<12} "
+            f"{record['object']} {record['tool']} {record.get('seconds', 0):.3f} s", flush=True)
+  report["seconds"] = time.perf_counter() - start
+  # the report follows the order of the cases, not their completion
+  order = {(case[0], case[1], os.path.basename(case[2]), os.path.basename(case[3])) : index
+           for index, case in enumerate(cases)}
+  report["cases"].sort(key=lambda record: order[(record["engine"], record["operation"],
+                                                 record["object"], record["tool"])])
+  if args.json:
+    with open(args.json, 'w') as file:
+      json.dump(report, file, indent=1)
+  return printSummary(report)
+
+def printSummary(report):
+  """ Prints the failures and the counts per engine, returns the number of failures """
+  failures = [record for record in report["cases"] if record["status"] == "fail"]
+  for record in failures:
+    print(f"FAILED {record['engine']} {record['operation']} {record['object']} {record['tool']}: {record['error']}")
+  print(f"\n{'engine':>6} {'pass':>6} {'fail':>6} {'skipped':>8} {'seconds':>9}")
+  for engine in sorted({record["engine"] for record in report["cases"]}):
+    records = [record for record in report["cases"] if record["engine"] == engine]
+    counts = {status : sum(record["status"] == status for record in records) for status in ("pass", "fail", "skipped")}
+    seconds = sum(record.get("seconds", 0) for record in records)
+    print(f"{engine:>6} {counts['pass']:>6} {counts['fail']:>6} {counts['skipped']:>8} {seconds:>9.2f}")
+  print(f"{len(report['cases'])} cases in {report['seconds']:.2f} s, {len(failures)} failure(s)")
+  return len(failures)
+
+def main():
+  parser = argparse.ArgumentParser(description="Parallel mesh boolean tests")
+  parser.add_argument("--engine", nargs='+', default=ENGINES, help="Engines to test (default: all)")
+  parser.add_argument("--operation", nargs='+', default=OPERATIONS, help="Operations to test (default: all)")
+  parser.add_argument("--match", help="Run the cases of the samples matching a glob pattern, e.g. 'cube*'")
+  parser.add_argument("--shard", help="Run only the shard INDEX/COUNT of the cases, e.g. 2/4")
+  parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Cases run concurrently")
+  parser.add_argument("--timeout", type=float, help="Wall-clock limit of each engine run, in seconds")
+  parser.add_argument("--samples", default=SAMPLES_PATH, help="Directory of the sample meshes")
+  parser.add_argument("--json", help="JSON report of the cases")
+  parser.add_argument("--list", action="store_true", help="List the selected cases without running them")
+  args = parser.parse_args()
+  sys.exit(1 if runTests(args) else 0)
+
+if __name__ == "__main__":
+  main()
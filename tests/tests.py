@@ -1,6 +1,7 @@
 import os
 import subprocess
 import sys
+import time
 import argparse
 from itertools import permutations
 from meshbooleanplugin import usePySide
@@ -112,7 +113,12 @@ def check_ok(test, test_number):
 
     # Compute Mesh
     ###
-    res = dialog.onPBComputePressed()
+    dialog.onPBComputePressed()
+    # the operation is queued: poll the jobs as the dialog timer would until it is computed and imported
+    while dialog.queue.active():
+        time.sleep(0.1)
+        dialog.onJobsTimer()
+    res = bool(dialog.queue.jobs) and dialog.queue.jobs[-1].status == JOB_DONE
     ###
 
     if dialog.myWindow is not None:
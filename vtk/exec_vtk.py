@@ -1,45 +1,97 @@
 #!/usr/bin/env python3
 import sys
 from meshbooleanplugin.mesh_boolean_utils import meshIOConvert
+from meshbooleanplugin.mesh_boolean_io import writePly
 import os
+import threading
 import time
+from collections import OrderedDict
+import numpy as np
 
 # noinspection PyUnresolvedReferences
 # noinspection PyUnresolvedReferences
+from vtkmodules.vtkCommonCore import vtkCommand, vtkPoints
+from vtkmodules.vtkCommonDataModel import vtkCellArray, vtkPolyData
 from vtkmodules.vtkFiltersCore import (
   vtkCleanPolyData,
   vtkTriangleFilter
 )
 from vtkmodules.vtkFiltersGeneral import vtkBooleanOperationPolyDataFilter
 from vtkmodules.vtkFiltersSources import vtkSphereSource
-from vtkmodules.vtkIOGeometry import (
-  vtkOBJReader,
-  vtkSTLWriter
-)
+from vtkmodules.vtkIOGeometry import vtkOBJReader
 from vtkmodules.vtkIOLegacy import vtkPolyDataReader
 from vtkmodules.vtkIOPLY import vtkPLYReader
 from vtkmodules.vtkIOXML import vtkXMLPolyDataReader
 
+# Formats read and written by run_vtk.py: binary PLY, the result is written with double coordinates
+INPUT_FORMAT = "ply"
+RESULT_FORMAT = "ply"
+
+# Readers by file extension
+READERS = {
+  ".obj" : vtkOBJReader,
+  ".ply" : vtkPLYReader,
+}
+
+def engine_version():
+  """ Identifies the engine build, cached results of another build are not reused """
+  from vtkmodules.vtkCommonCore import vtkVersion
+  return vtkVersion.GetVTKVersion()
+
 def ReadPolyData(file_name):
   print("Reading", file_name)
   path, extension = os.path.splitext(file_name)
   extension = extension.lower()
-  reader = vtkOBJReader()
+  if extension not in READERS:
+    raise IOError(f"Unsupported file format: {file_name}")
+  reader = READERS[extension]()
   reader.SetFileName(file_name)
   reader.Update()
   poly_data = reader.GetOutput()
   return poly_data
 
-def WriteSTLMesh(mesh, output_file):
+def WritePLYMesh(mesh, output_file):
+  """
+  Writes the triangles of a vtkPolyData in binary PLY
+  The arrays are written as they are: no precision loss and no dependency on the locale
+  """
+  from vtkmodules.util.numpy_support import vtk_to_numpy
   print("Writing", output_file)
-  try:
-    writer = vtkSTLWriter()
-    writer.SetFileName(output_file)
-    writer.SetInputData(mesh)
-    writer.Write()
-    print("WriteSTLMesh: ", output_file, "...done")
-  except Exception:
-      raise
+  tri = vtkTriangleFilter()
+  tri.SetInputData(mesh)
+  tri.PassVertsOff()
+  tri.PassLinesOff()
+  tri.Update()
+  triangles = tri.GetOutput()
+  vertices = vtk_to_numpy(triangles.GetPoints().GetData())
+  faces = vtk_to_numpy(triangles.GetPolys().GetConnectivityArray()).reshape(-1, 3)
+  writePly(output_file, vertices, faces)
+  print("WritePLYMesh: ", output_file, "...done")
+
+def CleanPolyData(poly_data):
+  """ Triangulates and merges the duplicated points of an input of the boolean filter """
+  tri = vtkTriangleFilter()
+  tri.SetInputData(poly_data)
+  clean = vtkCleanPolyData()
+  clean.SetInputConnection(tri.GetOutputPort())
+  clean.Update()
+  return clean.GetOutput()
+
+def BooleanFilter(operation, input1, input2):
+  """ Boolean filter of the operation on the two cleaned inputs, not updated yet """
+  booleanFilter = vtkBooleanOperationPolyDataFilter()
+  if operation.lower() == 'union':
+    booleanFilter.SetOperationToUnion()
+  elif operation.lower() == 'intersection':
+    booleanFilter.SetOperationToIntersection()
+  elif operation.lower() == 'difference':
+    booleanFilter.SetOperationToDifference()
+  else:
+      raise NameError(f"Failed to parse boolean operation {str(operation.lower())}")
+
+  booleanFilter.SetInputData(0, input1)
+  booleanFilter.SetInputData(1, input2)
+  return booleanFilter
 
 def boolean_operation(operation, fn1, fn2, out_name):
   start_time = time.time()
@@ -48,12 +100,7 @@ def boolean_operation(operation, fn1, fn2, out_name):
   poly1 = ReadPolyData(fn1)
   if poly1 is None:
     raise IOError(f"Failed to read file: {fn1}")
-  tri1 = vtkTriangleFilter()
-  tri1.SetInputData(poly1)
-  clean1 = vtkCleanPolyData()
-  clean1.SetInputConnection(tri1.GetOutputPort())
-  clean1.Update()
-  input1 = clean1.GetOutput()
+  input1 = CleanPolyData(poly1)
 
   nb_points1 = input1.GetNumberOfPoints()
   print("Number of points input1: ",  nb_points1)
@@ -62,75 +109,192 @@ def boolean_operation(operation, fn1, fn2, out_name):
   poly2 = ReadPolyData(fn2)
   if poly2 is None:
     raise IOError(f"Failed to read file: {fn2}")
-  tri2 = vtkTriangleFilter()
-  tri2.SetInputData(poly2)
-  tri2.Update()
-  clean2 = vtkCleanPolyData()
-  clean2.SetInputConnection(tri2.GetOutputPort())
-  clean2.Update()
-  input2 = clean2.GetOutput()
+  input2 = CleanPolyData(poly2)
 
   nb_points2 = input2.GetNumberOfPoints()
   print("Number of points input2: ",  nb_points2)
   print("   Input2 bounds: {}".format(input2.GetBounds()))
 
   # Read the operation
-  booleanFilter = vtkBooleanOperationPolyDataFilter()
-  if operation.lower() == 'union':
-    booleanFilter.SetOperationToUnion()
-  elif operation.lower() == 'intersection':
-    booleanFilter.SetOperationToIntersection()
-  elif operation.lower() == 'difference':
-    booleanFilter.SetOperationToDifference()
-  else:
-      raise NameError(f"Failed to parse boolean operation {str(operation.lower())}")
-
-  booleanFilter.SetInputData(0, input1)
-  booleanFilter.SetInputData(1, input2)
+  booleanFilter = BooleanFilter(operation, input1, input2)
   try:
     booleanFilter.Update()
     result_mesh = booleanFilter.GetOutput()
   except:
     raise RuntimeError
 
+  WriteResult(result_mesh, operation, out_name)
+  end_time = time.time()
+
+  return end_time - start_time
+
+def WriteResult(result_mesh, operation, out_name):
+  """ Checks the result of the boolean filter and writes it next to out_name in the RESULT_FORMAT """
   nb_points = result_mesh.GetNumberOfPoints()
   print("Number of points output: ",  nb_points)
   print("   Ouput bounds: {}".format(result_mesh.GetBounds()))
   if nb_points == 0:
     raise RuntimeError(f"{operation} failed. No points in the computed mesh.")
 
-  new_out_name = out_name[:-3] + "stl"
+  new_out_name = os.path.splitext(out_name)[0] + "." + RESULT_FORMAT
   try:
-    WriteSTLMesh(result_mesh, new_out_name)
-  except:
-    raise IOError("Could not write the result in the STL file")
-  end_time = time.time()
+    WritePLYMesh(result_mesh, new_out_name)
+  except Exception as e:
+    raise IOError(f"Could not write the result in the PLY file: {e}") from e
   if not os.path.exists(new_out_name):
     raise RuntimeError("Result has not been written correctly, an error occured during the boolean operation.")
+  return new_out_name
 
-  with open(new_out_name, 'r+') as file:
-    content = file.read()
-    modified_content = content.replace(',', '.')
-    file.seek(0)
-    file.truncate()
-    file.write(modified_content)
-    file.seek(0, 2)
+# In-process mode: the boolean filter runs on a thread of the calling process, the inputs
+# are built from arrays and are kept cleaned for the next operations.
+# It is the default, MESHBOOLEAN_VTK_INPROCESS=0 goes back to a run_vtk.py process per operation.
+in_process = os.getenv("MESHBOOLEAN_VTK_INPROCESS", "1") != "0"
 
-  return end_time - start_time
+# Number of cleaned inputs kept for the next operations
+CLEANED_INPUTS_SIZE = 8
+
+_cleaned_inputs = OrderedDict()
+_cleaned_inputs_lock = threading.Lock()
+
+class PolyDataOperand:
+  """
+  Operand of the in-process mode: (vertices, faces) arrays or a mesh file
+  The key identifies the geometry, the cleaned input of an operand with a key is reused
+  """
+  def __init__(self, data, key = None):
+    self.data = data
+    self.key = key
+
+  def __str__(self):
+    return self.data if isinstance(self.data, str) else f"<arrays {self.key}>"
+
+def PolyDataFromArrays(vertices, faces):
+  """ Builds a vtkPolyData of triangles from (n, 3) vertices and (m, 3) faces arrays """
+  from vtkmodules.util.numpy_support import numpy_to_vtk, get_numpy_array_type
+  from vtkmodules.util.vtkConstants import VTK_ID_TYPE
+  id_type = get_numpy_array_type(VTK_ID_TYPE)
+  points = vtkPoints()
+  points.SetData(numpy_to_vtk(np.ascontiguousarray(vertices, dtype=np.float64), deep=True))
+  offsets = np.arange(0, 3 * len(faces) + 1, 3, dtype=id_type)
+  connectivity = np.ascontiguousarray(faces, dtype=id_type).ravel()
+  cells = vtkCellArray()
+  cells.SetData(numpy_to_vtk(offsets, deep=True, array_type=VTK_ID_TYPE),
+                numpy_to_vtk(connectivity, deep=True, array_type=VTK_ID_TYPE))
+  poly_data = vtkPolyData()
+  poly_data.SetPoints(points)
+  poly_data.SetPolys(cells)
+  return poly_data
+
+def CleanedInput(operand):
+  """ Cleaned vtkPolyData of an operand, taken from the cleaned inputs when it was already used """
+  if operand.key is not None:
+    with _cleaned_inputs_lock:
+      cleaned = _cleaned_inputs.get(operand.key)
+      if cleaned is not None:
+        _cleaned_inputs.move_to_end(operand.key)
+    if cleaned is not None:
+      print("Cleaned input reused: ", operand.key)
+  if operand.key is None or cleaned is None:
+    if isinstance(operand.data, str):
+      poly_data = ReadPolyData(operand.data)
+    else:
+      poly_data = PolyDataFromArrays(*operand.data)
+    cleaned = CleanPolyData(poly_data)
+    if operand.key is not None:
+      with _cleaned_inputs_lock:
+        _cleaned_inputs[operand.key] = cleaned
+        while len(_cleaned_inputs) > CLEANED_INPUTS_SIZE:
+          _cleaned_inputs.popitem(last=False)
+  # the boolean filter builds links on its inputs: each operation works on its own shallow copy
+  poly_data = vtkPolyData()
+  poly_data.ShallowCopy(cleaned)
+  return poly_data
+
+def ClearCleanedInputs():
+  """ Forgets the cleaned inputs kept by the in-process mode """
+  with _cleaned_inputs_lock:
+    _cleaned_inputs.clear()
+
+class InProcessBoolean:
+  """
+  Boolean operation run by the boolean filter on a thread of the calling process
+  It stands for the Popen object of execCommand: wait() returns the exit code and kill()
+  aborts the filter. The cancellation is cooperative: the filter only stops at its next progress event,
+  wait() returns once the thread is over, so a killed operation doesn't keep using a core after it.
+  The result of a killed operation is discarded.
+  """
+  def __init__(self, operation, operand1, operand2, out_name):
+    self.operation = operation
+    self.operands = (operand1, operand2)
+    self.out_name = out_name
+    self.returncode = None
+    self._killed = False
+    self._filter = None
+    self._done = threading.Event()
+    self._thread = threading.Thread(target=self._run, daemon=True)
+    self._thread.start()
+
+  def _run(self):
+    try:
+      start_time = time.time()
+      input1, input2 = (CleanedInput(operand) for operand in self.operands)
+      self._filter = BooleanFilter(self.operation, input1, input2)
+      self._filter.AddObserver(vtkCommand.ProgressEvent, self._checkAbort)
+      if not self._killed:
+        self._filter.Update()
+      if not self._killed:
+        WriteResult(self._filter.GetOutput(), self.operation, self.out_name)
+        print(f"Boolean operation '{self.operation}' completed successfully in {time.time() - start_time:.2f} seconds.")
+        self.returncode = 0
+    except Exception as e: # pylint: disable=broad-exception-caught
+      print("Error during VTK boolean operation:", e)
+      self.returncode = 1
+    finally:
+      self._done.set()
+
+  def _checkAbort(self, caller, event):
+    if self._killed:
+      caller.AbortExecuteOn()
+
+  def wait(self):
+    # a killed filter is joined too: the caller reports the cancellation once the thread is over
+    self._thread.join()
+    if self._killed:
+      return -9
+    return self.returncode
+
+  def poll(self):
+    if not self._done.is_set():
+      return None
+    if self._killed:
+      return -9
+    return self.returncode
+
+  def kill(self):
+    self._killed = True
+    if self._filter is not None:
+      self._filter.AbortExecuteOn()
 
-def convert_result(med_path):
-  output_path = med_path[:-3] + "stl"
-  meshIOConvert(output_path, med_path)
+def convert_result(med_path, worker=None):
+  output_path = med_path[:-3] + RESULT_FORMAT
+  meshIOConvert(output_path, med_path, worker=worker)
   return med_path
 
 
 def VTK_main(operation, fn1, fn2, fnout):
-  from meshbooleanplugin.mesh_boolean_utils import execCommand
+  from meshbooleanplugin.mesh_boolean_utils import execCommand, useEngineServer, EngineRequest
 
   current_dir= os.path.dirname(os.path.abspath(__file__))
   run_vtk_path = os.path.join(current_dir, "run_vtk.py")
 
-  new_output_path = os.path.splitext(fnout)[0] + ".stl"
+  new_output_path = os.path.splitext(fnout)[0] + "." + RESULT_FORMAT
+  if in_process:
+    operands = [fn if isinstance(fn, PolyDataOperand) else PolyDataOperand(fn) for fn in (fn1, fn2)]
+    print("Running VTK in process:", operation, *operands)
+    return InProcessBoolean(operation, *operands, new_output_path)
+  # the resident server imports VTK once for all the operations
+  if useEngineServer("vtk"):
+    return EngineRequest("vtk", ["python3", run_vtk_path, "--server"], operation, fn1, fn2, new_output_path)
   command = ["python3", run_vtk_path, operation, fn1, fn2, new_output_path]
   print("Running VTK command:", " ".join(command))
 
@@ -1,10 +1,33 @@
 #!/usr/bin/env python3
+import os
 import sys
 # we use argparse to parse the arguments of the command ligne
 import argparse
 #import the boolean operation fonction
 from exec_vtk import boolean_operation
+def serve():
+  """
+  Server mode: VTK is imported once for all the requests
+  one request 'operation<TAB>mesh1<TAB>mesh2<TAB>output' per line of stdin,
+  one answer 'OK<TAB>output' or 'ERROR<TAB>message' per line of stdout, the logs go to stderr
+  """
+  answer = os.fdopen(os.dup(1), 'w')
+  os.dup2(2, 1)
+  sys.stdout = sys.stderr
+  for line in sys.stdin:
+    operation, mesh1, mesh2, output = line.rstrip("\n").split("\t")
+    try:
+      elapsed = boolean_operation(operation, mesh1, mesh2, output)
+      print(f"Boolean operation '{operation}' completed successfully in {elapsed:.2f} seconds.")
+      answer.write(f"OK\t{output}\n")
+    except Exception as e:
+      answer.write("ERROR\t" + f"{e}".replace("\n", " ") + "\n")
+    answer.flush()
+
 def main():
+    if sys.argv[1:] == ["--server"]:
+      serve()
+      return
     parser = argparse.ArgumentParser(
         description="Perform a boolean operation on two meshes using VTK"
     )
@@ -12,7 +35,7 @@ def main():
                         help="Boolean operation to perform")
     parser.add_argument("mesh1", type=str, help="Path to the first input mesh")
     parser.add_argument("mesh2", type=str, help="Path to the second input mesh")
-    parser.add_argument("output", type=str, help="Path to the output mesh file (.stl or .med)")
+    parser.add_argument("output", type=str, help="Path to the output mesh file (.ply)")
 
     args = parser.parse_args()
 